@@ -0,0 +1,76 @@
+"""
+Thread mode (VkApi + thread per conversation) vs async mode (AsyncVkApi on one event loop) against a local fake VK server.
+Every conversation does what the bot does for one incoming message: users.get followed by messages.send.
+Run from the repository root: python -m benchmarks.async_api [--conversations 5000] [--latency-ms 20] [--pool-size 100]
+"""
+import asyncio
+from argparse import ArgumentParser
+from statistics import quantiles
+from threading import Thread
+from time import perf_counter
+
+from benchmarks.fake_vk import startFakeVk
+from libs.vk_api_fast import AsyncVkApi, VkApi
+
+
+def handleConversationSync(vkApi, user_id: int, latencies: list[float]) -> None:
+    timerStart = perf_counter()
+    vkApi.users.get(user_ids=user_id)
+    vkApi.messages.send(user_id=user_id, message='Привет', random_id=0)
+    latencies.append(perf_counter() - timerStart)
+
+
+async def handleConversationAsync(vkApi, user_id: int, latencies: list[float]) -> None:
+    timerStart = perf_counter()
+    await vkApi.users.get(user_ids=user_id)
+    await vkApi.messages.send(user_id=user_id, message='Привет', random_id=0)
+    latencies.append(perf_counter() - timerStart)
+
+
+def runThreadMode(api_url: str, conversations: int, pool_size: int) -> tuple[float, list[float]]:
+    vk = VkApi(token='token', pool_size=pool_size)
+    vk.API_URL = api_url
+    vkApi, latencies = vk.get_api(), []
+    timerStart = perf_counter()
+    threads = [Thread(target=handleConversationSync, args=(vkApi, userId, latencies), name='Event handler')
+               for userId in range(1, conversations + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return perf_counter() - timerStart, latencies
+
+
+async def runAsyncMode(api_url: str, conversations: int, pool_size: int) -> tuple[float, list[float]]:
+    async with AsyncVkApi(token='token', pool_size=pool_size) as vk:
+        vk.API_URL = api_url
+        vkApi, latencies = vk.get_api(), []
+        timerStart = perf_counter()
+        await asyncio.gather(*(handleConversationAsync(vkApi, userId, latencies) for userId in range(1, conversations + 1)))
+        return perf_counter() - timerStart, latencies
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    print(f'  {name:<12} {elapsed:>8.2f} s   {len(latencies) / elapsed:>10,.0f} conversations/s   '
+          f'p99 latency {quantiles(latencies, n=100)[98] * 1000:>9.2f} ms')
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--conversations', type=int, default=5_000)
+    parser.add_argument('--latency-ms', type=float, default=20.)
+    parser.add_argument('--pool-size', type=int, default=100)
+    args = parser.parse_args()
+
+    server, apiUrl = startFakeVk(args.latency_ms / 1000)
+    try:
+        print(f'{args.conversations:,} concurrent conversations, {args.latency_ms} ms server latency, '
+              f'{args.pool_size} connections:')
+        report('thread mode', *runThreadMode(apiUrl, args.conversations, args.pool_size))
+        report('async mode', *asyncio.run(runAsyncMode(apiUrl, args.conversations, args.pool_size)))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Broadcast benchmark against the local fake VK: Broadcaster (peer_ids batches packed into execute) vs one messages.send
+per user through the Outbox, both under the group rps budget. The broadcast is interrupted halfway and resumed
+from its saved state, the outbox time for all users is extrapolated from --outbox-sample messages.
+Run from the repository root: python -m benchmarks.broadcast [--users 100000] [--latency-ms 50]
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from benchmarks.fake_vk import startFakeVk
+from scripts.broadcast import Broadcaster
+from scripts.config import ApiLimits, Broadcasting
+from scripts.outbox import Outbox
+from libs.vk_api_fast import RateLimiter, VkApi
+
+
+def makeVk(api_url: str) -> VkApi:
+    vk = VkApi(token='token', rate_limiter=RateLimiter(ApiLimits.groupRequestsPerSecond), pool_size=ApiLimits.connectionPoolSize)
+    vk.API_URL = api_url
+    return vk
+
+
+def runBroadcast(api_url: str, users: int, executes_per_second: float) -> tuple[float, int, int]:
+    with TemporaryDirectory() as directory:
+        filePath = Path(directory, 'broadcast.json')
+        broadcaster = Broadcaster(makeVk(api_url), filePath, executes_per_second, progress_interval_seconds=float('inf'))
+        broadcast = broadcaster.create(dict.fromkeys(range(1, users + 1)), {'message': 'Рассылка'})
+        timerStart = perf_counter()
+        broadcaster.start(broadcast)
+        while broadcaster.running and broadcast.nextBatch < broadcast.batchCount // 2:
+            sleep(.01)
+        broadcaster.stop()
+        stoppedAt = broadcast.nextBatch
+        resumed = Broadcaster(makeVk(api_url), filePath, executes_per_second, progress_interval_seconds=float('inf'))
+        resumed.resume()
+        resumed.join()
+        progress = resumed.progress
+        return perf_counter() - timerStart, progress.sent, stoppedAt
+
+
+def runOutbox(api_url: str, messages: int) -> float:
+    outbox = Outbox(makeVk(api_url))
+    timerStart = perf_counter()
+    with outbox:
+        for userId in range(1, messages + 1):
+            outbox.send(userId, 'Рассылка')
+        outbox.join()
+    return perf_counter() - timerStart
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--latency-ms', type=float, default=50.)
+    parser.add_argument('--executes-per-second', type=float, default=Broadcasting.executesPerSecond)
+    parser.add_argument('--outbox-sample', type=int, default=200)
+    args = parser.parse_args()
+
+    server, apiUrl = startFakeVk(args.latency_ms / 1000)
+    try:
+        broadcastSeconds, sent, stoppedAt = runBroadcast(apiUrl, args.users, args.executes_per_second)
+        outboxSeconds = runOutbox(apiUrl, args.outbox_sample) / args.outbox_sample * args.users
+    finally:
+        server.terminate()
+
+    print(f'{args.users:,} recipients, {args.latency_ms:g} ms API latency, {ApiLimits.groupRequestsPerSecond} rps budget:')
+    print(f'  broadcast  {broadcastSeconds:>9.1f} s   {sent:,} sent, interrupted at batch {stoppedAt} and resumed, '
+          f'{args.executes_per_second:g} executes/s')
+    print(f'  outbox     {outboxSeconds:>9.1f} s   (extrapolated from {args.outbox_sample} messages)')
+    print(f'  x{outboxSeconds / broadcastSeconds:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Event dispatch benchmark: thread-per-event (old main loop) vs LaneDispatcher.
+Run from the repository root: python -m benchmarks.dispatcher [--users 1000 10000] [--events-per-user 3]
+"""
+from argparse import ArgumentParser
+from random import shuffle
+from statistics import quantiles
+from threading import Lock, Thread
+from time import perf_counter, sleep
+
+from scripts.dispatcher import LaneDispatcher
+
+
+def simulateHandler(latencies: list[float], lock: Lock, handle_seconds: float):
+    def handler(item: tuple[int, float]) -> None:
+        sleep(handle_seconds)
+        with lock:
+            latencies.append(perf_counter() - item[1])
+    return handler
+
+
+def makeEvents(users: int, events_per_user: int) -> list[int]:
+    events = [userId for userId in range(users) for _ in range(events_per_user)]
+    shuffle(events)
+    return events
+
+
+def runThreadPerEvent(events: list[int], handle_seconds: float) -> tuple[float, list[float]]:
+    latencies, lock = [], Lock()
+    handler, threads = simulateHandler(latencies, lock, handle_seconds), []
+    timerStart = perf_counter()
+    for userId in events:
+        thread = Thread(target=handler, args=((userId, perf_counter()),), name='Event handler')
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return perf_counter() - timerStart, latencies
+
+
+def runDispatcher(events: list[int], handle_seconds: float, workers: int, queue_size: int) -> tuple[float, list[float]]:
+    latencies, lock = [], Lock()
+    dispatcher = LaneDispatcher(simulateHandler(latencies, lock, handle_seconds), key=lambda item: item[0],
+                                workers=workers, queue_size=queue_size)
+    timerStart = perf_counter()
+    with dispatcher:
+        for userId in events:
+            dispatcher.submit((userId, perf_counter()))
+        dispatcher.join()
+        elapsed = perf_counter() - timerStart
+        print(f'    {dispatcher.stats}')
+    return elapsed, latencies
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    p99 = quantiles(latencies, n=100)[98]
+    print(f'  {name:<18} {len(latencies) / elapsed:>12,.0f} events/s   p99 latency {p99 * 1000:>9.2f} ms')
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--events-per-user', type=int, default=3)
+    parser.add_argument('--handle-ms', type=float, default=.5)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--queue-size', type=int, default=10_000)
+    parser.add_argument('--skip-threads', action='store_true', help='skip the thread-per-event baseline')
+    args = parser.parse_args()
+
+    for users in args.users:
+        events = makeEvents(users, args.events_per_user)
+        print(f'{users:,} users, {len(events):,} events, {args.handle_ms} ms per event:')
+        if not args.skip_threads:
+            report('thread per event', *runThreadPerEvent(events, args.handle_ms / 1000))
+        report('lane dispatcher', *runDispatcher(events, args.handle_ms / 1000, args.workers, args.queue_size))
+
+
+if __name__ == '__main__':
+    main()
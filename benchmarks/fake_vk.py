@@ -0,0 +1,115 @@
+"""
+Local fake VK API / Bots Long Poll server for benchmarks. Speaks HTTP/1.1 with keep-alive over plain TCP.
+Run standalone: python -m benchmarks.fake_vk [--port 8080] [--latency-ms 20]
+"""
+import asyncio
+import re
+from argparse import ArgumentParser
+from itertools import count
+from multiprocessing import Process, Queue
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from ujson import dumps, loads
+
+
+class FakeVk:
+    def __init__(self, latency_seconds: float = 0., collection_size: int = 10_000) -> None:
+        self.latencySeconds = latency_seconds
+        self.collectionSize = collection_size
+        self.messageIds = count(1)
+        self.port = 0
+
+    def getItems(self, code: str) -> dict[str, Any]:
+        """
+        VkTools paging executes: 25 pages from offset (up to end for a window) of a collection of collectionSize posts
+        """
+        pageSize = loads(re.search(r'var params = (\{.*?\}),calls', code)[1])['count']
+        offset = int(re.search(r',offset = (-?\d+),ri;', code)[1])
+        end = min(int(window[1]), self.collectionSize) if (window := re.search(r'offset < (\d+)\)', code)) else self.collectionSize
+        items, pages = [], 0
+        while pages < 25 and offset < end:
+            pages += 1
+            page = [{'id': index, 'text': f'Пост {index}'} for index in range(offset, min(offset + pageSize, self.collectionSize))]
+            items += page
+            offset += pageSize
+            if len(page) < pageSize:
+                break
+        return {'count': self.collectionSize, 'items': items, 'offset': offset, 'more': pages == 25 and offset < end}
+
+    def respond(self, path: str, params: dict[str, str]) -> object:
+        if path == '/lp':
+            return {'ts': str(int(params.get('ts', 0)) + 1), 'updates': []}
+        method = path.removeprefix('/method/')
+        match method:
+            case 'execute':
+                code = params.get('code', '')
+                if 'params.offset = offset' in code:
+                    return {'response': self.getItems(code)}
+                if code.startswith('var batches = '):
+                    return {'response': [[{'peer_id': int(peerId), 'message_id': next(self.messageIds)} for peerId in peerIds.split(',')]
+                                         for peerIds, _ in loads(code.removeprefix('var batches = ').split(', values = ')[0])]}
+                if code.startswith('var values = '):
+                    callMethod = code.split('API.')[1].split('(')[0]
+                    return {'response': [self.respond(f'/method/{callMethod}', {key: str(value) for key, value in values.items()})['response']
+                                         for values in loads(code.removeprefix('var values = ').split(',i = 0,')[0])]}
+                return {'response': [self.respond(f'/method/{call.split('(')[0]}', {})['response']
+                                     for call in code.split('API.')[1:]]}
+            case 'users.get':
+                return {'response': [{'id': int(userId), 'first_name': 'Имя', 'last_name': 'Фамилия'}
+                                     for userId in params.get('user_ids', '1').split(',')]}
+            case 'messages.send':
+                return {'response': next(self.messageIds)}
+            case 'groups.getLongPollServer':
+                return {'response': {'key': 'key', 'server': f'http://127.0.0.1:{self.port}/lp', 'ts': '1'}}
+            case _:
+                return {'response': 1}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while requestLine := await reader.readline():
+                target, headers = requestLine.decode().split()[1], {}
+                while (line := await reader.readline()) not in {b'\r\n', b''}:
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                url = urlsplit(target)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                params.update({key: values[0] for key, values in parse_qs(body.decode()).items()})
+                if self.latencySeconds:
+                    await asyncio.sleep(self.latencySeconds)
+                content = dumps(self.respond(url.path, params), ensure_ascii=False).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\nConnection: keep-alive\r\n\r\n%b' % (len(content), content))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port: int = 0, ready: Any = None) -> None:
+        server = await asyncio.start_server(self.handle, '127.0.0.1', port, backlog=4096)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.put(self.port)
+        async with server:
+            await server.serve_forever()
+
+
+def _serve(port: int, latency_seconds: float, collection_size: int, ready: Any) -> None:
+    asyncio.run(FakeVk(latency_seconds, collection_size).serve(port, ready))
+
+
+def startFakeVk(latency_seconds: float = 0., port: int = 0, collection_size: int = 10_000) -> tuple[Process, str]:
+    ready = Queue()
+    process = Process(target=_serve, args=(port, latency_seconds, collection_size, ready), daemon=True)
+    process.start()
+    return process, f'http://127.0.0.1:{ready.get(timeout=10)}/method/'
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=20.)
+    args = parser.parse_args()
+    asyncio.run(FakeVk(args.latency_ms / 1000).serve(args.port))
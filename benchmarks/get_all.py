@@ -0,0 +1,59 @@
+"""
+VkTools paging benchmark against the local fake VK: get_all_iter (one execute at a time) vs get_all_iter_pipelined
+with different numbers of executes in flight, a consumer spending --consume-us on every item.
+Checks that both return the same items and reports the peak memory of the scan.
+Run from the repository root: python -m benchmarks.get_all [--items 100000] [--latency-ms 100] [--in-flight 1 2 4 8]
+"""
+import tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter, sleep
+
+from benchmarks.fake_vk import startFakeVk
+from scripts.config import ApiLimits
+from libs.vk_api_fast import RateLimiter, VkApi
+from libs.vk_api_fast.tools import VkTools
+
+
+def scan(items, consume_seconds: float) -> tuple[float, list[int], int]:
+    tracemalloc.start()
+    timerStart, ids = perf_counter(), []
+    for item in items:
+        ids.append(item['id'])
+        if consume_seconds and len(ids) % 100 == 0:
+            sleep(consume_seconds)
+    seconds = perf_counter() - timerStart
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, ids, peak
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--latency-ms', type=float, default=100.)
+    parser.add_argument('--consume-us', type=float, default=20., help='per item, slept in chunks of 100 items')
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server, apiUrl = startFakeVk(args.latency_ms / 1000, collection_size=args.items)
+    try:
+        vk = VkApi(token='token', rate_limiter=RateLimiter(ApiLimits.groupRequestsPerSecond), pool_size=ApiLimits.connectionPoolSize)
+        vk.API_URL = apiUrl
+        tools, consumeSeconds = VkTools(vk), args.consume_us * 100 / 1e6
+        results = {'sequential': scan(tools.get_all_iter('wall.get', 100, {'owner_id': -1}), consumeSeconds)}
+        for maxInFlight in args.in_flight:
+            results[f'pipelined x{maxInFlight}'] = scan(tools.get_all_iter_pipelined('wall.get', 100, {'owner_id': -1},
+                                                                                   max_in_flight=maxInFlight), consumeSeconds)
+    finally:
+        server.terminate()
+
+    sequentialSeconds, sequentialIds, _ = results['sequential']
+    print(f'{args.items:,} items, {args.items // 2500 + 1} executes, {args.latency_ms:g} ms API latency, '
+          f'{args.consume_us:g} us per item:')
+    for mode, (seconds, ids, peak) in results.items():
+        print(f'  {mode:<14} {seconds:>8.2f} s   x{sequentialSeconds / seconds:<5.1f} peak {peak / 2 ** 20:>6.1f} MiB'
+              f'{'' if ids == sequentialIds else '   ITEMS DIFFER'}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+BaseUser.createKeyboard cost: building every keyboard from scratch (the uncached buildKeyboard, what every reply did before)
+vs the prebuilt static keyboards and the LRU-memoized dynamic ones, over a mix of users with different profiles.
+Run from the repository root: python -m benchmarks.keyboards [--calls 100000] [--users 1000]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from scripts.classes import BaseUser, buildKeyboard, botPrefs
+from scripts.config import Constants
+
+
+keyboardTypes = ('main', 'profiles', 'days', 'exercises', 'exercise_list', 'add_exercise', 'profile_actions',
+                 'exercise_actions', 'exercise_actions_extended', 'last')
+
+
+def makeUsers(count: int) -> list[BaseUser]:
+    exercisesNames = botPrefs.exercisesNamesRu
+    return [BaseUser(id=userId, profileNames=[f'Профиль {profile + 1}' for profile in range(userId % 4 + 1)],
+                     profiles=[[exercisesNames[day:day + userId % 5 + 1] for day in range(userId % 3 + 1)]],
+                     lastKeyboard=('main', 'days', 'exercises')[userId % 3])
+            for userId in range(count)]
+
+
+def createKeyboardUncached(user: BaseUser, keyboard_type: str) -> str:
+    inline = keyboard_type in Constants.inlineKeyboards
+    hasToMenuButton = keyboard_type in Constants.keyboardsWithToMenuButton
+    if keyboard_type == 'last':
+        keyboard_type = user.lastKeyboard
+    return buildKeyboard.__wrapped__(keyboard_type, inline, hasToMenuButton, tuple(user.profileNames),
+                                     len(user.currentProfile), tuple(user.currentDay))[0]
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--calls', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    args = parser.parse_args()
+
+    users = makeUsers(args.users)
+    calls = [(users[call % args.users], keyboardTypes[call % len(keyboardTypes)]) for call in range(args.calls)]
+
+    timerStart = perf_counter()
+    for user, keyboardType in calls:
+        createKeyboardUncached(user, keyboardType)
+    uncached = (perf_counter() - timerStart) / args.calls
+
+    buildKeyboard.cache_clear()
+    timerStart = perf_counter()
+    for user, keyboardType in calls:
+        user.createKeyboard(keyboardType)
+    cached = (perf_counter() - timerStart) / args.calls
+
+    print(f'{args.calls:,} createKeyboard calls over {args.users:,} users:')
+    print(f'  uncached {uncached * 1e6:>10.2f} µs per call')
+    print(f'  cached   {cached * 1e6:>10.2f} µs per call   x{uncached / cached:.1f}   {buildKeyboard.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Logging throughput and memory: the old thread-per-line log() with an unbounded logs list vs scripts.logger
+(one writer thread, bounded ring buffer), both writing to os.devnull. Memory is what stays allocated after the run.
+Also compares a filtered-out call with an eager f-string message and with a lazy callable one.
+Run from the repository root: python -m benchmarks.logger [--events 1000000] [--legacy-events 100000] [--rich]
+"""
+import os
+import tracemalloc
+from argparse import ArgumentParser
+from collections import deque
+from datetime import datetime
+from threading import Thread
+from time import perf_counter
+from typing import Callable, TextIO
+
+from scripts.config import Constants, Logging
+from scripts.logger import Logger
+
+
+def makeLegacyLog(logs: list[str], stream: TextIO) -> Callable[..., None]:
+    def legacyLog(level: str = '', message: object = '', importance_level: int = 0) -> None:
+        if importance_level > 1:
+            return
+        message = str(message)
+
+        def log() -> None:
+            toLog = f'[{level.upper()}] {datetime.now():{Constants.DateTimeForms.forLog}}: {message}'
+            logs.append(toLog)
+            stream.write(f'{toLog}\n')
+        Thread(target=log, name='Logger').start()
+    return legacyLog
+
+
+def measure(name: str, run: Callable[[], None], events: int) -> None:
+    tracemalloc.start()
+    timerStart = perf_counter()
+    run()
+    elapsed = perf_counter() - timerStart
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'  {name:<28} {events / elapsed:>12,.0f} calls/s   retained {retained / 2 ** 20:>8.1f} MiB   '
+          f'peak {peak / 2 ** 20:>8.1f} MiB')
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--legacy-events', type=int, default=100_000)
+    parser.add_argument('--rich', action='store_true', help='render through rich in the new logger')
+    args = parser.parse_args()
+
+    with open(os.devnull, 'w') as devnull:
+        legacyLogs: list[str] = []
+        legacyLog = makeLegacyLog(legacyLogs, devnull)
+
+        def runLegacy() -> None:
+            for event in range(args.legacy_events):
+                legacyLog('info', f'Event {event}')
+
+        logger = Logger(deque(maxlen=Logging.ringBufferSize), max_pending=args.events, use_rich=args.rich, stream=devnull)
+
+        def runLogger() -> None:
+            for event in range(args.events):
+                logger.log('info', f'Event {event}')
+            logger.flush()
+
+        print(f'Logging calls, written to {os.devnull}:')
+        measure(f'thread per line ({args.legacy_events:,})', runLegacy, args.legacy_events)
+        measure(f'scripts.logger ({args.events:,})', runLogger, args.events)
+        print(f'  dropped by scripts.logger: {logger.stats.dropped:,}, legacy logs list length: {len(legacyLogs):,}')
+
+        print('Filtered out calls (importance level above LOG_MODE):')
+        userName = 'Имя Фамилия'
+
+        def runEager() -> None:
+            for event in range(args.events):
+                logger.log('info', f'{userName.upper()} (id: {event}) messaged:\n{event:_}', 10)
+
+        def runLazy() -> None:
+            for event in range(args.events):
+                logger.log('info', lambda: f'{userName.upper()} (id: {event}) messaged:\n{event:_}', 10)
+
+        measure('eager f-string', runEager, args.events)
+        measure('lazy callable', runLazy, args.events)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-event lookup overhead of onEvent at a given number of users: the old set-building checks
+(str(userId) not in {*users}, {*botPrefs.admins}, {*botPrefs.exercisesNamesRu} + list.index) vs the int-keyed
+registry with botPrefs.adminIds and botPrefs.exerciseIndexes.
+Run from the repository root: python -m benchmarks.lookups [--users 100000] [--events 200]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable
+
+from scripts.classes import BaseUser, Users, botPrefs
+
+
+def oldStyleEvent(users: dict[str, BaseUser], user_id: int, exercise_name: str) -> int:
+    if (userIdStr := str(user_id)) not in {*users}:
+        raise KeyError(user_id)
+    user = users[userIdStr]
+    isAdmin = user.id in {*botPrefs.admins}
+    if exercise_name in {*botPrefs.exercisesNamesRu}:
+        return botPrefs.exercisesNamesRu.index(exercise_name) + isAdmin
+    return isAdmin
+
+
+def newStyleEvent(users: Users, user_id: int, exercise_name: str) -> int:
+    if user_id not in users:
+        raise KeyError(user_id)
+    user = users[user_id]
+    isAdmin = user.id in botPrefs.adminIds
+    if exercise_name in botPrefs.exerciseIndexes:
+        return botPrefs.exerciseIndexes[exercise_name] + isAdmin
+    return isAdmin
+
+
+def measure(name: str, event: Callable[[int], int], events: int, users: int, baseline: float | None = None) -> float:
+    timerStart = perf_counter()
+    for eventNumber in range(events):
+        event(eventNumber % users)
+    perEvent = (perf_counter() - timerStart) / events
+    print(f'  {name:<10} {perEvent * 1e6:>12.2f} µs per event{f'   x{baseline / perEvent:,.0f}' if baseline else ''}')
+    return perEvent
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    sharedUser, exerciseName = BaseUser(), botPrefs.exercisesNamesRu[-1]
+    oldUsers = {str(userId): sharedUser for userId in range(args.users)}
+    newUsers = Users.fromDict({})
+    dict.update(newUsers, {userId: sharedUser for userId in range(args.users)})
+
+    print(f'{args.users:,} users, {args.events:,} events:')
+    baseline = measure('old', lambda userId: oldStyleEvent(oldUsers, userId, exerciseName), args.events, args.users)
+    measure('new', lambda userId: newStyleEvent(newUsers, userId, exerciseName), args.events * 1000, args.users, baseline)
+
+
+if __name__ == '__main__':
+    main()
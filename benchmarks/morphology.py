@@ -0,0 +1,66 @@
+"""
+matchNumber cost: pymorphy3 parse + inflect + make_agree_with_number on every call (the old matchNumber)
+vs the memoized scripts.morphology tables, over the time ago vocabulary and numbers 0..--numbers.
+Also checks that both give the same words. Run from the repository root:
+python -m benchmarks.morphology [--numbers 1000] [--rounds 20]
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from pymorphy3 import MorphAnalyzer
+
+from scripts.morphology import Morphology, timeAgoWords
+
+
+inflectsVariants: tuple[tuple[str, ...], ...] = (('nomn', 'sing'), ('accs', 'sing'), ('gent', 'sing'))
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--numbers', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    calls = [(word, number, inflects) for inflects in inflectsVariants for word in timeAgoWords
+             for number in range(args.numbers)]
+
+    timerStart = perf_counter()
+    morph = MorphAnalyzer()
+    analyzerLoad = perf_counter() - timerStart
+    timerStart = perf_counter()
+    expected = [morph.parse(word)[0].inflect({*inflects}).make_agree_with_number(number).word
+                for word, number, inflects in calls]
+    uncached = (perf_counter() - timerStart) / len(calls)
+
+    with TemporaryDirectory() as directory:
+        filePath = Path(directory, 'morphology.json')
+        morphology = Morphology(filePath)
+        timerStart = perf_counter()
+        for word, number, inflects in calls[:1]:
+            morphology.agree(word, number, inflects)
+        firstUse = perf_counter() - timerStart
+        mismatches = sum(morphology.agree(word, number, inflects) != expectedWord
+                         for (word, number, inflects), expectedWord in zip(calls, expected))
+        timerStart = perf_counter()
+        for _ in range(args.rounds):
+            for word, number, inflects in calls:
+                morphology.agree(word, number, inflects)
+        cached = (perf_counter() - timerStart) / (len(calls) * args.rounds)
+
+        persisted = Morphology(filePath)
+        timerStart = perf_counter()
+        persisted.agree(*calls[0])
+        fromDisk = perf_counter() - timerStart
+
+    print(f'{len(calls):,} (word, number, inflects) combinations, {mismatches} mismatches:')
+    print(f'  MorphAnalyzer load       {analyzerLoad * 1e3:>10.1f} ms')
+    print(f'  pymorphy3 per call       {uncached * 1e6:>10.2f} µs')
+    print(f'  tables per call          {cached * 1e6:>10.2f} µs   x{uncached / cached:,.0f}')
+    print(f'  first use, building      {firstUse * 1e3:>10.1f} ms (analyzer load included)')
+    print(f'  first use, from disk     {fromDisk * 1e3:>10.1f} ms (no analyzer)')
+
+
+if __name__ == '__main__':
+    main()
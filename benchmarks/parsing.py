@@ -0,0 +1,77 @@
+"""
+Fuzzes numeric user input through the old path (eval-based tryParse, then float() again) and scripts.parsing.parseWeight:
+throughput, acceptance and the inputs only one of them accepts. The new parser must never raise anything but ValueError.
+Run from the repository root: python -m benchmarks.parsing [--inputs 200000] [--seed 0]
+"""
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+from typing import Any, Callable
+
+from scripts.parsing import parseWeight
+
+
+def legacyTryParse(value: Any, parse_to: str | type) -> bool:
+    try:
+        eval(f'{parse_to if isinstance(parse_to, str) else parse_to.__name__}({value!r})')
+        return True
+    except Exception:
+        return False
+
+
+def legacyParse(text: str) -> float | None:
+    return float(text) if legacyTryParse(text, float) else None
+
+
+def newParse(text: str) -> float | None:
+    try:
+        return parseWeight(text)
+    except ValueError:
+        return None
+
+
+def makeInputs(count: int, seed: int) -> list[str]:
+    random = Random(seed)
+    alphabet = '0123456789.,+-ekKкгlbs _ '
+    generators: list[Callable[[], str]] = [
+        lambda: str(random.randint(0, 500)),
+        lambda: f'{random.uniform(0, 300):.{random.randint(1, 3)}f}',
+        lambda: f'{random.uniform(0, 300):.1f}'.replace('.', ','),
+        lambda: f'{random.randint(1, 300)}{random.choice(('кг', ' кг', 'kg', 'lb', ' lbs', ' фунтов'))}',
+        lambda: f'{random.randint(1, 9) / 10}k',
+        lambda: random.choice(('inf', 'nan', '-inf', '1e3', '1_000', '0x10', '   ', '', '-5', '99999')),
+        lambda: ''.join(random.choices(alphabet, k=random.randint(1, 12))),
+        lambda: ''.join(chr(random.randint(32, 0x44f)) for _ in range(random.randint(1, 40))),
+    ]
+    return [random.choice(generators)() for _ in range(count)]
+
+
+def measure(name: str, parse: Callable[[str], float | None], inputs: list[str]) -> tuple[float, list[float | None]]:
+    timerStart = perf_counter()
+    results = [parse(text) for text in inputs]
+    elapsed = perf_counter() - timerStart
+    accepted = sum(result is not None for result in results)
+    print(f'  {name:<8} {len(inputs) / elapsed:>12,.0f} inputs/s   accepted {accepted / len(inputs):>6.1%}')
+    return elapsed, results
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--inputs', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    inputs = makeInputs(args.inputs, args.seed)
+    print(f'{args.inputs:,} fuzzed weight inputs:')
+    legacy, legacyResults = measure('eval', legacyParse, inputs)
+    new, newResults = measure('parsing', newParse, inputs)
+    print(f'  x{legacy / new:.1f} faster')
+
+    onlyLegacy = sorted({text for text, old, result in zip(inputs, legacyResults, newResults) if old is not None and result is None})
+    onlyNew = sorted({text for text, old, result in zip(inputs, legacyResults, newResults) if old is None and result is not None})
+    print(f'  accepted only by eval ({len(onlyLegacy):,} distinct), e.g. {onlyLegacy[:8]}')
+    print(f'  accepted only by parsing ({len(onlyNew):,} distinct), e.g. {onlyNew[:8]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+VkRequestsPool benchmark against the local fake VK: chunks of 25 calls sent one after another vs concurrently,
+time to the first usable result and to all of them, every run with a fresh rps budget.
+Run from the repository root: python -m benchmarks.requests_pool [--calls 1000] [--latency-ms 100] [--workers 1 2 4 8]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.fake_vk import startFakeVk
+from scripts.config import ApiLimits
+from libs.vk_api_fast import RateLimiter, VkApi, VkRequestsPool
+
+
+def run(api_url: str, calls: int, workers: int) -> tuple[float, float]:
+    vk = VkApi(token='token', rate_limiter=RateLimiter(ApiLimits.groupRequestsPerSecond), pool_size=ApiLimits.connectionPoolSize)
+    vk.API_URL = api_url
+    pool = VkRequestsPool(vk, max_workers=workers)
+    results = [pool.method('users.get', {'user_ids': userId}) for userId in range(1, calls + 1)]
+    timerStart, firstResult = perf_counter(), []
+    results[0].add_done_callback(lambda result: firstResult.append(perf_counter() - timerStart))
+    pool.execute(wait=False)
+    for result in results:
+        assert result.get(60)[0]['id'] > 0
+    return firstResult[0], perf_counter() - timerStart
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=100.)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server, apiUrl = startFakeVk(args.latency_ms / 1000)
+    try:
+        results = {workers: run(apiUrl, args.calls, workers) for workers in args.workers}
+    finally:
+        server.terminate()
+
+    print(f'{args.calls:,} calls in {-(-args.calls // 25)} executes, {args.latency_ms:g} ms API latency:')
+    for workers, (firstSeconds, totalSeconds) in results.items():
+        print(f'  {workers} worker(s)   first result {firstSeconds * 1e3:>7.0f} ms   all {totalSeconds:>6.2f} s   '
+              f'x{results[args.workers[0]][1] / totalSeconds:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Message routing throughput: the old onMessage dispatch (a match over every command, then an elif chain building sets
+of day labels per message, then a match on the last message) vs the compiled scripts.dialog routing table.
+Handlers only set the reply, so the numbers are the dispatch cost. Run from the repository root:
+python -m benchmarks.routing [--messages 200000] [--days 30]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from scripts.classes import BaseUser, botPrefs
+from scripts.dialog import dialog
+from scripts.routing import MessageContext
+
+
+def legacyRoute(user: BaseUser, response_default: str) -> tuple[str, str]:
+    response, kb, message = response_default.lower(), 'last', ''
+    match response:
+        case 'start' | 'начать':
+            kb, message = 'main', 'Привет'
+        case 'назад':
+            match user.lastKeyboard:
+                case 'days':
+                    kb, message = 'profiles', 'Вы вернулись в меню профилей.'
+                case 'exercises':
+                    kb, message = 'days', 'Вы вернулись в меню дней.'
+                case 'add_exercise':
+                    kb, message = 'exercises', 'Вы вернулись в список упражнений.'
+                case _:
+                    kb, message = 'main', 'Вы вернулись в главное меню.'
+        case '🔚в меню':
+            kb, message = 'main', 'Вы вернулись в главное меню.'
+        case 'профили':
+            kb, message = 'profiles', 'Вы попали в меню профилей.'
+        case 'создать новый профиль':
+            message = 'Введите имя нового профиля.'
+        case 'войти':
+            kb, message = 'days', 'Выберите день тренировки.'
+        case 'переименовать':
+            message = 'Введите новое название профиля.'
+        case 'удалить':
+            kb, message = 'profiles', 'Профиль удалён.'
+        case 'добавить день':
+            message = 'Новый день добавлен.'
+        case 'удалить день':
+            kb, message = 'days', 'День удалён.'
+        case 'начать тренировку':
+            message = 'Функция в разработке.'
+        case 'добавить упражнение':
+            kb, message = 'add_exercise', 'Выберите упражнение для добавления.'
+        case 'упражнения':
+            kb, message = 'exercise_list', 'Вы попали в меню упражнений.'
+        case '[р] подходы' | '[о] подходы' | '[р] повторения' | '[о] повторения' | '[р] вес' | '[о] вес' | 'заметка':
+            message = 'Введите значение.'
+        case 'remove_exercise':
+            kb, message = 'exercises', 'Упражнение удалено из дня.'
+        case _:
+            if user.lastKeyboard == 'days' and response_default in {f'День {day + 1}' for day in range(len(user.currentProfile))}:
+                kb, message = 'exercises', 'Вы попали в список упражнений дня.'
+            elif user.lastKeyboard == 'exercise_list' and response_default in botPrefs.exerciseIndexes:
+                kb, message = 'exercise_actions', 'Выберите действие с упражнением.'
+            elif user.lastKeyboard == 'add_exercise' and response_default in botPrefs.exerciseIndexes:
+                kb, message = 'exercise_actions_extended', 'Упражнение добавлено.'
+            elif user.lastKeyboard == 'exercises' and response_default in botPrefs.exerciseIndexes:
+                kb, message = 'exercise_actions_extended', 'Выберите действие с упражнением.'
+            elif user.lastKeyboard == 'profiles' and response_default in user.profileNames:
+                kb, message = 'profile_actions', 'Выберите действие с профилем.'
+            match user.lastMessage:
+                case 'Создать новый профиль' | 'Переименовать' | 'Заметка':
+                    message = 'Готово.'
+                case '[Р] Подходы' | '[О] Подходы' | '[Р] Повторения' | '[О] Повторения':
+                    message = 'Изменено.' if response.isdecimal() else 'Вы ввели не целое число.'
+                case '[Р] Вес' | '[О] Вес':
+                    try:
+                        float(response)
+                        message = 'Изменено.'
+                    except ValueError:
+                        message = 'Вы ввели не число.'
+    return kb, message
+
+
+def makeMessages(count: int, days: int) -> list[tuple[BaseUser, str]]:
+    exercisesNames, exercises = botPrefs.exercisesNamesRu, BaseUser().exercises
+    samples = [(('main', ''), 'Профили'), (('main', ''), 'Упражнения'), (('exercises', ''), 'Назад'),
+               (('days', ''), f'День {days}'), (('exercise_list', ''), exercisesNames[-1]),
+               (('main', '[Р] Вес'), '42.5'), (('main', ''), 'неизвестная команда')]
+    messages = []
+    for message in range(count):
+        (lastKeyboard, lastMessage), text = samples[message % len(samples)]
+        messages.append((BaseUser(id=message, profiles=[[[] for _ in range(days)]], lastKeyboard=lastKeyboard,
+                                  lastMessage=lastMessage, exercises=exercises), text))
+    return messages
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    messages = makeMessages(args.messages, args.days)
+    timerStart = perf_counter()
+    for user, text in messages:
+        legacyRoute(user, text)
+    legacy = perf_counter() - timerStart
+
+    timerStart = perf_counter()
+    for user, text in messages:
+        dialog.route(MessageContext(user, text))
+    compiled = perf_counter() - timerStart
+
+    print(f'{args.messages:,} messages, {args.days} days in the profile:')
+    print(f'  match chain {args.messages / legacy:>12,.0f} messages/s')
+    print(f'  compiled    {args.messages / compiled:>12,.0f} messages/s   x{legacy / compiled:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Users (de)serialization: dacite.from_dict / dataclasses.asdict vs the generated decoders and encoders from scripts.classes.
+Builds a users file of --users users, then decodes it with every decoder and encodes the result with every encoder.
+Run from the repository root: python -m benchmarks.serialization [--users 100000]
+"""
+from argparse import ArgumentParser
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable
+
+from ujson import loads
+
+from scripts.classes import BaseUser, Users, getDecoder, getEncoder
+
+
+def makeUsersFile(count: int, file_path: Path) -> None:
+    users = Users.fromDict({})
+    for userId in range(1, count + 1):
+        user = BaseUser(id=userId, firstName='Имя', lastName='Фамилия', profileNames=['Профиль'],
+                        profiles=[[['Отжимания', 'Жим лёжа'], ['Становая тяга']]])
+        user.exercises[userId % len(user.exercises)].mainApproaches.weight = userId % 100 + .5
+        dict.__setitem__(users, userId, user)
+    users.toFile(file_path)
+
+
+def measure(name: str, function: Callable[[], Any], count: int, baseline: float | None = None) -> float:
+    timerStart = perf_counter()
+    function()
+    elapsed = perf_counter() - timerStart
+    print(f'  {name:<22} {elapsed:>8.3f} s   {count / elapsed:>10,.0f} users/s'
+          f'{f'   x{baseline / elapsed:.1f}' if baseline else ''}')
+    return elapsed
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    args = parser.parse_args()
+
+    try:
+        from dacite import from_dict
+    except ImportError:
+        from_dict = None
+
+    with TemporaryDirectory() as folder:
+        filePath = Path(folder, 'users.json')
+        makeUsersFile(args.users, filePath)
+        with open(filePath) as file:
+            userDicts: dict[str, Any] = loads(file.read())
+
+    strictDecoder, trustedDecoder, encoder = getDecoder(BaseUser), getDecoder(BaseUser, strict=False), getEncoder(BaseUser)
+    print(f'Decoding {args.users:,} users:')
+    baseline = None
+    if from_dict is not None:
+        baseline = measure('dacite.from_dict', lambda: [from_dict(BaseUser, userDict) for userDict in userDicts.values()], args.users)
+    else:
+        print('  dacite is not installed, skipping the baseline')
+    measure('generated, strict', lambda: [strictDecoder(userDict) for userDict in userDicts.values()], args.users, baseline)
+    measure('generated, trusted', lambda: [trustedDecoder(userDict) for userDict in userDicts.values()], args.users, baseline)
+
+    users = [trustedDecoder(userDict) for userDict in userDicts.values()]
+    print(f'Encoding {args.users:,} users:')
+    baseline = measure('dataclasses.asdict', lambda: [asdict(user) for user in users], args.users)
+    measure('generated', lambda: [encoder(user) for user in users], args.users, baseline)
+
+
+if __name__ == '__main__':
+    main()
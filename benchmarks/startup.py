@@ -0,0 +1,110 @@
+"""
+Time to first poll, CI style: a fresh interpreter imports the bot modules, loads --users users from users.json,
+starts the outbox, gets a long poll server from a local fake VK and makes the first long poll request.
+--eager additionally imports what used to be imported eagerly (pymorphy3 with its dictionaries, rich, emoji,
+asyncio with the async API, tendo). Exits with 1 if the lazy startup median is over the budget.
+Run from the repository root: python -m benchmarks.startup [--users 10000] [--runs 5] [--budget 3]
+"""
+import sys
+from time import perf_counter
+
+timerStart = perf_counter()
+
+from argparse import ArgumentParser
+from pathlib import Path
+from statistics import median
+from subprocess import run
+from tempfile import TemporaryDirectory
+
+from ujson import dumps, loads
+
+
+def child(api_url: str, directory: str, eager: bool) -> None:
+    from scripts.startup import StartupTimer
+    startup = StartupTimer()
+    startup.timerStart = startup._last = timerStart
+    if eager:
+        import asyncio
+        import emoji
+        import rich.console
+        import tendo.singleton
+        import libs.vk_api_fast.async_api
+        from pymorphy3 import MorphAnalyzer
+        MorphAnalyzer()
+    from scripts.config import ApiLimits, LongPolling
+    from scripts.classes import BaseUser, Users
+    from scripts.functions import log
+    from scripts.dialog import dialog
+    from scripts.outbox import Outbox, OutboxJournal
+    from scripts.checkpoint import LongPollCheckpoint
+    from scripts.dispatcher import LaneDispatcher
+    from libs.vk_api_fast import RateLimiter, VkApi
+    from libs.vk_api_fast.bot_longpoll import VkBotLongPoll
+    startup.mark('imports')
+
+    users = Users.fromFile(Path(directory, 'users.json'), user_class=BaseUser, journal_path=Path(directory, 'users.journal'))
+    startup.mark('users loaded')
+
+    vk = VkApi(token='token', rate_limiter=RateLimiter(ApiLimits.groupRequestsPerSecond))
+    vk.API_URL = api_url
+    outbox = Outbox(vk, journal=OutboxJournal(Path(directory, 'outbox.journal')))
+    outbox.start()
+    startup.mark('outbox started')
+
+    longpoll = VkBotLongPoll(vk, 1, wait=LongPolling.waitSeconds)
+    startup.mark('long poll server')
+    longpoll.check()
+    startup.mark('first poll')
+    outbox.stop()
+    print(dumps({'phases': startup.phases, 'total': startup.elapsed, 'users': len(users)}))
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=None, help='seconds, Startup.firstPollBudgetSeconds by default')
+    parser.add_argument('--child', nargs=2, metavar=('API_URL', 'DIRECTORY'), help='internal')
+    parser.add_argument('--eager', action='store_true', help='internal')
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child, args.eager)
+        return
+
+    from benchmarks.fake_vk import startFakeVk
+    from scripts.classes import BaseUser
+    from scripts.config import Startup
+
+    budget = args.budget if args.budget is not None else Startup.firstPollBudgetSeconds
+    server, apiUrl = startFakeVk()
+    try:
+        with TemporaryDirectory() as directory:
+            user = BaseUser().toDict
+            with open(Path(directory, 'users.json'), 'w') as file:
+                file.write(dumps({str(userId): {**user, 'id': userId} for userId in range(args.users)}, ensure_ascii=False))
+            results: dict[str, list[dict]] = {'lazy': [], 'eager': []}
+            for _ in range(args.runs):
+                for mode in results:
+                    process = run([sys.executable, '-m', 'benchmarks.startup', '--child', apiUrl, directory,
+                                   *(('--eager',) if mode == 'eager' else ())],
+                                  capture_output=True, text=True, cwd=Path(__file__).parent.parent)
+                    if process.returncode:
+                        sys.exit(f'Startup failed:\n{process.stderr}')
+                    results[mode].append(loads(process.stdout.strip().splitlines()[-1]))
+    finally:
+        server.terminate()
+
+    print(f'Time to first poll with {args.users:,} users, median of {args.runs} runs:')
+    for mode, runs in results.items():
+        phases = ', '.join(f'{phase} {median(run_['phases'][index][1] for run_ in runs) * 1e3:.0f} ms'
+                           for index, (phase, _) in enumerate(runs[0]['phases']))
+        print(f'  {mode:<6} {median(run_['total'] for run_ in runs) * 1e3:>8.0f} ms   ({phases})')
+    lazyMedian = median(run_['total'] for run_ in results['lazy'])
+    if lazyMedian > budget:
+        print(f'FAIL: {lazyMedian:.3f} s is over the {budget:g} s budget')
+        sys.exit(1)
+    print(f'OK: {lazyMedian:.3f} s is within the {budget:g} s budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Users persistence benchmark: full toFile() rewrite vs incremental flush() of dirty users only.
+Every key points at the same BaseUser instance so 1M users fit in memory; serialization cost is unchanged by that.
+Run from the repository root: python -m benchmarks.users_flush [--users 1000 10000 100000 1000000] [--dirty 100]
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from scripts.classes import BaseUser, Users
+
+
+def makeUsers(count: int, folder: Path) -> Users:
+    sharedUser = BaseUser(id=1, profileNames=['Профиль'], profiles=[[['Отжимания', 'Жим лёжа']]])
+    users = Users.fromDict({})
+    dict.update(users, {userId: sharedUser for userId in range(count)})
+    users.snapshotPath, users.journalPath = Path(folder, 'users.json'), Path(folder, 'users.journal')
+    return users
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--dirty', type=int, default=100)
+    parser.add_argument('--flushes', type=int, default=20)
+    parser.add_argument('--full-rewrite-limit', type=int, default=100_000,
+                        help='skip the full rewrite baseline above this many users')
+    args = parser.parse_args()
+
+    print(f'{'users':>10} {'full rewrite':>14} {'flush':>12}   ({args.dirty} dirty users per flush)')
+    for count in args.users:
+        with TemporaryDirectory() as folder:
+            users = makeUsers(count, Path(folder))
+            fullRewrite = '-'
+            if count <= args.full_rewrite_limit:
+                timerStart = perf_counter()
+                users.toFile(users.snapshotPath)
+                fullRewrite = f'{(perf_counter() - timerStart) * 1000:.2f} ms'
+            elapsed = 0.
+            for flushNumber in range(args.flushes):
+                for userId in range(flushNumber * args.dirty, (flushNumber + 1) * args.dirty):
+                    users.markDirty(userId % count)
+                timerStart = perf_counter()
+                users.flush()
+                elapsed += perf_counter() - timerStart
+            print(f'{count:>10,} {fullRewrite:>14} {elapsed / args.flushes * 1000:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@
 """
 from .enums import *
 from .exceptions import *
+from .rate_limiter import RateLimiter, TokenBucket
 from .requests_pool import VkRequestsPool, vk_request_one_param_pool
 from .tools import VkTools
 from .upload import VkUpload
@@ -16,3 +17,13 @@ from .vk_api import VkApi
 __author__ = 'python273'
 __version__ = '11.9.9'
 __email__ = 'vk_api@python273.pw'
+
+
+def __getattr__(name):
+    """ Асинхронный API импортируется при первом обращении,
+        чтобы не загружать asyncio при импорте пакета
+    """
+    if name in ('AsyncVkApi', 'AsyncVkRequestsPool'):
+        from . import async_api
+        return getattr(async_api, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
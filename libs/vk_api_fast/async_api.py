@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+:license: Apache License, Version 2.0, see LICENSE file
+"""
+
+import asyncio
+import logging
+
+from .async_http import AsyncHttpClient
+from .bot_longpoll import AdaptiveWaitMixin, VkBotLongPoll
+from .exceptions import *
+from .requests_pool import (
+    PoolRequest, RequestResult, check_one_method, set_pool_results,
+    vk_many_methods_code, vk_one_method
+)
+from .vk_api import VkApi
+
+
+class AsyncVkApi(object):
+    """ Асинхронный вариант :class:`VkApi` для работы с access_token.
+        Запросы выполняются на одном event loop через
+        :class:`async_http.AsyncHttpClient` с keep-alive соединениями
+
+    :param token: access_token
+    :type token: str
+
+    :param api_version: Версия API
+    :type api_version: str
+
+    :param rate_limiter: Ограничитель частоты запросов
+        (:class:`rate_limiter.RateLimiter`)
+
+    :param pool_size: Максимальное количество соединений с одним хостом
+    :type pool_size: int
+
+    :param http: Кастомный HTTP клиент
+    :type http: :class:`async_http.AsyncHttpClient`
+
+    :param rps_retries: сколько раз повторять запрос при ошибке
+        "Слишком много запросов в секунду"
+    :type rps_retries: int
+
+    :param rps_backoff: задержка перед первым повтором в секундах,
+        каждый следующий ждёт вдвое дольше
+    :type rps_backoff: float
+    """
+
+    API_URL = VkApi.API_URL
+
+    def __init__(self, token=None, api_version='5.92', rate_limiter=None,
+                 pool_size=10, http=None, rps_retries=5, rps_backoff=0.5):
+        self.token = {'access_token': token}
+        self.api_version = api_version
+        self.rate_limiter = rate_limiter
+        self.rps_retries = rps_retries
+        self.rps_backoff = rps_backoff
+
+        self.http = http or AsyncHttpClient(pool_size=pool_size)
+
+        self.logger = logging.getLogger('vk_api')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.close()
+
+    async def close(self):
+        await self.http.close()
+
+    def get_api(self):
+        """ Возвращает AsyncVkApiMethod(self)
+
+            Позволяет обращаться к методам API как к обычным классам.
+            Например await vk.wall.get(...)
+        """
+
+        return AsyncVkApiMethod(self)
+
+    async def method(self, method, values=None, raw=False):
+        """ Вызов метода API
+
+        :param method: название метода
+        :type method: str
+
+        :param values: параметры
+        :type values: dict
+
+        :param raw: при False возвращает `response['response']`
+                    при True возвращает `response`
+        :type raw: bool
+        """
+
+        values = values.copy() if values else {}
+
+        if 'v' not in values:
+            values['v'] = self.api_version
+
+        if self.token:
+            values['access_token'] = self.token['access_token']
+
+        for attempt in range(self.rps_retries + 1):
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.delay(
+                    method, values.get('access_token')
+                )
+
+                if delay:
+                    await asyncio.sleep(delay)
+
+            response = await self.http.post(self.API_URL + method, values)
+
+            if not response.ok:
+                raise ApiHttpError(self, method, values, raw, response)
+
+            response = response.json()
+
+            if 'error' not in response:
+                return response if raw else response['response']
+
+            error = ApiError(self, method, values, raw, response['error'])
+
+            if error.code != TOO_MANY_RPS_CODE or attempt == self.rps_retries:
+                raise error
+
+            self.logger.warning(
+                'Too many requests per second, retrying {} in {:.1f} s'.format(
+                    method, self.rps_backoff * 2 ** attempt
+                )
+            )
+            await asyncio.sleep(self.rps_backoff * 2 ** attempt)
+
+
+class AsyncVkApiMethod(object):
+    """ Дает возможность обращаться к методам API через:
+
+    >>> vk = AsyncVkApiMethod(...)
+    >>> await vk.wall.getById(posts='...')
+    или
+    >>> await vk.wall.get_by_id(posts='...')
+    """
+
+    __slots__ = ('_vk', '_method')
+
+    def __init__(self, vk, method=None):
+        self._vk = vk
+        self._method = method
+
+    def __getattr__(self, method):
+        if '_' in method:
+            m = method.split('_')
+            method = m[0] + ''.join(i.title() for i in m[1:])
+
+        return AsyncVkApiMethod(
+            self._vk,
+            (self._method + '.' if self._method else '') + method
+        )
+
+    def __call__(self, **kwargs):
+        for k, v in kwargs.items():
+            if isinstance(v, (list, tuple)):
+                kwargs[k] = ','.join(str(x) for x in v)
+
+        return self._vk.method(self._method, kwargs)
+
+
+class AsyncVkRequestsPool(object):
+    """ Асинхронный вариант :class:`requests_pool.VkRequestsPool`.
+        Запросы execute по 25 вызовов отправляются одновременно
+
+    >>> async with AsyncVkRequestsPool(vk) as pool:
+    ...     result = pool.method('users.get', {'user_ids': 1})
+    >>> result.result
+
+    :param vk_session: Объект :class:`AsyncVkApi`
+    """
+
+    __slots__ = ('vk_session', 'pool')
+
+    def __init__(self, vk_session):
+        self.vk_session = vk_session
+        self.pool = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.execute()
+
+    def method(self, method, values=None):
+        """ Добавляет запрос в пул.
+            Возвращаемое значение будет содержать результат после закрытия пула.
+
+        :param method: метод
+        :type method: str
+
+        :param values: параметры
+        :type values: dict
+
+        :rtype: RequestResult
+        """
+
+        result = RequestResult()
+        self.pool.append(PoolRequest(method, values or {}, result))
+
+        return result
+
+    async def execute(self):
+        """ Выполняет все находящиеся в пуле запросы и отчищает пул """
+
+        pool, self.pool = self.pool, []
+
+        await asyncio.gather(*(
+            self._execute_chunk(pool[i:i + 25]) for i in range(0, len(pool), 25)
+        ))
+
+    async def _execute_chunk(self, cur_pool):
+        one_method = check_one_method(cur_pool)
+
+        if one_method:
+            code = vk_one_method.compile({
+                'method': one_method,
+                'values': [i.values for i in cur_pool]
+            })
+        else:
+            code = vk_many_methods_code(cur_pool)
+
+        response_raw = await self.vk_session.method(
+            'execute', {'code': code}, raw=True
+        )
+
+        set_pool_results(cur_pool, response_raw)
+
+
+class AsyncVkBotLongPoll(AdaptiveWaitMixin):
+    """ Асинхронный вариант :class:`bot_longpoll.VkBotLongPoll`
+
+    >>> async for event in AsyncVkBotLongPoll(vk, group_id).listen():
+    ...     ...
+
+    :param vk: объект :class:`AsyncVkApi`
+    :param group_id: id группы
+    :param wait: время ожидания (в секундах, не больше MAX_WAIT)
+    :param adaptive: см. :class:`bot_longpoll.VkBotLongPoll`
+    :param min_wait: время ожидания при потоке событий
+    :param max_backoff: максимальная задержка перед повтором после ошибок
+    :param ts: номер последнего обработанного события
+    """
+
+    __slots__ = (
+        'vk', 'wait', 'min_wait', 'adaptive', 'current_wait', 'max_backoff',
+        'group_id', 'url', 'key', 'server', 'ts',
+        'stats', '_failures'
+    )
+
+    CLASS_BY_EVENT_TYPE = VkBotLongPoll.CLASS_BY_EVENT_TYPE
+    DEFAULT_EVENT_CLASS = VkBotLongPoll.DEFAULT_EVENT_CLASS
+
+    def __init__(self, vk, group_id, wait=25, adaptive=True, min_wait=1,
+                 max_backoff=60, ts=None):
+        self.vk = vk
+        self.group_id = group_id
+        self._init_wait(wait, min_wait, adaptive, max_backoff)
+
+        self.url = None
+        self.key = None
+        self.server = None
+        self.ts = ts
+
+    def _parse_event(self, raw_event):
+        event_class = self.CLASS_BY_EVENT_TYPE.get(
+            raw_event['type'],
+            self.DEFAULT_EVENT_CLASS
+        )
+        return event_class(raw_event)
+
+    async def update_longpoll_server(self, update_ts=True):
+        response = await self.vk.method(
+            'groups.getLongPollServer', {'group_id': self.group_id}
+        )
+
+        self.key = response['key']
+        self.server = response['server']
+
+        self.url = self.server
+
+        if update_ts:
+            self.ts = response['ts']
+
+    async def check(self):
+        """ Получить события от сервера один раз
+
+        :returns: `list` of :class:`Event`
+        """
+
+        if self.url is None:
+            await self.update_longpoll_server(update_ts=self.ts is None)
+
+        values = {
+            'act': 'a_check',
+            'key': self.key,
+            'ts': self.ts,
+            'wait': self.current_wait,
+        }
+
+        response = (await self.vk.http.get(
+            self.url,
+            params=values,
+            timeout=self.current_wait + 10
+        )).json()
+
+        if 'failed' not in response:
+            self.ts = response['ts']
+            events = [
+                self._parse_event(raw_event)
+                for raw_event in response['updates']
+            ]
+            self._on_poll(len(events))
+            return events
+
+        delay = self._on_failure(response['failed'])
+
+        if delay:
+            await asyncio.sleep(delay)
+
+        if response['failed'] == 1:
+            self.ts = response['ts']
+
+        elif response['failed'] == 2:
+            await self.update_longpoll_server(update_ts=False)
+
+        elif response['failed'] == 3:
+            await self.update_longpoll_server()
+
+        return []
+
+    async def listen_batches(self):
+        """ Слушать сервер пачками событий. Ошибки сети повторяются с backoff
+
+        :yields: (ts, events), см. :meth:`VkBotLongPoll.listen_batches`
+        """
+
+        while True:
+            ts = self.ts
+
+            try:
+                events = await self.check()
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                delay = self._on_failure()
+                self.vk.logger.warning(
+                    'Long poll request failed ({!r}), retrying in {:.1f} s'.format(e, delay)
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if events:
+                yield ts, events
+
+    async def listen(self):
+        """ Слушать сервер. Ошибки сети повторяются с backoff
+
+        :yields: :class:`Event`
+        """
+
+        async for _, events in self.listen_batches():
+            for event in events:
+                yield event
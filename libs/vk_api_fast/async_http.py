@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+:license: Apache License, Version 2.0, see LICENSE file
+"""
+
+import asyncio
+import ssl
+import urllib.parse
+import zlib
+
+from .utils import json
+
+DEFAULT_USERAGENT = 'Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0'
+
+
+class AsyncHttpResponse(object):
+    """ Ответ HTTP сервера (по интерфейсу похож на :class:`requests.Response`) """
+
+    __slots__ = ('status_code', 'reason', 'headers', 'content')
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncHttpClient(object):
+    """ Минимальный асинхронный HTTP/1.1 клиент с keep-alive
+        и пулом соединений для каждого хоста
+
+    :param pool_size: максимальное количество соединений с одним хостом
+    :type pool_size: int
+
+    :param timeout: таймаут запроса по умолчанию (в секундах)
+    :type timeout: float
+
+    :param headers: заголовки, добавляемые к каждому запросу
+    :type headers: dict
+    """
+
+    __slots__ = (
+        'pool_size', 'timeout', 'headers',
+        '_idle', '_semaphores', '_ssl_context'
+    )
+
+    def __init__(self, pool_size=10, timeout=30, headers=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.headers = {
+            'User-Agent': DEFAULT_USERAGENT,
+            'Accept-Encoding': 'gzip, deflate',
+        }
+        self.headers.update(headers or {})
+
+        self._idle = {}
+        self._semaphores = {}
+        self._ssl_context = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.close()
+
+    async def get(self, url, params=None, **kwargs):
+        return await self.request('GET', url, params=params, **kwargs)
+
+    async def post(self, url, data=None, **kwargs):
+        return await self.request('POST', url, data=data, **kwargs)
+
+    async def request(self, method, url, params=None, data=None,
+                      headers=None, timeout=None):
+        """ Отправить запрос
+
+        :param method: HTTP метод
+        :type method: str
+
+        :param url: адрес
+        :type url: str
+
+        :param params: параметры строки запроса
+        :type params: dict
+
+        :param data: тело запроса (dict будет закодирован как форма)
+        :type data: dict or bytes or str
+
+        :param headers: дополнительные заголовки
+        :type headers: dict
+
+        :param timeout: таймаут (в секундах)
+        :type timeout: float
+
+        :rtype: AsyncHttpResponse
+        """
+
+        parts = urllib.parse.urlsplit(url)
+        use_ssl = parts.scheme == 'https'
+        key = (parts.hostname, parts.port or (443 if use_ssl else 80), use_ssl)
+
+        target = parts.path or '/'
+        query = parts.query
+
+        if params:
+            query = '&'.join(filter(None, (query, urllib.parse.urlencode(params))))
+
+        if query:
+            target += '?' + query
+
+        if isinstance(data, dict):
+            body = urllib.parse.urlencode(data).encode()
+        elif isinstance(data, str):
+            body = data.encode()
+        else:
+            body = data or b''
+
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        request_headers['Host'] = parts.netloc
+        request_headers['Connection'] = 'keep-alive'
+        request_headers['Content-Length'] = str(len(body))
+
+        if isinstance(data, dict):
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        payload = ''.join(
+            ['{} {} HTTP/1.1\r\n'.format(method, target)] +
+            ['{}: {}\r\n'.format(k, v) for k, v in request_headers.items()] +
+            ['\r\n']
+        ).encode('latin-1') + body
+
+        semaphore = self._semaphores.get(key)
+
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.pool_size)
+
+        async with semaphore:
+            return await asyncio.wait_for(
+                self._send(key, payload),
+                self.timeout if timeout is None else timeout
+            )
+
+    async def _send(self, key, payload):
+        while True:
+            connection, reused = await self._acquire(key)
+            reader, writer = connection
+
+            try:
+                writer.write(payload)
+                await writer.drain()
+                response, keep_alive = await self._read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+
+                if reused:  # Соединение закрыто сервером, пока простаивало
+                    continue
+
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            if keep_alive:
+                self._idle.setdefault(key, []).append(connection)
+            else:
+                writer.close()
+
+            return response
+
+    async def _acquire(self, key):
+        idle = self._idle.get(key)
+
+        while idle:
+            reader, writer = idle.pop()
+
+            if not reader.at_eof() and not writer.is_closing():
+                return (reader, writer), True
+
+            writer.close()
+
+        host, port, use_ssl = key
+
+        if use_ssl and self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+
+        connection = await asyncio.open_connection(
+            host, port, ssl=self._ssl_context if use_ssl else None
+        )
+
+        return connection, False
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+
+        if not status_line:
+            raise ConnectionResetError('Connection closed by server')
+
+        version, status_code, *reason = status_line.decode('latin-1').split(' ', 2)
+        status_code = int(status_code)
+
+        headers = {}
+
+        while True:
+            line = await reader.readline()
+
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (
+            headers.get('connection', '').lower() != 'close' and
+            version != 'HTTP/1.0'
+        )
+
+        if status_code in (204, 304) or 100 <= status_code < 200:
+            content = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+
+                if not size:
+                    await reader.readline()
+                    break
+
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        encoding = headers.get('content-encoding', '').lower()
+
+        if encoding == 'gzip':
+            content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            content = zlib.decompress(content)
+
+        reason = reason[0].strip() if reason else ''
+
+        return AsyncHttpResponse(status_code, reason, headers, content), keep_alive
+
+    async def close(self):
+        """ Закрыть все простаивающие соединения """
+
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+
+        self._idle.clear()
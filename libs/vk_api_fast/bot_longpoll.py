@@ -5,12 +5,19 @@
 
 :copyright: (c) 2019 python273
 """
+import time
 from enum import Enum
 
 import requests
 
 CHAT_START_ID = int(2E9)
 
+#: Максимальное время ожидания, которое принимает сервер
+MAX_WAIT = 90
+
+#: Первая задержка перед повтором после ошибки
+BACKOFF_BASE = 0.5
+
 
 class DotDict(dict):
     __getattr__ = dict.get
@@ -178,20 +185,101 @@ class VkBotMessageEvent(VkBotEvent):
             self.chat_id = peer_id - CHAT_START_ID
 
 
-class VkBotLongPoll(object):
+class LongPollStats(object):
+    """ Счётчики запросов к Long Poll серверу """
+
+    __slots__ = ('empty_polls', 'polls_with_events', 'events', 'failed', 'errors')
+
+    def __init__(self):
+        self.empty_polls = 0
+        self.polls_with_events = 0
+        self.events = 0
+        self.failed = {}
+        self.errors = 0
+
+    def __repr__(self):
+        return '<{}(empty_polls={}, polls_with_events={}, events={}, failed={}, errors={})>'.format(
+            type(self).__name__, self.empty_polls, self.polls_with_events,
+            self.events, self.failed, self.errors
+        )
+
+
+class AdaptiveWaitMixin(object):
+    """ Подстраивает время ожидания под поток событий (короткое, когда
+        события идут, длинное, когда их нет) и считает задержку перед
+        повтором после ошибок (ограниченный экспоненциальный backoff)
+    """
+
+    __slots__ = ()
+
+    def _init_wait(self, wait, min_wait, adaptive, max_backoff):
+        self.wait = max(0, min(wait, MAX_WAIT))
+        self.min_wait = max(0, min(min_wait, self.wait))
+        self.adaptive = adaptive
+        self.max_backoff = max_backoff
+
+        self.current_wait = self.wait
+        self.stats = LongPollStats()
+        self._failures = 0
+
+    def _on_poll(self, events_count):
+        self._failures = 0
+
+        if events_count:
+            self.stats.polls_with_events += 1
+            self.stats.events += events_count
+
+            if self.adaptive:
+                self.current_wait = self.min_wait
+        else:
+            self.stats.empty_polls += 1
+
+            if self.adaptive:
+                self.current_wait = min(
+                    self.wait, max(self.current_wait * 2, self.min_wait, 1)
+                )
+
+    def _on_failure(self, failed=None):
+        """ Возвращает задержку перед следующим запросом
+
+        :param failed: код `failed` из ответа сервера, None для ошибок сети
+        """
+
+        if failed is None:
+            self.stats.errors += 1
+        else:
+            self.stats.failed[failed] = self.stats.failed.get(failed, 0) + 1
+
+        self._failures += 1
+
+        if self._failures == 1 and failed is not None:
+            return 0.0
+
+        return min(self.max_backoff, BACKOFF_BASE * 2 ** (self._failures - 1))
+
+
+class VkBotLongPoll(AdaptiveWaitMixin):
     """ Класс для работы с Bots Long Poll сервером
 
     `Подробнее в документации VK API <https://vk.com/dev/bots_longpoll>`__.
 
     :param vk: объект :class:`VkApi`
     :param group_id: id группы
-    :param wait: время ожидания
+    :param wait: время ожидания (в секундах, не больше MAX_WAIT)
+    :param adaptive: уменьшать время ожидания до `min_wait`, пока приходят
+        события, и постепенно увеличивать до `wait`, когда их нет
+    :param min_wait: время ожидания при потоке событий
+    :param max_backoff: максимальная задержка перед повтором после ошибок
+    :param ts: номер последнего обработанного события (например, сохранённый
+        до перезапуска), чтобы получить события, пришедшие после него
     """
 
     __slots__ = (
-        'vk', 'wait', 'group_id',
+        'vk', 'wait', 'min_wait', 'adaptive', 'current_wait', 'max_backoff',
+        'group_id',
         'url', 'session',
-        'key', 'server', 'ts'
+        'key', 'server', 'ts',
+        'stats', '_failures'
     )
 
     #: Классы для событий по типам
@@ -204,19 +292,20 @@ class VkBotLongPoll(object):
     #: Класс для событий
     DEFAULT_EVENT_CLASS = VkBotEvent
 
-    def __init__(self, vk, group_id, wait=0):
+    def __init__(self, vk, group_id, wait=25, adaptive=True, min_wait=1,
+                 max_backoff=60, ts=None):
         self.vk = vk
         self.group_id = group_id
-        self.wait = wait
+        self._init_wait(wait, min_wait, adaptive, max_backoff)
 
         self.url = None
         self.key = None
         self.server = None
-        self.ts = None
+        self.ts = ts
 
         self.session = requests.Session()
 
-        self.update_longpoll_server()
+        self.update_longpoll_server(update_ts=ts is None)
 
     def _parse_event(self, raw_event):
         event_class = self.CLASS_BY_EVENT_TYPE.get(
@@ -249,23 +338,30 @@ class VkBotLongPoll(object):
             'act': 'a_check',
             'key': self.key,
             'ts': self.ts,
-            'wait': self.wait,
+            'wait': self.current_wait,
         }
 
         response = self.session.get(
             self.url,
             params=values,
-            timeout=self.wait + 10
+            timeout=self.current_wait + 10
         ).json()
 
         if 'failed' not in response:
             self.ts = response['ts']
-            return [
+            events = [
                 self._parse_event(raw_event)
                 for raw_event in response['updates']
             ]
+            self._on_poll(len(events))
+            return events
+
+        delay = self._on_failure(response['failed'])
 
-        elif response['failed'] == 1:
+        if delay:
+            time.sleep(delay)
+
+        if response['failed'] == 1:
             self.ts = response['ts']
 
         elif response['failed'] == 2:
@@ -276,11 +372,35 @@ class VkBotLongPoll(object):
 
         return []
 
+    def listen_batches(self):
+        """ Слушать сервер пачками событий. Ошибки сети повторяются с backoff
+
+        :yields: (ts, events) - ts, с которым был сделан запрос,
+            и полученные события. После получения пачки `self.ts`
+            указывает на следующую
+        """
+
+        while True:
+            ts = self.ts
+
+            try:
+                events = self.check()
+            except (requests.RequestException, ValueError) as e:
+                delay = self._on_failure()
+                self.vk.logger.warning(
+                    'Long poll request failed ({!r}), retrying in {:.1f} s'.format(e, delay)
+                )
+                time.sleep(delay)
+                continue
+
+            if events:
+                yield ts, events
+
     def listen(self):
-        """ Слушать сервер
+        """ Слушать сервер. Ошибки сети повторяются с backoff
 
         :yields: :class:`Event`
         """
 
-        while True:
-            yield from self.check()
+        for _, events in self.listen_batches():
+            yield from events
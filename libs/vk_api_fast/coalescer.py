@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+:license: Apache License, Version 2.0, see LICENSE file
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .exceptions import ApiError
+from .requests_pool import check_one_method, vk_many_methods, vk_one_method
+
+CoalescedRequest = namedtuple(
+    'CoalescedRequest', ['method', 'values', 'future', 'created']
+)
+
+CoalescerStats = namedtuple('CoalescerStats', ['calls', 'round_trips'])
+
+
+class VkRequestsCoalescer(object):
+    """ Объединяет вызовы методов API, сделанные за короткий промежуток
+        времени, в один запрос execute (до 25 вызовов).
+        Каждый вызов получает свой :class:`concurrent.futures.Future`,
+        ошибки из execute_errors сопоставляются вызовам по порядку
+
+    :param vk: объект :class:`VkApi`
+
+    :param methods: методы, вызовы которых можно объединять
+    :type methods: list
+
+    :param window: сколько секунд ждать остальные вызовы после первого
+    :type window: float
+
+    :param max_calls: максимальное количество вызовов в одном execute
+    :type max_calls: int
+
+    :param max_workers: сколько execute может выполняться одновременно
+    :type max_workers: int
+    """
+
+    __slots__ = (
+        'vk', 'methods', 'window', 'max_calls',
+        '_pending', '_lock', '_has_pending', '_thread', '_executor',
+        '_closed', '_calls', '_round_trips'
+    )
+
+    def __init__(self, vk, methods, window=0.03, max_calls=25, max_workers=4):
+        self.vk = vk
+        self.methods = frozenset(methods)
+        self.window = window
+        self.max_calls = max_calls
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._has_pending = threading.Condition(self._lock)
+        self._thread = None
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='Execute coalescer'
+        )
+        self._closed = False
+
+        self._calls = 0
+        self._round_trips = 0
+
+    @property
+    def stats(self):
+        """ Количество вызовов и реально отправленных запросов
+
+        :rtype: CoalescerStats
+        """
+
+        return CoalescerStats(self._calls, self._round_trips)
+
+    def submit(self, method, values):
+        """ Добавляет вызов в очередь на объединение
+
+        :param method: метод
+        :type method: str
+
+        :param values: параметры
+        :type values: dict
+
+        :rtype: concurrent.futures.Future
+        """
+
+        future = Future()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Coalescer is closed')
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='Execute coalescer', daemon=True
+                )
+                self._thread.start()
+
+            self._pending.append(
+                CoalescedRequest(method, values, future, time.monotonic())
+            )
+            self._calls += 1
+
+            if len(self._pending) == 1 or len(self._pending) >= self.max_calls:
+                self._has_pending.notify()
+
+        return future
+
+    def close(self):
+        """ Отправляет уже добавленные вызовы, не дожидаясь окна,
+            и останавливает поток и executor
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._has_pending.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._has_pending.wait()
+
+                if not self._pending:
+                    return
+
+                deadline = self._pending[0].created + self.window
+
+                while len(self._pending) < self.max_calls and not self._closed:
+                    timeout = deadline - time.monotonic()
+
+                    if timeout <= 0:
+                        break
+
+                    self._has_pending.wait(timeout)
+
+                batch = self._pending[:self.max_calls]
+                del self._pending[:self.max_calls]
+                self._round_trips += 1
+
+            self._executor.submit(self._execute, batch)
+
+    def _execute(self, batch):
+        if len(batch) == 1:
+            request = batch[0]
+
+            try:
+                request.future.set_result(self.vk.method(
+                    request.method, request.values, coalesce=False
+                ))
+            except Exception as e:
+                request.future.set_exception(e)
+
+            return
+
+        try:
+            one_method = check_one_method(batch)
+
+            if one_method:
+                response_raw = vk_one_method(
+                    self.vk, one_method, [i.values for i in batch]
+                )
+            else:
+                response_raw = vk_many_methods(self.vk, batch)
+
+            response = response_raw['response']
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+
+            return
+
+        response_errors_iter = iter(response_raw.get('execute_errors', []))
+
+        for request, current_response in zip(batch, response):
+            if current_response is not False:
+                request.future.set_result(current_response)
+                continue
+
+            error = next(response_errors_iter, None) or {
+                'error_code': 0, 'error_msg': 'Unknown execute error'
+            }
+            request.future.set_exception(ApiError(
+                self.vk, request.method, request.values, False, error
+            ))
+
+        for request in batch[len(response):]:
+            request.future.set_exception(ApiError(
+                self.vk, request.method, request.values, False,
+                {'error_code': 0, 'error_msg': 'No response in execute'}
+            ))
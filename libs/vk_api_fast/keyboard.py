@@ -5,7 +5,9 @@
 :copyright: (c) 2019 python273
 """
 
+from collections import namedtuple
 from enum import Enum
+from math import ceil
 
 
 from .utils import sjson_dumps
@@ -14,6 +16,8 @@ from .utils import sjson_dumps
 MAX_BUTTONS_ON_LINE = 5
 MAX_DEFAULT_LINES = 10
 MAX_INLINE_LINES = 6
+MAX_DEFAULT_BUTTONS = 40
+MAX_INLINE_BUTTONS = 10
 
 
 class VkKeyboardColor(Enum):
@@ -54,76 +58,115 @@ class VkKeyboardButton(Enum):
     CALLBACK = "callback"
 
 
+#: Кнопка клавиатуры: тип, цвет (None для кнопок без цвета), payload в виде
+#: строки или None и остальные поля action в порядке их вывода
+KeyboardButton = namedtuple(
+    'KeyboardButton', ('type', 'color', 'payload', 'fields')
+)
+
+
 class VkKeyboard(object):
     """ Класс для создания клавиатуры для бота (https://vk.com/dev/bots_docs_3)
+
+    Кнопки хранятся кортежами :class:`KeyboardButton`, JSON собирается за
+    один проход в :meth:`to_json` без пустых строк. Ограничения VK на
+    количество кнопок и строк проверяются при добавлении.
+
     :param one_time: Если True, клавиатура исчезнет после нажатия на кнопку
     :type one_time: bool
+
+    :param inline: Если True, клавиатура будет отображаться внутри сообщения
+    :type inline: bool
     """
 
-    __slots__ = ('one_time', 'lines', 'keyboard', 'inline')
+    __slots__ = ('one_time', 'inline', 'lines', 'buttons_count')
 
     def __init__(self, one_time=False, inline=False):
         self.one_time = one_time
         self.inline = inline
         self.lines = [[]]
+        self.buttons_count = 0
+
+    @property
+    def max_lines(self):
+        return MAX_INLINE_LINES if self.inline else MAX_DEFAULT_LINES
+
+    @property
+    def max_buttons(self):
+        return MAX_INLINE_BUTTONS if self.inline else MAX_DEFAULT_BUTTONS
+
+    @property
+    def lines_count(self):
+        """ Количество непустых строк """
+        return sum(1 for line in self.lines if line)
+
+    def to_json(self):
+        """ Получить json клавиатуры. Пустые строки пропускаются """
+
+        return '{{"one_time":{},"inline":{},"buttons":[{}]}}'.format(
+            'true' if self.one_time else 'false',
+            'true' if self.inline else 'false',
+            ','.join(
+                '[{}]'.format(','.join(map(self._button_to_json, line)))
+                for line in self.lines if line
+            )
+        )
+
+    get_keyboard = to_json
 
-        self.keyboard = {
-            'one_time': self.one_time,
-            'inline': self.inline,
-            'buttons': self.lines
-        }
+    @staticmethod
+    def _button_to_json(button):
+        action = ''.join(
+            ',"{}":{}'.format(name, sjson_dumps(value))
+            for name, value in button.fields
+        )
+        action = '{{"type":"{}","payload":{}{}}}'.format(
+            button.type,
+            'null' if button.payload is None else sjson_dumps(button.payload),
+            action
+        )
 
-    def get_keyboard(self):
-        """ Получить json клавиатуры """
-        return sjson_dumps(self.keyboard)
+        if button.color is None:
+            return '{{"action":{}}}'.format(action)
+
+        return '{{"color":"{}","action":{}}}'.format(button.color, action)
 
     @classmethod
     def get_empty_keyboard(cls):
         """ Получить json пустой клавиатуры.
         Если отправить пустую клавиатуру, текущая у пользователя исчезнет.
         """
-        keyboard = cls()
-        keyboard.keyboard['buttons'] = []
-        return keyboard.get_keyboard()
-
-    def add_button(self, label, color=VkKeyboardColor.SECONDARY, payload=None):
-        """ Добавить кнопку с текстом.
-            Максимальное количество кнопок на строке - MAX_BUTTONS_ON_LINE
-
-        :param label: Надпись на кнопке и текст, отправляющийся при её нажатии.
-        :type label: str
-        :param color: цвет кнопки.
-        :type color: VkKeyboardColor or str
-        :param payload: Параметр для callback api
-        :type payload: str or list or dict
-        """
+        return cls().to_json()
 
+    def _add(self, button_type, color=None, payload=None, fields=(),
+             full_width=False):
         current_line = self.lines[-1]
 
+        if full_width and current_line:
+            raise ValueError(
+                'This type of button takes the entire width of the line'
+            )
+
         if len(current_line) >= MAX_BUTTONS_ON_LINE:
             raise ValueError(f'Max {MAX_BUTTONS_ON_LINE} buttons on a line')
 
-        color_value = color
+        if self.buttons_count >= self.max_buttons:
+            raise ValueError(
+                f'Max {self.max_buttons} buttons for '
+                f'{"inline" if self.inline else "default"} keyboard'
+            )
 
         if isinstance(color, VkKeyboardColor):
-            color_value = color_value.value
+            color = color.value
 
         if payload is not None and not isinstance(payload, str):
             payload = sjson_dumps(payload)
 
-        button_type = VkKeyboardButton.TEXT.value
+        current_line.append(KeyboardButton(button_type, color, payload, fields))
+        self.buttons_count += 1
 
-        current_line.append({
-            'color': color_value,
-            'action': {
-                'type': button_type,
-                'payload': payload,
-                'label': label,
-            }
-        })
-
-    def add_callback_button(self, label, color=VkKeyboardColor.SECONDARY, payload=None):
-        """ Добавить callback-кнопку с текстом.
+    def add_button(self, label, color=VkKeyboardColor.SECONDARY, payload=None):
+        """ Добавить кнопку с текстом.
             Максимальное количество кнопок на строке - MAX_BUTTONS_ON_LINE
 
         :param label: Надпись на кнопке и текст, отправляющийся при её нажатии.
@@ -134,29 +177,21 @@ class VkKeyboard(object):
         :type payload: str or list or dict
         """
 
-        current_line = self.lines[-1]
+        self._add(VkKeyboardButton.TEXT.value, color, payload, (('label', label),))
 
-        if len(current_line) >= MAX_BUTTONS_ON_LINE:
-            raise ValueError(f'Max {MAX_BUTTONS_ON_LINE} buttons on a line')
-
-        color_value = color
-
-        if isinstance(color, VkKeyboardColor):
-            color_value = color_value.value
-
-        if payload is not None and not isinstance(payload, str):
-            payload = sjson_dumps(payload)
+    def add_callback_button(self, label, color=VkKeyboardColor.SECONDARY, payload=None):
+        """ Добавить callback-кнопку с текстом.
+            Максимальное количество кнопок на строке - MAX_BUTTONS_ON_LINE
 
-        button_type = VkKeyboardButton.CALLBACK.value
+        :param label: Надпись на кнопке и текст, отправляющийся при её нажатии.
+        :type label: str
+        :param color: цвет кнопки.
+        :type color: VkKeyboardColor or str
+        :param payload: Параметр для callback api
+        :type payload: str or list or dict
+        """
 
-        current_line.append({
-            'color': color_value,
-            'action': {
-                'type': button_type,
-                'payload': payload,
-                'label': label,
-            }
-        })
+        self._add(VkKeyboardButton.CALLBACK.value, color, payload, (('label', label),))
 
     def add_location_button(self, payload=None):
         """ Добавить кнопку с местоположением.
@@ -166,24 +201,7 @@ class VkKeyboard(object):
         :type payload: str or list or dict
         """
 
-        current_line = self.lines[-1]
-
-        if len(current_line) != 0:
-            raise ValueError(
-                'This type of button takes the entire width of the line'
-            )
-
-        if payload is not None and not isinstance(payload, str):
-            payload = sjson_dumps(payload)
-
-        button_type = VkKeyboardButton.LOCATION.value
-
-        current_line.append({
-            'action': {
-                'type': button_type,
-                'payload': payload
-            }
-        })
+        self._add(VkKeyboardButton.LOCATION.value, payload=payload, full_width=True)
 
     def add_vkpay_button(self, hash, payload=None):
         """ Добавить кнопку с оплатой с помощью VKPay.
@@ -196,25 +214,8 @@ class VkKeyboard(object):
         :type payload: str or list or dict
         """
 
-        current_line = self.lines[-1]
-
-        if len(current_line) != 0:
-            raise ValueError(
-                'This type of button takes the entire width of the line'
-            )
-
-        if payload is not None and not isinstance(payload, str):
-            payload = sjson_dumps(payload)
-
-        button_type = VkKeyboardButton.VKPAY.value
-
-        current_line.append({
-            'action': {
-                'type': button_type,
-                'payload': payload,
-                'hash': hash
-            }
-        })
+        self._add(VkKeyboardButton.VKPAY.value, payload=payload,
+                  fields=(('hash', hash),), full_width=True)
 
     def add_vkapps_button(self, app_id, owner_id, label, hash, payload=None):
         """ Добавить кнопку с приложением VK Apps.
@@ -234,28 +235,10 @@ class VkKeyboard(object):
         :type payload: str or list or dict
         """
 
-        current_line = self.lines[-1]
-
-        if len(current_line) != 0:
-            raise ValueError(
-                'This type of button takes the entire width of the line'
-            )
-
-        if payload is not None and not isinstance(payload, str):
-            payload = sjson_dumps(payload)
-
-        button_type = VkKeyboardButton.VKAPPS.value
-
-        current_line.append({
-            'action': {
-                'type': button_type,
-                'app_id': app_id,
-                'owner_id': owner_id,
-                'label': label,
-                'payload': payload,
-                'hash': hash
-            }
-        })
+        self._add(VkKeyboardButton.VKAPPS.value, payload=payload, fields=(
+            ('app_id', app_id), ('owner_id', owner_id),
+            ('label', label), ('hash', hash)
+        ), full_width=True)
 
     def add_openlink_button(self, label, link, payload=None):
         """ Добавить кнопку с ссылкой
@@ -268,36 +251,76 @@ class VkKeyboard(object):
         :param payload: Параметр для callback api
         :type payload: str or list or dict
         """
-        current_line = self.lines[-1]
 
-        if len(current_line) >= MAX_BUTTONS_ON_LINE:
-            raise ValueError(f'Max {MAX_BUTTONS_ON_LINE} buttons on a line')
-
-        if payload is not None and not isinstance(payload, str):
-            payload = sjson_dumps(payload)
-
-        button_type = VkKeyboardButton.OPENLINK.value
-
-        current_line.append({
-            'action': {
-                'type': button_type,
-                'link': link,
-                'label': label,
-                'payload': payload
-            }
-        })
+        self._add(VkKeyboardButton.OPENLINK.value, payload=payload,
+                  fields=(('link', link), ('label', label)))
 
     def add_line(self):
         """ Создаёт новую строку, на которой можно размещать кнопки.
+            Пустая текущая строка переиспользуется.
             Максимальное количество строк:
                Стандартное отображение - MAX_DEFAULT_LINES;
                Inline-отображение - MAX_INLINE_LINES.
         """
-        if self.inline:
-            if len(self.lines) >= MAX_INLINE_LINES:
-                raise ValueError(f'Max {MAX_INLINE_LINES} lines for inline keyboard')
-        else:
-            if len(self.lines) >= MAX_DEFAULT_LINES:
-                raise ValueError(f'Max {MAX_DEFAULT_LINES} lines for default keyboard')
+        if not self.lines[-1]:
+            return
+
+        if len(self.lines) >= self.max_lines:
+            raise ValueError(
+                f'Max {self.max_lines} lines for '
+                f'{"inline" if self.inline else "default"} keyboard'
+            )
 
         self.lines.append([])
+
+    def add_paginated_buttons(self, labels, color=VkKeyboardColor.SECONDARY,
+                              page=0, columns=1, reserved_lines=0,
+                              reserved_buttons=0, previous_label='⬅',
+                              next_label='➡', page_command='page'):
+        """ Добавить кнопки с текстом по columns на строке, начиная с новой
+            строки. Если все кнопки не помещаются в ограничения VK с учётом
+            reserved_lines строк и reserved_buttons кнопок, которые будут
+            добавлены после, добавляется только страница page и строка
+            навигации с кнопками, payload которых [page_command, номер страницы]
+
+        :param labels: Надписи кнопок
+        :type labels: list[str]
+        :param page: Номер страницы, начиная с 0
+        :type page: int
+        :param columns: Количество кнопок на строке
+        :type columns: int
+
+        :returns: (номер показанной страницы, количество страниц)
+        :rtype: tuple[int, int]
+        """
+
+        self.add_line()
+        columns = max(1, min(columns, MAX_BUTTONS_ON_LINE))
+        free_lines = self.max_lines - len(self.lines) + 1 - reserved_lines
+        free_buttons = self.max_buttons - self.buttons_count - reserved_buttons
+        capacity = min(free_lines * columns, free_buttons)
+        pages = 1
+
+        if len(labels) > capacity:
+            capacity = min((free_lines - 1) * columns, free_buttons - 2)
+
+            if capacity <= 0:
+                raise ValueError('No space left for paginated buttons')
+
+            pages = ceil(len(labels) / capacity)
+
+        page = max(0, min(page, pages - 1))
+
+        for counter, label in enumerate(labels[page * capacity:(page + 1) * capacity]):
+            if counter and not counter % columns:
+                self.add_line()
+            self.add_button(label, color)
+
+        if pages > 1:
+            self.add_line()
+            if page:
+                self.add_button(previous_label, VkKeyboardColor.PRIMARY, [page_command, page - 1])
+            if page < pages - 1:
+                self.add_button(next_label, VkKeyboardColor.PRIMARY, [page_command, page + 1])
+
+        return page, pages
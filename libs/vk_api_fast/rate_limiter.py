@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+:license: Apache License, Version 2.0, see LICENSE file
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+RateLimiterStats = namedtuple(
+    'RateLimiterStats',
+    ['calls', 'waited_calls', 'total_wait', 'max_wait', 'wait_by_method']
+)
+
+
+class TokenBucket(object):
+    """ Token bucket. Токены резервируются сразу, поэтому несколько потоков
+        могут ждать свою очередь одновременно, не удерживая блокировку
+
+    :param rate: скорость пополнения (токенов в секунду)
+    :type rate: float
+
+    :param burst: ёмкость ведра (сколько запросов можно сделать разом)
+    :type burst: int
+    """
+
+    __slots__ = ('rate', 'burst', '_tokens', '_updated', '_lock')
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """ Резервирует токены и возвращает время (в секундах),
+            через которое их можно использовать
+
+        :param tokens: количество токенов
+        :type tokens: int
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """ Ограничитель частоты запросов к API на основе token bucket.
+        Для каждого токена создаётся своё ведро, для отдельных методов
+        можно задать дополнительные ограничения
+
+    :param rate: запросов в секунду на один токен
+        (3 для пользователя, 20 для группы)
+    :type rate: float
+
+    :param burst: сколько запросов можно отправить разом
+    :type burst: int
+
+    :param method_limits: ограничения для методов: {метод: (rate, burst)}
+    :type method_limits: dict
+    """
+
+    __slots__ = (
+        'rate', 'burst', 'method_limits',
+        '_token_buckets', '_method_buckets', '_lock',
+        '_calls', '_waited_calls', '_total_wait', '_max_wait',
+        '_wait_by_method'
+    )
+
+    def __init__(self, rate=20, burst=None, method_limits=None):
+        self.rate = rate
+        self.burst = burst
+        self.method_limits = dict(method_limits or {})
+
+        self._token_buckets = {}
+        self._method_buckets = {}
+        self._lock = threading.Lock()
+
+        self._calls = 0
+        self._waited_calls = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._wait_by_method = {}
+
+    def _get_buckets(self, method, token):
+        with self._lock:
+            buckets = [self._token_buckets.get(token)]
+
+            if buckets[0] is None:
+                buckets[0] = self._token_buckets[token] = TokenBucket(
+                    self.rate, self.burst
+                )
+
+            if method in self.method_limits:
+                method_bucket = self._method_buckets.get((token, method))
+
+                if method_bucket is None:
+                    method_bucket = TokenBucket(*self.method_limits[method])
+                    self._method_buckets[(token, method)] = method_bucket
+
+                buckets.append(method_bucket)
+
+            return buckets
+
+    def delay(self, method, token=None):
+        """ Резервирует место под запрос и возвращает время ожидания
+            в секундах, не засыпая
+
+        :param method: метод
+        :type method: str
+
+        :param token: access_token, от имени которого идёт запрос
+        :type token: str
+        """
+
+        wait = max(
+            bucket.reserve() for bucket in self._get_buckets(method, token)
+        )
+
+        with self._lock:
+            self._calls += 1
+
+            if wait:
+                self._waited_calls += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+                self._wait_by_method[method] = (
+                    self._wait_by_method.get(method, 0.0) + wait
+                )
+
+        return wait
+
+    def acquire(self, method, token=None):
+        """ Ждёт, пока можно будет отправить запрос.
+            Возвращает время ожидания в секундах
+
+        :param method: метод
+        :type method: str
+
+        :param token: access_token, от имени которого идёт запрос
+        :type token: str
+        """
+
+        wait = self.delay(method, token)
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+    @property
+    def stats(self):
+        """ Статистика ожидания токенов
+
+        :rtype: RateLimiterStats
+        """
+
+        with self._lock:
+            return RateLimiterStats(
+                self._calls, self._waited_calls,
+                self._total_wait, self._max_wait,
+                dict(self._wait_by_method)
+            )
@@ -6,7 +6,10 @@
 :copyright: (c) 2019 python273
 """
 
+import logging
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from .exceptions import VkRequestsPoolException
 from .execute import VkFunction
@@ -14,16 +17,28 @@ from .utils import sjson_dumps
 
 PoolRequest = namedtuple('PoolRequest', ['method', 'values', 'result'])
 
+NO_RESPONSE_ERROR = {'error_code': 0, 'error_msg': 'No response in execute'}
+
 
 class RequestResult(object):
-    """ Результат запроса из пула """
+    """ Результат запроса из пула.
+
+    Работает как future: результата можно дождаться (:meth:`wait`,
+    :meth:`get`) или подписаться на него (:meth:`add_done_callback`),
+    пока остальные запросы пула ещё выполняются
+    """
 
-    __slots__ = ('_result', 'ready', '_error')
+    __slots__ = ('_result', 'ready', '_error', '_exception', '_done',
+                 '_callbacks', '_lock')
 
     def __init__(self):
         self._result = None
         self.ready = False
         self._error = False
+        self._exception = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
 
     @property
     def error(self):
@@ -33,7 +48,17 @@ class RequestResult(object):
     @error.setter
     def error(self, value):
         self._error = value
-        self.ready = True
+        self._set_done()
+
+    @property
+    def exception(self):
+        """Исключение, из-за которого не выполнился весь execute, либо `None`"""
+        return self._exception
+
+    @exception.setter
+    def exception(self, value):
+        self._exception = value
+        self._set_done()
 
     @property
     def result(self):
@@ -41,6 +66,9 @@ class RequestResult(object):
         if not self.ready:
             raise RuntimeError('Result is not available in `with` context')
 
+        if self._exception is not None:
+            raise self._exception
+
         if self._error:
             raise VkRequestsPoolException(
                 self._error,
@@ -55,12 +83,67 @@ class RequestResult(object):
     @result.setter
     def result(self, result):
         self._result = result
-        self.ready = True
+        self._set_done()
 
     @property
     def ok(self):
         """`True`, если результат запроса не содержит ошибок, иначе `False`"""
-        return self.ready and not self._error
+        return self.ready and not self._error and self._exception is None
+
+    def wait(self, timeout=None):
+        """ Ждёт результат запроса
+
+        :param timeout: сколько секунд ждать, `None` - без ограничения
+        :type timeout: float
+
+        :returns: `True`, если результат готов
+        :rtype: bool
+        """
+
+        return self._done.wait(timeout)
+
+    def get(self, timeout=None):
+        """ Ждёт и возвращает результат запроса (см. :attr:`result`)
+
+        :param timeout: сколько секунд ждать, `None` - без ограничения
+        :type timeout: float
+
+        :raises TimeoutError: если результат не готов за timeout секунд
+        """
+
+        if not self._done.wait(timeout):
+            raise TimeoutError('Request result is not ready')
+
+        return self.result
+
+    def add_done_callback(self, fn):
+        """ Вызывает fn(result), когда результат будет готов
+            (сразу, если он уже готов). Вызывается из потока пула
+
+        :param fn: функция, принимающая :class:`RequestResult`
+        """
+
+        with self._lock:
+            if not self.ready:
+                self._callbacks.append(fn)
+                return
+
+        fn(self)
+
+    def _set_done(self):
+        with self._lock:
+            self.ready = True
+            callbacks, self._callbacks = self._callbacks, []
+
+        self._done.set()
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                logging.getLogger('vk_api').exception(
+                    'Request result callback failed'
+                )
 
 
 class VkRequestsPool(object):
@@ -74,15 +157,23 @@ class VkRequestsPool(object):
     - В качестве объекта пула. запросы к API дабвляются по одному
     в пул и выполняются все вместе при выполнении метода execute()
 
+    С max_workers больше 1 запросы execute по 25 вызовов отправляются
+    одновременно (не больше max_workers сразу, с учётом rate_limiter),
+    а результаты готовы, как только пришёл ответ на их execute:
+    с `execute(wait=False)` их можно обрабатывать по мере готовности
 
     :param vk_session: Объект :class:`VkApi`
+
+    :param max_workers: сколько execute может выполняться одновременно
+    :type max_workers: int
     """
 
-    __slots__ = ('vk_session', 'pool')
+    __slots__ = ('vk_session', 'pool', 'max_workers')
 
-    def __init__(self, vk_session):
+    def __init__(self, vk_session, max_workers=1):
         self.vk_session = vk_session
         self.pool = []
+        self.max_workers = max_workers
 
     def __enter__(self):
         return self
@@ -111,39 +202,100 @@ class VkRequestsPool(object):
 
         return result
 
-    def execute(self):
+    def execute(self, wait=True):
         """
         Выполняет все находящиеся в пуле запросы и отчищает пул.
         Необходим для использования пула-объекта.
         Для пула менеджера контекста вызывается автоматически.
+
+        :param wait: ждать выполнения всех запросов (только с max_workers
+                     больше 1, иначе запросы всегда выполняются сразу).
+                     Если execute не выполнился, его исключение
+                     получают результаты его запросов, а с wait=True
+                     оно ещё и выбрасывается после выполнения остальных
+        :type wait: bool
         """
-        for i in range(0, len(self.pool), 25):
-            cur_pool = self.pool[i:i + 25]
 
-            one_method = check_one_method(cur_pool)
+        pool, self.pool = self.pool, []
+        chunks = [pool[i:i + 25] for i in range(0, len(pool), 25)]
 
-            if one_method:
-                value_list = [i.values for i in cur_pool]
+        if self.max_workers <= 1 or len(chunks) <= 1:
+            try:
+                for cur_pool in chunks:
+                    self._execute_chunk(cur_pool)
+            except BaseException as e:
+                # Следующие чанки уже не выполнятся, их результаты
+                # тоже получают исключение, иначе get() ждал бы вечно
+                set_pool_exception(pool, e)
+                raise
 
-                response_raw = vk_one_method(
-                    self.vk_session, one_method, value_list
-                )
-            else:
-                response_raw = vk_many_methods(self.vk_session, cur_pool)
+            return
 
-            response = response_raw['response']
-            response_errors = response_raw.get('execute_errors', [])
+        executor = ThreadPoolExecutor(
+            min(self.max_workers, len(chunks)),
+            thread_name_prefix='Requests pool'
+        )
+        futures = [
+            executor.submit(self._execute_chunk_safe, cur_pool)
+            for cur_pool in chunks
+        ]
+        executor.shutdown(wait=wait)
 
-            response_errors_iter = iter(response_errors)
+        if wait:
+            for future in futures:
+                if future.result() is not None:
+                    raise future.result()
 
-            for x, current_response in enumerate(response):
-                current_result = cur_pool[x].result
+    def _execute_chunk(self, cur_pool):
+        one_method = check_one_method(cur_pool)
 
-                if current_response is not False:
-                    current_result.result = current_response
-                else:
-                    current_result.error = next(response_errors_iter)
-        self.pool = []
+        if one_method:
+            value_list = [i.values for i in cur_pool]
+
+            response_raw = vk_one_method(
+                self.vk_session, one_method, value_list
+            )
+        else:
+            response_raw = vk_many_methods(self.vk_session, cur_pool)
+
+        set_pool_results(cur_pool, response_raw)
+
+    def _execute_chunk_safe(self, cur_pool):
+        try:
+            self._execute_chunk(cur_pool)
+        except Exception as e:
+            set_pool_exception(cur_pool, e)
+            return e
+
+
+def set_pool_exception(pool, exception):
+    """ Отдаёт exception всем ещё не готовым результатам запросов пула """
+
+    for request in pool:
+        if not request.result.ready:
+            request.result.exception = exception
+
+
+def set_pool_results(pool, response_raw):
+    """ Раскладывает ответ execute по результатам запросов пула """
+
+    response = response_raw['response']
+    response_errors = response_raw.get('execute_errors', [])
+
+    response_errors_iter = iter(response_errors)
+
+    for x, current_response in enumerate(response):
+        current_result = pool[x].result
+
+        if current_response is not False:
+            current_result.result = current_response
+        else:
+            current_result.error = next(
+                response_errors_iter, None
+            ) or NO_RESPONSE_ERROR
+
+    for request in pool[len(response):]:
+        request.result.error = NO_RESPONSE_ERROR
 
 
 def check_one_method(pool):
@@ -178,13 +330,19 @@ vk_one_method = VkFunction(
 ''')
 
 
-def vk_many_methods(vk_session, pool):
+def vk_many_methods_code(pool):
+    """ Код execute, вызывающий все запросы пула """
+
     requests = ','.join(
         'API.{}({})'.format(i.method, sjson_dumps(i.values))
         for i in pool
     )
 
-    code = 'return [{}];'.format(requests)
+    return 'return [{}];'.format(requests)
+
+
+def vk_many_methods(vk_session, pool):
+    code = vk_many_methods_code(pool)
 
     return vk_session.method('execute', {'code': code}, raw=True)
 
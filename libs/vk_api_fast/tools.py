@@ -6,6 +6,9 @@
 :copyright: (c) 2019 python273
 """
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from .exceptions import ApiError, VkToolsException
 from .execute import VkFunction
 
@@ -94,6 +97,106 @@ class VkTools(object):
             count = response['count']
             offset = response['offset']
 
+    def get_all_iter_pipelined(self, method, max_count, values=None,
+                               key='items', limit=None, stop_fn=None,
+                               negative_offset=False, max_in_flight=4):
+        """ Получить все элементы, не дожидаясь обработки предыдущих.
+
+        Первый execute узнаёт count, затем остаток делится на окна по
+        max_count * 25 элементов, и до max_in_flight окон запрашиваются
+        одновременно (с учётом rate_limiter), пока обрабатываются
+        полученные. Элементы выдаются в том же порядке, что и get_all_iter,
+        в памяти одновременно не больше max_in_flight + 1 окон.
+
+        Окна считаются от count первого запроса: если элементы добавляются
+        или удаляются во время обхода, они могут быть пропущены или
+        повторены. Без count и с negative_offset работает как get_all_iter
+
+        :param max_in_flight: сколько execute может выполняться одновременно
+        :type max_in_flight: int
+
+        Остальные параметры как у get_all_iter
+        """
+
+        if negative_offset:
+            yield from self.get_all_iter(
+                method, max_count, values, key, limit, stop_fn, negative_offset
+            )
+            return
+
+        values = values.copy() if values else {}
+        values['count'] = max_count
+
+        response = self._check_response(vk_get_all_items(
+            self.vk, method, key, values, None, 0, offset_mul=1
+        ))
+        items = response['items']
+        count = response['count']
+
+        if count is None and response['more']:
+            yield from self.get_all_iter(
+                method, max_count, values, key, limit, stop_fn
+            )
+            return
+
+        window = max_count * 25
+        offsets = iter(range(response['offset'], count or 0, window))
+        pending = deque()
+        executor = ThreadPoolExecutor(
+            max_in_flight, thread_name_prefix='VkTools pipeline'
+        )
+
+        def submit_next():
+            offset = next(offsets, None)
+
+            if offset is not None:
+                pending.append(executor.submit(
+                    vk_get_items_window, self.vk, method, key, values,
+                    offset, min(offset + window, count)
+                ))
+
+        try:
+            if response['more']:
+                for _ in range(max_in_flight):
+                    submit_next()
+
+            items_count = 0
+
+            while True:
+                items_count += len(items)
+
+                for item in items:
+                    yield item
+
+                if not pending:
+                    break
+
+                if limit and items_count >= limit:
+                    break
+
+                if stop_fn and stop_fn(items):
+                    break
+
+                items = self._check_response(pending.popleft().result())['items']
+                submit_next()
+        finally:
+            for future in pending:
+                future.cancel()
+
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _check_response(response):
+        if 'execute_errors' in response or '_error' in response['response']:
+            raise VkToolsException(
+                'Could not load items: {}'.format(
+                    response.get('execute_errors')
+                ),
+                response=response
+            )
+
+        return response['response']
+
     def get_all(self, method, max_count, values=None, key='items', limit=None,
                 stop_fn=None, negative_offset=False):
         """ Использовать только если нужно загрузить все объекты в память.
@@ -252,3 +355,42 @@ vk_get_all_items = VkFunction(
         more: calls != 99
     };
 ''')
+
+
+vk_get_items_window = VkFunction(
+    args=('method', 'key', 'values', 'offset', 'end'),
+    clean_args=('method', 'key', 'offset', 'end'),
+    return_raw=True,
+    code='''
+    var params = %(values)s,
+        calls = 0,
+        items = [],
+        count = null,
+        offset = %(offset)s,
+        ri;
+
+    while(calls < 25 && offset < %(end)s) {
+        calls = calls + 1;
+
+        params.offset = offset;
+        var response = API.%(method)s(params);
+        if (!response) {
+            return {"_error": 1};
+        }
+
+        ri = response.%(key)s;
+        items = items + ri;
+        offset = offset + params.count;
+        count = response.count;
+
+        if (ri.length < params.count) {
+            calls = 99;
+        }
+    };
+
+    return {
+        count: count,
+        items: items,
+        offset: offset
+    };
+''')
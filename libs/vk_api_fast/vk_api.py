@@ -13,9 +13,11 @@ import re
 import threading
 import time
 import urllib.parse
+from concurrent.futures import Future
 from hashlib import md5
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .jconfig import *
 from .enums import VkUserPermissions
@@ -94,15 +96,35 @@ class VkApi(object):
 
     :param session: Кастомная сессия со своими параметрами(из библиотеки requests)
     :type session: :class:`requests.Session`
+
+    :param rate_limiter: Ограничитель частоты запросов (например
+        :class:`rate_limiter.RateLimiter`). Запросы к API не сериализуются,
+        несколько запросов могут выполняться одновременно
+    :type rate_limiter: :class:`rate_limiter.RateLimiter`
+
+    :param pool_size: Максимальное количество одновременных соединений
+        с одним хостом
+    :type pool_size: int
+
+    :param coalesce_methods: Методы, вызовы которых, сделанные за
+        `coalesce_window` секунд, объединяются в один execute (до 25 вызовов).
+        См. :class:`coalescer.VkRequestsCoalescer`
+    :type coalesce_methods: list
+
+    :param coalesce_window: Окно объединения вызовов в секундах
+    :type coalesce_window: float
     """
 
     RPS_DELAY = 0  # ~3 requests per second
 
+    API_URL = 'https://api.vk.com/method/'
+
     def __init__(self, login=None, password=None, token=None,
                  auth_handler=None, captcha_handler=None,
                  config=jconfig.Config, config_filename='vk_config.v2.json',
                  api_version='5.92', app_id=6222115, scope=DEFAULT_USER_SCOPE,
-                 client_secret=None, session=None):
+                 client_secret=None, session=None, rate_limiter=None,
+                 pool_size=10, coalesce_methods=None, coalesce_window=0.03):
 
         self.login = login
         self.password = password
@@ -119,6 +141,20 @@ class VkApi(object):
         self.http = session or requests.Session()
         if not session:
             self.http.headers['User-agent'] = DEFAULT_USERAGENT
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size
+            )
+            self.http.mount('https://', adapter)
+            self.http.mount('http://', adapter)
+
+        self.rate_limiter = rate_limiter
+
+        self.coalescer = None
+        if coalesce_methods:
+            from .coalescer import VkRequestsCoalescer
+            self.coalescer = VkRequestsCoalescer(
+                self, coalesce_methods, coalesce_window
+            )
 
         self.last_request = 0.0
 
@@ -603,6 +639,16 @@ class VkApi(object):
 
         raise AuthError('No handler for two-factor authentication')
 
+    def close(self):
+        """ Останавливает объединение вызовов (оставшиеся вызовы
+            отправляются) и закрывает HTTP сессию
+        """
+
+        if self.coalescer is not None:
+            self.coalescer.close()
+
+        self.http.close()
+
     def get_api(self):
         """ Возвращает VkApiMethod(self)
 
@@ -612,8 +658,34 @@ class VkApi(object):
 
         return VkApiMethod(self)
 
+    def method_future(self, method, values=None):
+        """ Вызов метода API без ожидания ответа.
+            Если метод указан в `coalesce_methods`, вызов будет объединён
+            с другими в один execute
+
+        :param method: название метода
+        :type method: str
+
+        :param values: параметры
+        :type values: dict
+
+        :rtype: concurrent.futures.Future
+        """
+
+        if self.coalescer is not None and method in self.coalescer.methods:
+            return self.coalescer.submit(method, values.copy() if values else {})
+
+        future = Future()
+
+        try:
+            future.set_result(self.method(method, values, coalesce=False))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
     def method(self, method, values=None, captcha_sid=None, captcha_key=None,
-               raw=False):
+               raw=False, coalesce=True):
         """ Вызов метода API
 
         :param method: название метода
@@ -633,8 +705,19 @@ class VkApi(object):
                     (может понадобиться для метода execute для получения
                     execute_errors)
         :type raw: bool
+
+        :param coalesce: разрешить объединение вызова с другими в execute
+                         (если метод указан в `coalesce_methods`)
+        :type coalesce: bool
         """
 
+        if (coalesce and not raw and not captcha_sid and
+                self.coalescer is not None and
+                method in self.coalescer.methods):
+            return self.coalescer.submit(
+                method, values.copy() if values else {}
+            ).result()
+
         values = values.copy() if values else {}
 
         if 'v' not in values:
@@ -647,15 +730,15 @@ class VkApi(object):
             values['captcha_sid'] = captcha_sid
             values['captcha_key'] = captcha_key
 
-        with self.lock:
-            # Ограничение 3 запроса в секунду
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(method, values.get('access_token'))
 
-            response = self.http.post(
-                'https://api.vk.com/method/' + method,
-                values,
-                headers={'Cookie': ''}
-            )
-            self.last_request = time.time()
+        response = self.http.post(
+            self.API_URL + method,
+            values,
+            headers={'Cookie': ''}
+        )
+        self.last_request = time.time()
 
         if response.ok:
             response = response.json()
@@ -0,0 +1,209 @@
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from os import fsync, remove, replace
+from os.path import exists
+from pathlib import Path
+from secrets import randbelow
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Mapping
+
+from ujson import dumps, loads, JSONDecodeError
+
+from .config import *
+from .classes import BaseUser
+from .functions import log
+from .outbox import multicast
+from libs.vk_api_fast import RateLimiter, VkApi
+
+
+__all__ = ['Broadcast', 'BroadcastProgress', 'Broadcaster']
+
+
+@dataclass(slots=True)
+class Broadcast:
+    """
+    One message to a fixed list of recipients. Batch i goes to recipients[i * peersPerSend:(i + 1) * peersPerSend]
+    with random_id derived from randomIdBase and i, so a batch resent after a restart is not delivered twice
+    """
+    values: dict[str, Any]
+    recipients: list[int]
+    id: str = field(default_factory=lambda: f'{datetime.now():%Y%m%d%H%M%S}')
+    randomIdBase: int = field(default_factory=lambda: randbelow(2 ** 31 - 1))
+    peersPerSend: int = Sending.peersPerSend
+    nextBatch: int = 0
+    sent: int = 0
+    failed: int = 0
+    seconds: float = 0.
+    finished: bool = False
+
+    @property
+    def batchCount(self) -> int:
+        return -(-len(self.recipients) // self.peersPerSend)
+
+    def batch(self, index: int) -> tuple[list[int], int]:
+        return (self.recipients[index * self.peersPerSend:(index + 1) * self.peersPerSend],
+                (self.randomIdBase + index) % (2 ** 31 - 1) + 1)
+
+
+@dataclass(slots=True)
+class BroadcastProgress:
+    id: str
+    total: int
+    sent: int
+    failed: int
+    remaining: int
+    seconds: float
+    messagesPerSecond: float
+    etaSeconds: float
+    finished: bool
+
+    def __str__(self) -> str:
+        return (f'{self.sent + self.failed}/{self.total} ({self.failed} failed) in {self.seconds:.1f}s, '
+                f'{self.messagesPerSecond:.0f} messages/s, '
+                f'{'finished' if self.finished else f'{self.etaSeconds:.0f}s left'}')
+
+
+class Broadcaster:
+    """
+    Sends a broadcast in the background: messages.send to Sending.peersPerSend peer_ids at once,
+    Sending.sendsPerExecute of them per execute, at most executes_per_second executes, so the bot keeps most of the rps budget.
+    The broadcast is saved to file_path after every execute and resume() continues an interrupted one.
+    on_progress gets a BroadcastProgress every progress_interval_seconds and when the broadcast is over
+    """
+
+    def __init__(self, vk: VkApi, file_path: Path | str = Database.broadcastFilePath,
+                 executes_per_second: float = Broadcasting.executesPerSecond,
+                 progress_interval_seconds: float = Broadcasting.progressIntervalSeconds,
+                 on_progress: Callable[[BroadcastProgress], None] | None = None) -> None:
+        self.vk = vk
+        self.filePath = Path(file_path)
+        self.rateLimiter = RateLimiter(executes_per_second, 1)
+        self.progressIntervalSeconds = progress_interval_seconds
+        self.onProgress = on_progress
+        self.broadcast: Broadcast | None = None
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Thread | None = None
+        self._runStart = 0.
+
+    @staticmethod
+    def create(users: Mapping[int, BaseUser], values: dict[str, Any],
+               user_filter: Callable[[BaseUser], bool] | None = None) -> Broadcast:
+        """
+        Broadcast of messages.send values (message, keyboard, attachment, ...) to the users that pass user_filter
+        """
+        # ids are copied at once, handlers on other workers keep adding users
+        return Broadcast(values, sorted(userId for userId in [*users] if userId > 0 and
+                                        (user_filter is None or (user := users.get(userId)) is not None and user_filter(user))))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def progress(self) -> BroadcastProgress | None:
+        with self._lock:
+            if (broadcast := self.broadcast) is None:
+                return None
+            seconds = broadcast.seconds + (perf_counter() - self._runStart if self.running else 0.)
+            done = broadcast.sent + broadcast.failed
+        total = len(broadcast.recipients)
+        messagesPerSecond = done / seconds if seconds else 0.
+        return BroadcastProgress(broadcast.id, total, broadcast.sent, broadcast.failed, total - done, seconds, messagesPerSecond,
+                                 (total - done) / messagesPerSecond if messagesPerSecond else 0., broadcast.finished)
+
+    def start(self, broadcast: Broadcast) -> bool:
+        """
+        False if another broadcast is still being sent
+        """
+        if self.running:
+            return False
+        with self._lock:
+            self.broadcast = broadcast
+        self._save()
+        self._stopped.clear()
+        self._thread = Thread(target=self._send, name='Broadcaster', daemon=True)
+        self._thread.start()
+        log('info', f'Broadcast {broadcast.id} to {len(broadcast.recipients)} user(s) '
+                    f'{'started' if not broadcast.nextBatch else f'resumed from batch {broadcast.nextBatch}'}')
+        return True
+
+    def resume(self) -> bool:
+        """
+        Continues the broadcast saved by the previous run, False if there is none
+        """
+        if self.running or not exists(self.filePath):
+            return False
+        try:
+            with open(self.filePath, encoding='utf-8') as file:
+                broadcast = Broadcast(**loads(file.read()))
+        except (OSError, JSONDecodeError, TypeError, ValueError) as exception:
+            log('warn', f'Unable to read the saved broadcast {self.filePath}: {exception!r}')
+            return False
+        return not broadcast.finished and self.start(broadcast)
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stops after the current execute, the broadcast stays saved and can be resumed
+        """
+        self._stopped.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def join(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+
+    def _save(self) -> None:
+        with self._lock:
+            data = dumps(asdict(self.broadcast), ensure_ascii=False, escape_forward_slashes=False)
+        temporaryPath = self.filePath.with_suffix(f'{self.filePath.suffix}.tmp')
+        try:
+            with open(temporaryPath, 'w', encoding='utf-8') as file:
+                file.write(data)
+                file.flush()
+                fsync(file.fileno())
+            replace(temporaryPath, self.filePath)
+        except OSError as exception:
+            log('error', f'Unable to save the broadcast: {exception!r}')
+
+    def _reportProgress(self) -> None:
+        progress = self.progress
+        log('info', f'Broadcast {progress.id}: {progress}')
+        if self.onProgress is not None:
+            try:
+                self.onProgress(progress)
+            except Exception as exception:
+                log('error', f'Broadcast progress callback failed: {exception!r}')
+
+    def _send(self) -> None:
+        broadcast, self._runStart = self.broadcast, perf_counter()
+        lastReport = self._runStart
+        while broadcast.nextBatch < broadcast.batchCount and not self._stopped.is_set():
+            batchIndexes = range(broadcast.nextBatch, min(broadcast.nextBatch + Sending.sendsPerExecute, broadcast.batchCount))
+            self.rateLimiter.acquire('execute')
+            result = multicast(self.vk, [broadcast.batch(index) for index in batchIndexes], broadcast.values)
+            now = perf_counter()
+            with self._lock:
+                broadcast.sent += len(result.sent)
+                broadcast.failed += len(result.failed)
+                broadcast.nextBatch = batchIndexes.stop
+                broadcast.seconds += now - self._runStart
+                self._runStart = now
+                broadcast.finished = broadcast.nextBatch >= broadcast.batchCount
+            self._save()
+            if now - lastReport >= self.progressIntervalSeconds:
+                lastReport = now
+                self._reportProgress()
+        with self._lock:
+            broadcast.seconds += perf_counter() - self._runStart
+            self._runStart = perf_counter()
+            broadcast.finished = broadcast.nextBatch >= broadcast.batchCount
+        self._reportProgress()
+        if broadcast.finished and exists(self.filePath):
+            try:
+                remove(self.filePath)
+            except OSError as exception:
+                log('warn', f'Unable to remove the finished broadcast file: {exception!r}')
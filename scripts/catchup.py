@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from itertools import batched
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, Callable
+
+from .config import *
+from .functions import log
+from .outbox import generateRandomId, multicast
+from libs.vk_api_fast import VkApi
+from libs.vk_api_fast.tools import VkTools
+
+
+__all__ = ['UnreadConversation', 'CatchUpStats', 'CatchUp']
+
+chatStartId = 2_000_000_000
+
+
+@dataclass(slots=True)
+class UnreadConversation:
+    peerId: int
+    unreadCount: int
+    lastMessage: dict[str, Any] | None
+
+
+@dataclass(slots=True)
+class CatchUpStats:
+    conversations: int = 0
+    registered: int = 0
+    notified: int = 0
+    failed: int = 0
+    replayed: int = 0
+    executes: int = 0
+    seconds: float = 0.
+
+
+class CatchUp:
+    """
+    Answers the conversations that got unread while the bot was off. All of them are listed first with execute-paged
+    messages.getConversations (CatchingUp.pageSize * 25 per request, answering shifts the offsets of the unread list),
+    new users are registered at once with register_users, the last missed message of every conversation is passed
+    to replay, so it is answered as if it had just come, and the conversations that are not replayed get the notice
+    with multicast.
+    The handler calls claim() for every new message, so the one that also comes from the long poll checkpoint
+    is handled once
+    """
+
+    def __init__(self, vk: VkApi, group_id: int, register_users: Callable[[list[int]], int],
+                 replay: Callable[[dict[str, Any]], Any] | None = None, notice: str = CatchingUp.notice,
+                 page_size: int = CatchingUp.pageSize,
+                 replay_max_age_seconds: float | None = CatchingUp.replayMaxAgeSeconds) -> None:
+        self.vk = vk
+        self.groupId = group_id
+        self.registerUsers = register_users
+        self.replay = replay
+        self.notice = notice
+        self.pageSize = page_size
+        self.replayMaxAgeSeconds = replay_max_age_seconds
+        self._handled: dict[int, int] = {}
+        self._lock = Lock()
+
+    def claim(self, peer_id: int, conversation_message_id: int) -> bool:
+        """
+        False if this message or a later one of peer_id has already been handled
+        """
+        if not conversation_message_id:
+            return True
+        with self._lock:
+            if self._handled.get(peer_id, 0) >= conversation_message_id:
+                return False
+            self._handled[peer_id] = conversation_message_id
+            return True
+
+    def fetch(self) -> list[UnreadConversation]:
+        unreadConversations = []
+        for item in VkTools(self.vk).get_all_iter('messages.getConversations', self.pageSize,
+                                                  {'group_id': self.groupId, 'filter': 'unread'}):
+            conversation = item['conversation']
+            if 0 < (peerId := conversation['peer']['id']) < chatStartId:
+                unreadConversations.append(UnreadConversation(peerId, conversation.get('unread_count', 0), item.get('last_message')))
+        return unreadConversations
+
+    def isReplayed(self, unread_conversation: UnreadConversation) -> bool:
+        message = unread_conversation.lastMessage
+        return (self.replay is not None and message is not None and not message.get('out') and
+                message.get('from_id') == unread_conversation.peerId and
+                (self.replayMaxAgeSeconds is None or time() - message.get('date', 0) <= self.replayMaxAgeSeconds))
+
+    def run(self) -> CatchUpStats:
+        timerStart, stats = perf_counter(), CatchUpStats()
+        unreadConversations = self.fetch()
+        stats.conversations = len(unreadConversations)
+        if not unreadConversations:
+            stats.seconds = perf_counter() - timerStart
+            return stats
+        stats.registered = self.registerUsers([unreadConversation.peerId for unreadConversation in unreadConversations])
+
+        # the replayed messages get a real answer, the notice goes to the rest
+        replayed = [unreadConversation for unreadConversation in unreadConversations if self.isReplayed(unreadConversation)]
+        replayedPeerIds = {unreadConversation.peerId for unreadConversation in replayed}
+        peerBatches = [([*peerIds], generateRandomId()) for peerIds in
+                       batched((unreadConversation.peerId for unreadConversation in unreadConversations
+                                if unreadConversation.peerId not in replayedPeerIds), Sending.peersPerSend)]
+        for batches in batched(peerBatches, Sending.sendsPerExecute):
+            result = multicast(self.vk, [*batches], {'message': self.notice})
+            stats.notified += len(result.sent)
+            stats.failed += len(result.failed)
+            stats.executes += result.executes
+            if result.failed:
+                log('warn', f'Unable to send the catch-up notice to {len(result.failed)} user(s), '
+                            f'error codes: {sorted({*result.failed.values()})}')
+
+        for unreadConversation in replayed:
+            try:
+                self.replay(unreadConversation.lastMessage)
+                stats.replayed += 1
+            except Exception as exception:
+                log('error', f'Unable to replay the missed message of {unreadConversation.peerId}: {exception!r}')
+        stats.seconds = perf_counter() - timerStart
+        return stats
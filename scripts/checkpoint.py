@@ -0,0 +1,128 @@
+from collections import deque
+from os import fsync, replace
+from os.path import exists
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Iterable
+
+from ujson import dumps, loads, JSONDecodeError
+
+from .config import *
+from .functions import log
+from libs.vk_api_fast.bot_longpoll import VkBotEvent
+
+
+__all__ = ['LongPollCheckpoint']
+
+
+def getEventId(vk_event: VkBotEvent) -> str:
+    return vk_event.raw.get('event_id') or ''
+
+
+class LongPollCheckpoint:
+    """
+    Durable long poll position. The saved ts is the oldest one whose events are not all processed yet,
+    so after a restart those events come again and the already processed ones are skipped by event_id
+    """
+
+    def __init__(self, file_path: Path | str = Database.longPollCheckpointFilePath,
+                 flush_interval_seconds: float = LongPolling.checkpointFlushSeconds,
+                 dedupe_size: int = LongPolling.dedupeEventIds) -> None:
+        self.filePath = Path(file_path)
+        self.flushIntervalSeconds = flush_interval_seconds
+        self._lock = Lock()
+        self._batches: deque[tuple[Any, Any, set[str]]] = deque()
+        self._seenOrder: deque[str] = deque(maxlen=dedupe_size)
+        self._seen: set[str] = set()
+        self._ts: Any = None
+        self._dirty = False
+        self._stopped = Event()
+        self._thread: Thread | None = None
+        self.skipped = 0
+        self._load()
+
+    @property
+    def ts(self) -> Any:
+        with self._lock:
+            return self._batches[0][0] if self._batches else self._ts
+
+    def _load(self) -> None:
+        if not exists(self.filePath):
+            return
+        try:
+            with open(self.filePath) as file:
+                data = loads(file.read())
+        except (JSONDecodeError, ValueError, OSError):
+            log('warn', f'Unable to read long poll checkpoint {self.filePath}, starting from the current ts')
+            return
+        self._ts = data.get('ts')
+        self._remember(data.get('eventIds', ()))
+
+    def _remember(self, event_ids: Iterable[str]) -> None:
+        for eventId in event_ids:
+            if len(self._seenOrder) == self._seenOrder.maxlen:
+                self._seen.discard(self._seenOrder[0])
+            self._seenOrder.append(eventId)
+            self._seen.add(eventId)
+
+    def begin(self, ts: Any, next_ts: Any, vk_events: list[VkBotEvent]) -> list[VkBotEvent]:
+        """
+        Registers a long poll batch fetched with ts and returns the events that have not been processed yet
+        """
+        with self._lock:
+            fresh = [vk_event for vk_event in vk_events if getEventId(vk_event) not in self._seen]
+            self.skipped += len(vk_events) - len(fresh)
+            self._batches.append((ts, next_ts, {eventId for vk_event in fresh if (eventId := getEventId(vk_event))}))
+            self._dirty = True
+            self._advance()
+        return fresh
+
+    def done(self, vk_event: VkBotEvent) -> None:
+        if not (eventId := getEventId(vk_event)):
+            return
+        with self._lock:
+            self._remember((eventId,))
+            for _, _, pending in self._batches:
+                if eventId in pending:
+                    pending.discard(eventId)
+                    break
+            self._dirty = True
+            self._advance()
+
+    def _advance(self) -> None:
+        while self._batches and not self._batches[0][2]:
+            self._ts = self._batches.popleft()[1]
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'ts': self._batches[0][0] if self._batches else self._ts, 'eventIds': [*self._seenOrder]}
+            self._dirty = False
+        temporaryPath = self.filePath.with_suffix(f'{self.filePath.suffix}.tmp')
+        with open(temporaryPath, 'w') as file:
+            file.write(dumps(data))
+            file.flush()
+            fsync(file.fileno())
+        replace(temporaryPath, self.filePath)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = Thread(target=self._flushPeriodically, name='Long poll checkpoint', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _flushPeriodically(self) -> None:
+        while not self._stopped.wait(self.flushIntervalSeconds):
+            try:
+                self.flush()
+            except OSError as exception:
+                log('error', f'Unable to save long poll checkpoint: {exception}')
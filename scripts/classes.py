@@ -1,12 +1,15 @@
 from collections.abc import Collection
-from dataclasses import dataclass, field, fields, asdict
+from copy import deepcopy
+from dataclasses import dataclass, field, fields, is_dataclass, Field, MISSING
 from datetime import datetime
-from os import makedirs
-from os.path import exists
+from functools import lru_cache
+from os import fsync, makedirs, replace
+from os.path import exists, getsize
 from pathlib import Path
-from typing import Any, Self, Type
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Self, Type, get_args, get_origin, get_type_hints
 
-from dacite import from_dict
 from ujson import dumps, loads, JSONDecodeError
 
 from .config import *
@@ -14,7 +17,8 @@ from .functions import *
 from libs.vk_api_fast.keyboard import VkKeyboard
 
 
-__all__ = ['botPrefs', 'DictLikeClass', 'BotPrefs', 'VersionInfo', 'Users', 'BaseUser', 'UserExercise']
+__all__ = ['botPrefs', 'DictLikeClass', 'BotPrefs', 'VersionInfo', 'Users', 'BaseUser', 'UserExercise',
+           'getDecoder', 'getEncoder']
 
 
 @dataclass
@@ -30,6 +34,109 @@ class VersionInfo:
         self.main = '.'.join(self.full.split('.')[:2])
 
 
+_persistentFields: dict[type, tuple[Field, ...]] = {}
+_decoders: dict[tuple[type, bool], Callable[[dict[str, Any]], Any]] = {}
+_encoders: dict[type, Callable[[Any], dict[str, Any]]] = {}
+_primitiveTypes: dict[type, tuple[type, ...]] = {int: (int,), float: (int, float), str: (str,), bool: (bool,)}
+
+
+def persistentFields(cls: type) -> tuple[Field, ...]:
+    """
+    Fields of a dataclass without the ones marked with metadata={'transient': True}, cached per class
+    """
+    if (persistentFields_ := _persistentFields.get(cls)) is None:
+        persistentFields_ = _persistentFields[cls] = tuple(field_ for field_ in fields(cls) if not field_.metadata.get('transient'))
+    return persistentFields_
+
+
+def _checked(value: Any, types: tuple[type, ...], path: str) -> Any:
+    if not isinstance(value, types):
+        raise TypeError(f'wrong value type for field "{path}" - should be "{types[-1].__name__}" '
+                        f'instead of value "{value}" of type "{type(value).__name__}"')
+    return value
+
+
+def _missing(path: str) -> Any:
+    raise KeyError(f'missing value for field "{path}"')
+
+
+def _decodeExpression(type_: Any, expression: str, path: str, strict: bool, namespace: dict[str, Any], depth: int = 0) -> str:
+    if is_dataclass(type_):
+        name = f'decode{type_.__name__}_{id(type_):x}'
+        namespace[name] = getDecoder(type_, strict)
+        return f'{name}({expression})'
+    if get_origin(type_) is list:
+        item = f'item{depth}'
+        itemExpression = _decodeExpression(get_args(type_)[0], item, f'{path}[]', strict, namespace, depth + 1)
+        if strict:
+            expression = f'_checked({expression}, (list,), {path!r})'
+        return expression if itemExpression == item else f'[{itemExpression} for {item} in {expression}]'
+    if strict and type_ in _primitiveTypes:
+        typesName = f'types{type_.__name__.title()}'
+        namespace[typesName] = _primitiveTypes[type_]
+        return f'_checked({expression}, {typesName}, {path!r})'
+    return expression
+
+
+def _encodeExpression(type_: Any, expression: str, namespace: dict[str, Any], depth: int = 0) -> str:
+    if is_dataclass(type_):
+        name = f'encode{type_.__name__}_{id(type_):x}'
+        namespace[name] = getEncoder(type_)
+        return f'{name}({expression})'
+    if get_origin(type_) is list:
+        item = f'item{depth}'
+        return f'[{_encodeExpression(get_args(type_)[0], item, namespace, depth + 1)} for {item} in {expression}]'
+    if get_origin(type_) is dict:
+        key, value = f'key{depth}', f'value{depth}'
+        return f'{{{key}: {_encodeExpression(get_args(type_)[1], value, namespace, depth + 1)} for {key}, {value} in {expression}.items()}}'
+    if type_ in _primitiveTypes:
+        return expression
+    return f'deepcopy({expression})'
+
+
+def getDecoder(cls: type, strict: bool = True) -> Callable[[dict[str, Any]], Any]:
+    """
+    Returns a generated straight-line function building cls from a dictionary.
+    Strict decoders check every value type like dacite did, trusted ones (strict=False) only convert nested dataclasses
+    """
+    if (decoder := _decoders.get((cls, strict))) is not None:
+        return decoder
+    namespace: dict[str, Any] = {'cls': cls, '_checked': _checked, '_missing': _missing}
+    typeHints, arguments = get_type_hints(cls), []
+    for field_ in fields(cls):
+        if not field_.init:
+            continue
+        path = f'{cls.__name__}.{field_.name}'
+        value = _decodeExpression(typeHints[field_.name], f'dictionary[{field_.name!r}]', path, strict, namespace)
+        if field_.default is not MISSING:
+            namespace[f'default_{field_.name}'] = field_.default
+            default = f'default_{field_.name}'
+        elif field_.default_factory is not MISSING:
+            namespace[f'factory_{field_.name}'] = field_.default_factory
+            default = f'factory_{field_.name}()'
+        else:
+            default = f'_missing({path!r})'
+        arguments.append(f'        {field_.name}={value} if {field_.name!r} in dictionary else {default},')
+    exec('\n'.join(('def fromDict(dictionary):', '    return cls(', *arguments, '    )')), namespace)
+    decoder = _decoders[cls, strict] = namespace['fromDict']
+    return decoder
+
+
+def getEncoder(cls: type) -> Callable[[Any], dict[str, Any]]:
+    """
+    Returns a generated straight-line equivalent of dataclasses.asdict for instances of cls
+    """
+    if (encoder := _encoders.get(cls)) is not None:
+        return encoder
+    namespace: dict[str, Any] = {'deepcopy': deepcopy}
+    typeHints = get_type_hints(cls)
+    items = [f'        {field_.name!r}: {_encodeExpression(typeHints[field_.name], f'self.{field_.name}', namespace)},'
+             for field_ in persistentFields(cls)]
+    exec('\n'.join(('def toDict(self):', '    return {', *items, '    }')), namespace)
+    encoder = _encoders[cls] = namespace['toDict']
+    return encoder
+
+
 @dataclass(slots=True)
 class DictLikeClass(Collection):
     def get(self, field_: str):
@@ -43,23 +150,23 @@ class DictLikeClass(Collection):
 
     @property
     def fields(self) -> list[str]:
-        return [field_.name for field_ in fields(self)]
+        return [field_.name for field_ in persistentFields(type(self))]
 
     @property
     def values(self) -> list[Any]:
-        return [getattr(self, field_.name) for field_ in fields(self)]
+        return [getattr(self, field_.name) for field_ in persistentFields(type(self))]
 
     @property
     def toDict(self) -> dict[str, Any]:
-        return asdict(self)
+        return getEncoder(type(self))(self)
 
     def toFile(self, file_path: Path | str) -> None:
         with open(file_path, 'w') as file:
             file.write(dumps(self.toDict, indent=4, escape_forward_slashes=False))
 
     @classmethod
-    def fromDict(cls, dictionary: dict[str, Any]) -> Self:
-        return from_dict(cls, dictionary)
+    def fromDict(cls, dictionary: dict[str, Any], strict: bool = True) -> Self:
+        return getDecoder(cls, strict)(dictionary)
 
     @classmethod
     def fromFile(cls, file_path: Path | str) -> Self:
@@ -72,13 +179,13 @@ class DictLikeClass(Collection):
             return cls()
 
     def __contains__(self, item: Any):
-        return item in {field_ for field_, _ in self}
+        return any(field_.name == item for field_ in persistentFields(type(self)))
 
     def __len__(self):
-        return len(fields(self))
+        return len(persistentFields(type(self)))
 
     def __iter__(self):
-        yield from ((field_.name, getattr(self, field_.name)) for field_ in fields(self))
+        yield from ((field_.name, getattr(self, field_.name)) for field_ in persistentFields(type(self)))
 
 
 @dataclass(slots=True)
@@ -194,6 +301,22 @@ class BotPrefs(DictLikeClass):
     devId: int = Constants.devId
     admins: list[int] = field(default_factory=lambda: [Constants.devId])
     sendExecutionTime: bool = True
+    adminIds: frozenset[int] = field(init=False, repr=False, compare=False, metadata={'transient': True})
+    exerciseIndexes: dict[str, int] = field(init=False, repr=False, compare=False, metadata={'transient': True})
+    exercisesByNameRu: dict[str, Exercise] = field(init=False, repr=False, compare=False, metadata={'transient': True})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Keeps adminIds and the exercise name indexes in sync when admins or exercises are assigned.
+        After changing them in place, assign them again (botPrefs.admins = botPrefs.admins) to reindex
+        """
+        object.__setattr__(self, name, value)
+        match name:
+            case 'admins':
+                object.__setattr__(self, 'adminIds', frozenset(value))
+            case 'exercises':
+                object.__setattr__(self, 'exerciseIndexes', {exercise.name: index for index, (_, exercise) in enumerate(value)})
+                object.__setattr__(self, 'exercisesByNameRu', {exercise.name: exercise for _, exercise in value})
 
     @property
     def exercisesNames(self) -> list[str]:
@@ -201,10 +324,10 @@ class BotPrefs(DictLikeClass):
 
     @property
     def exercisesNamesRu(self) -> list[str]:
-        return [exercise.name for _, exercise in self.exercises]
+        return [*self.exercisesByNameRu]
 
     def getExerciseByNameRu(self, name: str) -> Exercise:
-        return self.exercises.values[self.exercisesNamesRu.index(name)]
+        return self.exercisesByNameRu[name]
 
 
 botPrefs = BotPrefs.fromFile(Database.botPrefsFilePath)
@@ -251,6 +374,7 @@ class BaseUser(DictLikeClass):
     profileNames: list[str] = field(default_factory=list)
     lastMessage: str = ''
     lastKeyboard: str = 'main'
+    keyboardPage: int = 0
 
     @property
     def fullName(self) -> str:
@@ -261,7 +385,9 @@ class BaseUser(DictLikeClass):
         return [exercise.name for exercise in self.exercises]
 
     def getExerciseByName(self, name: str) -> UserExercise:
-        return self.exercises[[*self.exercisesNames].index(name)]
+        if (index := botPrefs.exerciseIndexes.get(name)) is not None and index < len(self.exercises) and self.exercises[index].name == name:
+            return self.exercises[index]
+        return self.exercises[self.exercisesNames.index(name)]
 
     @property
     def currentProfileName(self) -> str:
@@ -280,125 +406,248 @@ class BaseUser(DictLikeClass):
         return self.getExerciseByName(self.profiles[self.profile][self.day][self.exercise])
 
     def createKeyboard(self, keyboard_type: str, inline: bool = None, has_to_menu_button: bool = None) -> str:
+        return self._layoutKeyboard(keyboard_type, inline, has_to_menu_button)[0]
+
+    def keyboardPageCount(self, keyboard_type: str = 'last') -> int:
+        """
+        Number of pages the list on the keyboard is split into, 1 if it fits on one
+        """
+        return self._layoutKeyboard(keyboard_type)[1]
+
+    def _layoutKeyboard(self, keyboard_type: str, inline: bool = None, has_to_menu_button: bool = None) -> tuple[str, int]:
         inline = keyboard_type in Constants.inlineKeyboards if inline is None else inline
         hasToMenuButton = keyboard_type in Constants.keyboardsWithToMenuButton if has_to_menu_button is None else has_to_menu_button
         if keyboard_type == 'last':
             keyboard_type = self.lastKeyboard
-        kb = VkKeyboard(inline=inline)
-
+        if (keyboard := staticKeyboards.get((keyboard_type, inline, hasToMenuButton))) is not None:
+            return keyboard, 1
         match keyboard_type:
-
-            case 'main':
-                kb.add_button('Профили', 'primary')
-                kb.add_button('Упражнения', 'secondary')
-
             case 'profiles':
-                kb.add_button('Создать новый профиль', 'primary')
-                for profile in self.profileNames:
-                    kb.add_line()
-                    kb.add_button(profile, 'positive')
-                kb.add_line()
-                kb.add_button('Назад', 'negative')
-
+                return buildKeyboard(keyboard_type, inline, hasToMenuButton, profile_names=tuple(self.profileNames),
+                                     page=self.keyboardPage)
             case 'days':
-                kb.add_button('Добавить день', 'primary')
-                for day in range(len(self.currentProfile)):
-                    if day % 2:
-                        kb.add_line()
-                    kb.add_button(f'День {day + 1}', 'positive')
-                kb.add_line()
-                kb.add_button('Назад', 'negative')
-
+                return buildKeyboard(keyboard_type, inline, hasToMenuButton, day_count=len(self.currentProfile),
+                                     page=self.keyboardPage)
             case 'exercises':
-                kb.add_button('Начать тренировку', 'positive')
-                kb.add_line()
-                kb.add_button('Удалить день', 'negative')
-                kb.add_line()
-                kb.add_button('Добавить упражнение', 'primary')
-                kb.add_line()
-                for counter, exercise in enumerate(self.currentDay):
-                    kb.add_button(exercise, 'positive')
-                    if counter % 2:
-                        kb.add_line()
-                kb.add_line()
-                kb.add_button('Назад', 'negative')
-
-            case 'exercise_list' | 'add_exercise':
-                for counter, (_, exercise) in enumerate(botPrefs.exercises):
-                    kb.add_button(exercise.name, 'positive')
-                    if counter % 2:
-                        kb.add_line()
-                kb.add_line()
-                kb.add_button('Назад', 'negative')
-
-            case 'profile_actions':
-                kb.add_button('Войти', 'primary')
-                kb.add_line()
-                kb.add_button('Переименовать', 'positive')
-                kb.add_line()
-                kb.add_button('Удалить', 'negative')
-
-            case 'exercise_actions':
-                kb.add_button(f'[Р] Подходы', 'negative')
-                kb.add_button(f'[О] Подходы', 'positive')
-                kb.add_line()
-                kb.add_button(f'[Р] Повторения', 'negative')
-                kb.add_button(f'[О] Повторения', 'positive')
-                kb.add_line()
-                kb.add_button(f'[Р] Вес', 'negative')
-                kb.add_button(f'[О] Вес', 'positive')
-                kb.add_line()
-                kb.add_button('Заметка', 'secondary')
-
-            case 'exercise_actions_extended':
-                kb.add_button(f'[Р] Подходы', 'negative')
-                kb.add_button(f'[О] Подходы', 'positive')
-                kb.add_line()
-                kb.add_button(f'[Р] Повторения', 'negative')
-                kb.add_button(f'[О] Повторения', 'positive')
-                kb.add_line()
-                kb.add_button(f'[Р] Вес', 'negative')
-                kb.add_button(f'[О] Вес', 'positive')
-                kb.add_line()
-                kb.add_button('Заметка', 'secondary')
-                kb.add_button('Удалить', 'negative', ['remove_exercise'])
-
+                return buildKeyboard(keyboard_type, inline, hasToMenuButton, day_exercises=tuple(self.currentDay),
+                                     page=self.keyboardPage)
             case _:
-                return kb.get_empty_keyboard()
-
-        if not inline and hasToMenuButton:
-            kb.add_button('🔚В меню', 'negative')
-
-        kb = loads(kb.get_keyboard())
-        kb['buttons'] = [line for line in kb['buttons'] if line]
-        return dumps(kb, ensure_ascii=False)
+                return buildKeyboard(keyboard_type, inline, hasToMenuButton)
+
+
+@lru_cache(maxsize=Constants.keyboardCacheSize)
+def buildKeyboard(keyboard_type: str, inline: bool, has_to_menu_button: bool, profile_names: tuple[str, ...] = (),
+                  day_count: int = 0, day_exercises: tuple[str, ...] = (), page: int = 0) -> tuple[str, int]:
+    """
+    Keyboard JSON for the given layout inputs and the number of pages of its list. Memoized, so a keyboard is built once
+    per distinct set of inputs. Long lists of profiles, days and exercises are split into pages that fit VK keyboard limits
+    """
+    kb = VkKeyboard(inline=inline)
+    reservedButtons = 2 if not inline and has_to_menu_button else 1
+    pages = 1
+
+    match keyboard_type:
+
+        case 'main':
+            kb.add_button('Профили', 'primary')
+            kb.add_button('Упражнения', 'secondary')
+
+        case 'profiles':
+            kb.add_button('Создать новый профиль', 'primary')
+            _, pages = kb.add_paginated_buttons(profile_names, 'positive', page, reserved_lines=1, reserved_buttons=reservedButtons)
+            kb.add_line()
+            kb.add_button('Назад', 'negative')
+
+        case 'days':
+            kb.add_button('Добавить день', 'primary')
+            _, pages = kb.add_paginated_buttons([f'День {day + 1}' for day in range(day_count)], 'positive', page, columns=2,
+                                                reserved_lines=1, reserved_buttons=reservedButtons)
+            kb.add_line()
+            kb.add_button('Назад', 'negative')
+
+        case 'exercises':
+            kb.add_button('Начать тренировку', 'positive')
+            kb.add_line()
+            kb.add_button('Удалить день', 'negative')
+            kb.add_line()
+            kb.add_button('Добавить упражнение', 'primary')
+            _, pages = kb.add_paginated_buttons(day_exercises, 'positive', page, columns=2,
+                                                reserved_lines=1, reserved_buttons=reservedButtons)
+            kb.add_line()
+            kb.add_button('Назад', 'negative')
+
+        case 'exercise_list' | 'add_exercise':
+            for counter, (_, exercise) in enumerate(botPrefs.exercises):
+                kb.add_button(exercise.name, 'positive')
+                if counter % 2:
+                    kb.add_line()
+            kb.add_line()
+            kb.add_button('Назад', 'negative')
+
+        case 'profile_actions':
+            kb.add_button('Войти', 'primary')
+            kb.add_line()
+            kb.add_button('Переименовать', 'positive')
+            kb.add_line()
+            kb.add_button('Удалить', 'negative')
+
+        case 'exercise_actions':
+            kb.add_button(f'[Р] Подходы', 'negative')
+            kb.add_button(f'[О] Подходы', 'positive')
+            kb.add_line()
+            kb.add_button(f'[Р] Повторения', 'negative')
+            kb.add_button(f'[О] Повторения', 'positive')
+            kb.add_line()
+            kb.add_button(f'[Р] Вес', 'negative')
+            kb.add_button(f'[О] Вес', 'positive')
+            kb.add_line()
+            kb.add_button('Заметка', 'secondary')
+
+        case 'exercise_actions_extended':
+            kb.add_button(f'[Р] Подходы', 'negative')
+            kb.add_button(f'[О] Подходы', 'positive')
+            kb.add_line()
+            kb.add_button(f'[Р] Повторения', 'negative')
+            kb.add_button(f'[О] Повторения', 'positive')
+            kb.add_line()
+            kb.add_button(f'[Р] Вес', 'negative')
+            kb.add_button(f'[О] Вес', 'positive')
+            kb.add_line()
+            kb.add_button('Заметка', 'secondary')
+            kb.add_button('Удалить', 'negative', ['remove_exercise'])
+
+        case _:
+            return kb.get_empty_keyboard(), pages
+
+    if not inline and has_to_menu_button:
+        kb.add_button('🔚В меню', 'negative')
+
+    return kb.to_json(), pages
+
+
+staticKeyboards: dict[tuple[str, bool, bool], str] = {
+    (keyboardType, inline, hasToMenuButton): buildKeyboard.__wrapped__(keyboardType, inline, hasToMenuButton)[0]
+    for keyboardType in Constants.staticKeyboards for inline in (keyboardType in Constants.inlineKeyboards,)
+    for hasToMenuButton in (False, True)
+}
+
+for class_ in (BotPrefs, BaseUser):
+    getDecoder(class_)
+    getDecoder(class_, strict=False)
+    getEncoder(class_)
+
+
+def drain(items: set) -> set:
+    drained = set()
+    while items:
+        drained.add(items.pop())
+    return drained
 
 
 class Users(dict):
+    """
+    Users by id. Assigning a user marks it dirty, flush() appends only the dirty users to the journal
+    and compacts the journal into the snapshot file once it grows past Database.usersJournalCompactBytes
+    or Database.usersJournalCompactSeconds have passed since the last compaction
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.snapshotPath: Path = Database.usersFilePath
+        self.journalPath: Path = Database.usersJournalFilePath
+        self._dirty: set[int] = set()
+        self._deleted: set[int] = set()
+        self._flushLock = Lock()
+        self._lastCompact = monotonic()
+
+    def __setitem__(self, key: int, value: BaseUser) -> None:
+        super().__setitem__(key, value)
+        self._deleted.discard(key)
+        self._dirty.add(key)
+
+    def __delitem__(self, key: int) -> None:
+        super().__delitem__(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def markDirty(self, key: int, user: BaseUser | None = None) -> None:
+        self._dirty.add(key)
+
+    @property
+    def dirtyCount(self) -> int:
+        return len(self._dirty) + len(self._deleted)
 
     @property
     def toDict(self) -> dict[str, Any]:
-        return {userIdStr_: userClass.toDict for userIdStr_, userClass in self.items()}
+        return {str(userId): user.toDict for userId, user in [*self.items()]}
 
     def toFile(self, file_path: Path | str = Database.usersFilePath) -> None:
         with open(file_path, 'w') as file:
             file.write(dumps(self.toDict, indent=4, escape_forward_slashes=False))
 
+    def flush(self, compact: bool = False) -> int:
+        with self._flushLock:
+            dirty, deleted = drain(self._dirty), drain(self._deleted)
+            records = [dumps({'id': userId, 'user': user.toDict}, escape_forward_slashes=False)
+                       for userId in dirty if (user := self.get(userId)) is not None]
+            records += [dumps({'id': userId, 'deleted': True}) for userId in deleted]
+            if records:
+                with open(self.journalPath, 'a') as journal:
+                    journal.write('\n'.join(records) + '\n')
+                    journal.flush()
+                    fsync(journal.fileno())
+            if (compact or monotonic() - self._lastCompact >= Database.usersJournalCompactSeconds or
+                    (exists(self.journalPath) and getsize(self.journalPath) > Database.usersJournalCompactBytes)):
+                self._compact()
+            return len(records)
+
+    def _compact(self) -> None:
+        temporaryPath = self.snapshotPath.with_suffix(f'{self.snapshotPath.suffix}.tmp')
+        with open(temporaryPath, 'w') as file:
+            file.write(dumps(self.toDict, indent=4, escape_forward_slashes=False))
+            file.flush()
+            fsync(file.fileno())
+        # the journal is truncated only once the new snapshot is on disk
+        replace(temporaryPath, self.snapshotPath)
+        open(self.journalPath, 'w').close()
+        self._lastCompact = monotonic()
+
+    def _replayJournal(self, user_class: Type[BaseUser]) -> None:
+        if not exists(self.journalPath):
+            return
+        with open(self.journalPath) as journal:
+            for line in journal:
+                try:
+                    record = loads(line)
+                except JSONDecodeError:
+                    break
+                if record.get('deleted'):
+                    super().pop(int(record['id']), None)
+                else:
+                    super().__setitem__(int(record['id']), user_class.fromDict(record['user'], strict=False))
+
     @classmethod
     def fromDict(cls, dictionary: dict[str, Any], user_class: Type[BaseUser] = BaseUser) -> Self:
-        return cls({userIdStr_: user_class.fromDict(userDict) for userIdStr_, userDict in dictionary.items()})
+        return cls({int(userIdStr_): user_class.fromDict(userDict, strict=False) for userIdStr_, userDict in dictionary.items()})
 
     @classmethod
-    def fromFile(cls, file_path: Path | str = Database.usersFilePath, user_class: Type[BaseUser] = BaseUser) -> Self:
+    def fromFile(cls, file_path: Path | str = Database.usersFilePath, user_class: Type[BaseUser] = BaseUser,
+                 journal_path: Path | str = Database.usersJournalFilePath) -> Self:
         if not exists(Database.reserveCopyFolderPath):
             makedirs(Database.reserveCopyFolderPath)
         if not exists(file_path):
             with open(file_path, 'w') as file:
                 file.write('{}')
-        try:
-            with open(file_path) as file:
-                return cls.fromDict(loads(file.read()), user_class)
-        except JSONDecodeError:
-            return cls()
+        with pausedGarbageCollection():
+            try:
+                with open(file_path) as file:
+                    users = cls.fromDict(loads(file.read()), user_class)
+            except JSONDecodeError:
+                users = cls()
+            users.snapshotPath, users.journalPath = Path(file_path), Path(journal_path)
+            users._replayJournal(user_class)
+        return users
@@ -1,12 +1,13 @@
+from collections import deque
 from pathlib import Path
 from threading import Thread
 from typing import Callable, Final, Optional, Type
 
 
 
-__all__ = ['Group', 'Constants', 'Database', 'logs', 'group', 'decideAsync',
+__all__ = ['Group', 'Constants', 'Database', 'Dispatching', 'ApiLimits', 'LongPolling', 'Sending', 'Logging', 'InputLimits', 'Startup', 'Names', 'CatchingUp', 'Broadcasting', 'logs', 'group', 'decideAsync',
            'TEST_VERSION', 'WORKING', 'LOG_MODE',
-           'ADD_USERS_FROM_ALL_CONVERSATIONS', 'SKIP_UPDATES', 'POST_UPDATE_MESSAGE']
+           'ADD_USERS_FROM_ALL_CONVERSATIONS', 'SKIP_UPDATES', 'POST_UPDATE_MESSAGE', 'ASYNC_MODE', 'SQLITE_USERS']
 
 TEST_VERSION: Final[bool] = True
 WORKING: bool = True
@@ -14,6 +15,8 @@ LOG_MODE: int = 1
 ADD_USERS_FROM_ALL_CONVERSATIONS: Final[bool] = True
 SKIP_UPDATES: Final[bool] = False
 POST_UPDATE_MESSAGE: Final[bool] = True
+ASYNC_MODE: Final[bool] = False
+SQLITE_USERS: Final[bool] = False
 
 
 def decideAsync(condition: bool, target: Callable, thread_name_if_async: str) -> None:
@@ -52,6 +55,9 @@ class Constants:
 
     inlineKeyboards: set[str] = {'profile_actions', 'exercise_actions', 'exercise_actions_extended'}
     keyboardsWithToMenuButton: set[str] = {'last', 'days', 'exercises'}
+    staticKeyboards: set[str] = {'main', 'exercise_list', 'add_exercise', 'profile_actions', 'exercise_actions',
+                                 'exercise_actions_extended'}
+    keyboardCacheSize: int = 4096
 
 
 class Database:
@@ -61,11 +67,100 @@ class Database:
     reserveCopyFolderPath: Path = Path(folderName, reserveCopyFolderName)
     usersFileName: str = 'users.json'
     usersFilePath: Path = Path(folderName, usersFileName)
+    usersJournalFileName: str = 'users.journal'
+    usersJournalFilePath: Path = Path(folderName, usersJournalFileName)
+    usersJournalCompactBytes: int = 16 * 1024 * 1024
+    usersJournalCompactSeconds: float = 24 * 60 * 60
+    usersDatabaseFileName: str = 'users.sqlite3'
+    usersDatabaseFilePath: Path = Path(folderName, usersDatabaseFileName)
+    usersCacheSize: int = 10_000
     botPrefsFileName: str = 'botPrefs.json'
     botPrefsFilePath: Path = Path(folderName, botPrefsFileName)
     todoFileName: str = 'todo.json'
     todoFilePath: Path = Path(folderName, todoFileName)
+    longPollCheckpointFileName: str = 'longpoll.json'
+    longPollCheckpointFilePath: Path = Path(folderName, longPollCheckpointFileName)
+    outboxJournalFileName: str = 'outbox.journal'
+    outboxJournalFilePath: Path = Path(folderName, outboxJournalFileName)
+    morphologyFileName: str = 'morphology.json'
+    morphologyFilePath: Path = Path(folderName, morphologyFileName)
+    broadcastFileName: str = 'broadcast.json'
+    broadcastFilePath: Path = Path(folderName, broadcastFileName)
 
 
-logs: list[str] = []
+class Dispatching:
+    workers: int = 8
+    queueSize: int = 10_000
+    stopTimeoutSeconds: float = 10.
+
+
+class ApiLimits:
+    groupRequestsPerSecond: int = 20
+    userRequestsPerSecond: int = 3
+    connectionPoolSize: int = 32
+    coalescedMethods: tuple[str, ...] = ('messages.send', 'users.get')
+    coalesceWindowSeconds: float = .03
+
+
+class LongPolling:
+    waitSeconds: int = 25
+    minWaitSeconds: int = 1
+    maxBackoffSeconds: float = 60.
+    checkpointFlushSeconds: float = 1.
+    dedupeEventIds: int = 10_000
+
+
+class Sending:
+    workers: int = 4
+    queueSize: int = 10_000
+    maxRetries: int = 5
+    retryBackoffSeconds: float = .5
+    maxRetryBackoffSeconds: float = 30.
+    retriedErrorCodes: set[int] = {6, 10}
+    journalCommitSeconds: float = .005
+    journalCompactBytes: int = 4 * 1024 * 1024
+    peersPerSend: int = 100
+    sendsPerExecute: int = 25
+
+
+class Logging:
+    ringBufferSize: int = 10_000
+    maxPending: int = 100_000
+    useRich: bool = True
+
+
+class Names:
+    ttlSeconds: float = 24 * 3600.
+    batchSize: int = 1000
+    batchWindowSeconds: float = .05
+    cacheSize: int = 100_000
+
+
+class Startup:
+    firstPollBudgetSeconds: float = 3.
+    deferNonCriticalInit: bool = True
+    profiledModules: tuple[str, ...] = ('scripts.vktb',)
+
+
+class CatchingUp:
+    pageSize: int = 200
+    replayMissedMessages: bool = True
+    replayMaxAgeSeconds: float = 24 * 3600.
+    notice: str = ('❕Когда вы написали боту в последний раз, он был выключен и не отвечал на ваши сообщения. '
+                   'Теперь он снова работает.')
+
+
+class Broadcasting:
+    executesPerSecond: float = 2.
+    progressIntervalSeconds: float = 10.
+
+
+class InputLimits:
+    approaches: tuple[int, int] = (0, 100)
+    repetitions: tuple[int, int] = (0, 1000)
+    weight: tuple[float, float] = (0., 1000.)
+    poundKilograms: float = .45359237
+
+
+logs: deque[str] = deque(maxlen=Logging.ringBufferSize)
 group: Type[Group.Test | Group.Public] = Group.Test if TEST_VERSION else Group.Public
@@ -0,0 +1,257 @@
+from sys import stdout
+
+from ujson import dumps
+
+from .classes import Approaches, botPrefs
+from .functions import prettyRoundFloat
+from .parsing import parseApproaches, parseRepetitions, parseWeight
+from .routing import MessageContext, Router
+
+
+__all__ = ['dialog']
+
+dialog = Router(states=('main', 'profiles', 'days', 'exercises', 'exercise_list', 'add_exercise'))
+
+
+@dialog.command('start', 'начать')
+def start(context: MessageContext) -> None:
+    context.keyboard = 'main'
+    context.message = 'Привет'
+
+
+@dialog.command('назад', states=('days',))
+def backToProfiles(context: MessageContext) -> None:
+    context.keyboard = 'profiles'
+    context.message = 'Вы вернулись в меню профилей.'
+
+
+@dialog.command('назад', states=('exercises',))
+def backToDays(context: MessageContext) -> None:
+    context.keyboard = 'days'
+    context.message = 'Вы вернулись в меню дней.'
+
+
+@dialog.command('назад', states=('add_exercise',))
+def backToExercises(context: MessageContext) -> None:
+    context.keyboard = 'exercises'
+    context.message = 'Вы вернулись в список упражнений.'
+
+
+@dialog.command('назад', '🔚в меню')
+def backToMenu(context: MessageContext) -> None:
+    context.keyboard = 'main'
+    context.message = 'Вы вернулись в главное меню.'
+
+
+@dialog.command('профили')
+def profiles(context: MessageContext) -> None:
+    context.keyboard = 'profiles'
+    context.message = 'Вы попали в меню профилей. Здесь в них можно войти, их можно добавлять, редактировать и удалять.'
+
+
+@dialog.command('создать новый профиль')
+def createProfile(context: MessageContext) -> None:
+    context.message = 'Введите имя нового профиля.'
+
+
+@dialog.command('войти')
+def enterProfile(context: MessageContext) -> None:
+    context.keyboard = 'days'
+    context.message = 'Выберите день тренировки, добавьте новый или измените существующий.'
+
+
+@dialog.command('переименовать')
+def renameProfile(context: MessageContext) -> None:
+    context.message = f'Введите новое название профиля {context.user.currentProfileName!r}.'
+
+
+@dialog.command('удалить')
+def removeProfile(context: MessageContext) -> None:
+    user = context.user
+    context.keyboard = 'profiles'
+    context.message = f'Профиль {user.currentProfileName!r} удалён.'
+    del user.profileNames[user.profile], user.profiles[user.profile]
+    user.profile = 0
+
+
+@dialog.command('добавить день')
+def addDay(context: MessageContext) -> None:
+    context.user.profiles[context.user.profile].append([])
+    context.message = 'Новый день добавлен.'
+
+
+@dialog.command('удалить день')
+def removeDay(context: MessageContext) -> None:
+    user = context.user
+    context.keyboard = 'days'
+    del user.profiles[user.profile][user.day]
+    context.message = f'{user.day + 1}-й день удалён.'
+    user.day = 0
+
+
+@dialog.command('начать тренировку')
+def startWorkout(context: MessageContext) -> None:
+    context.message = 'Функция в разработке.'
+
+
+@dialog.command('page')
+def changePage(context: MessageContext) -> None:
+    # the page number comes from the page buttons' payload, "page" typed as text or a stale button is ignored
+    if type(context.additional) is not int or not 0 <= context.additional < context.user.keyboardPageCount():
+        return
+    context.user.keyboardPage = context.additional
+    context.message = f'Страница {context.user.keyboardPage + 1}.'
+
+
+@dialog.command('добавить упражнение')
+def addExercise(context: MessageContext) -> None:
+    context.keyboard = 'add_exercise'
+    context.message = 'Выберите упражнение для добавления.'
+
+
+@dialog.command('упражнения')
+def exerciseList(context: MessageContext) -> None:
+    context.keyboard = 'exercise_list'
+    context.message = ('Вы попали в меню упражнений. Здесь можно настроить количество подходов, повторений, '
+                       'вес упражнения и добавить к нему заметку.')
+
+
+valuePrompts: dict[str, str] = {'[р] подходы': 'Введите количество разминочных подходов.',
+                                '[о] подходы': 'Введите количество основных подходов.',
+                                '[р] повторения': 'Введите количество повторений в разминочные подходы.',
+                                '[о] повторения': 'Введите количество повторений в основные подходы.',
+                                '[р] вес': 'Введите вес в разминочные подходы.',
+                                '[о] вес': 'Введите вес в основные подходы.',
+                                'заметка': 'Введите заметку к упражнению.'}
+
+
+@dialog.command(*valuePrompts)
+def askForValue(context: MessageContext) -> None:
+    context.message = valuePrompts[context.normalized]
+
+
+@dialog.command('remove_exercise')
+def removeExercise(context: MessageContext) -> None:
+    user = context.user
+    context.keyboard = 'exercises'
+    context.message = f'Упражнение {user.exercises[user.exerciseEditing].name!r} удалено из дня.'
+    user.profiles[user.profile][user.day].remove(user.exercises[user.exerciseEditing].name)
+    user.exerciseEditing = 0
+
+
+@dialog.choice('days')
+def chooseDay(context: MessageContext) -> bool:
+    word, _, number = context.text.partition(' ')
+    if word != 'День' or not number.isdecimal() or f'День {int(number)}' != context.text \
+            or not 0 < int(number) <= len(context.user.currentProfile):
+        return False
+    context.keyboard = 'exercises'
+    context.user.day = int(number) - 1
+    context.message = f'Вы попали в список упражнений {context.user.day + 1}-го дня.'
+    return True
+
+
+@dialog.choice('exercise_list')
+def chooseExercise(context: MessageContext) -> bool:
+    if (exerciseIndex := botPrefs.exerciseIndexes.get(context.text)) is None:
+        return False
+    context.keyboard = 'exercise_actions'
+    context.user.exerciseEditing = exerciseIndex
+    context.message = (f'Выберите действие с упражнением {context.text!r}.\n'
+                       f'Об упражнении:\n{botPrefs.getExerciseByNameRu(context.text).description}')
+    return True
+
+
+@dialog.choice('add_exercise')
+def chooseExerciseToAdd(context: MessageContext) -> bool:
+    if (exerciseIndex := botPrefs.exerciseIndexes.get(context.text)) is None:
+        return False
+    user = context.user
+    context.keyboard = 'exercise_actions_extended'
+    user.exerciseEditing = exerciseIndex
+    user.profiles[user.profile][user.day].append(context.text)
+    context.message = (f'Упражнение {context.text!r} добавлено. Теперь вы можете сразу отредактировать его, используя кнопки ниже.\n'
+                       f'Об упражнении:\n{botPrefs.getExerciseByNameRu(context.text).description}')
+    return True
+
+
+@dialog.choice('exercises')
+def chooseDayExercise(context: MessageContext) -> bool:
+    if (exerciseIndex := botPrefs.exerciseIndexes.get(context.text)) is None:
+        return False
+    exercise = botPrefs.getExerciseByNameRu(context.text)
+    context.keyboard = 'exercise_actions_extended'
+    context.user.exerciseEditing = exerciseIndex
+    context.message = (f'Выберите действие с упражнением {context.text!r}.\n'
+                       f'Текущие настройки: {context.user.getExerciseByName(context.text)!r}\n'
+                       f'Об упражнении:\n{exercise.description}')
+    context.attachment = exercise.animationVkId
+    return True
+
+
+@dialog.choice('profiles')
+def chooseProfile(context: MessageContext) -> bool:
+    if context.text not in context.user.profileNames:
+        return False
+    context.keyboard = 'profile_actions'
+    context.user.profile = context.user.profileNames.index(context.text)
+    context.message = f'Выберите действие с профилем {context.text!r}.'
+    return True
+
+
+@dialog.prompt('Создать новый профиль')
+def newProfileName(context: MessageContext, name: str) -> None:
+    user = context.user
+    if name in user.profileNames:
+        context.message = 'Профиль с таким именем уже существует.'
+        return
+    user.profiles.append([])
+    user.profileNames.append(name)
+    context.message = f'Новый профиль {name!r} добавлен.'
+
+
+@dialog.prompt('Переименовать')
+def profileName(context: MessageContext, name: str) -> None:
+    user = context.user
+    context.message = f'Профиль {user.currentProfileName!r} переименован в {name!r}.'
+    user.profileNames[user.profile] = name
+
+
+def editedApproaches(context: MessageContext) -> tuple[Approaches, bool]:
+    exercise = context.user.exercises[context.user.exerciseEditing]
+    warmUp = context.user.lastMessage.startswith('[Р]')
+    return exercise.warmUpApproaches if warmUp else exercise.mainApproaches, warmUp
+
+
+@dialog.prompt('[Р] Подходы', '[О] Подходы', parser=parseApproaches)
+def approachesAmount(context: MessageContext, amount: int) -> None:
+    approaches, warmUp = editedApproaches(context)
+    approaches.amount = amount
+    context.message = f'Количество {'разминочных' if warmUp else 'основных'} подходов изменено на {amount}.'
+
+
+@dialog.prompt('[Р] Повторения', '[О] Повторения', parser=parseRepetitions)
+def approachesRepetitions(context: MessageContext, repetitions: int) -> None:
+    approaches, warmUp = editedApproaches(context)
+    approaches.repetitions = repetitions
+    context.message = f'Количество повторений в {'разминочные' if warmUp else 'основные'} подходы изменено на {repetitions}.'
+
+
+@dialog.prompt('[Р] Вес', '[О] Вес', parser=parseWeight)
+def approachesWeight(context: MessageContext, weight: float) -> None:
+    approaches, warmUp = editedApproaches(context)
+    approaches.weight = weight
+    context.message = f'Вес в {'разминочные' if warmUp else 'основные'} подходы изменён на {prettyRoundFloat(weight, 2)} кг.'
+
+
+@dialog.prompt('Заметка')
+def exerciseNote(context: MessageContext, note: str) -> None:
+    context.user.exercises[context.user.exerciseEditing].note = note
+    context.message = 'Заметка добавлена.'
+
+
+dialog.compile()
+
+
+if __name__ == '__main__':
+    stdout.write(f'{dumps(dialog.export(), ensure_ascii=False, indent=4)}\n')
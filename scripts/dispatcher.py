@@ -0,0 +1,157 @@
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Hashable, Self
+
+from .config import *
+from .functions import log
+from libs.vk_api_fast.bot_longpoll import VkBotEvent
+
+
+__all__ = ['DispatcherStats', 'LaneDispatcher', 'getEventPeerId']
+
+
+def getEventPeerId(vk_event: VkBotEvent) -> int:
+    if vk_event.message is not None:
+        return vk_event.message.get('from_id', 0)
+    # message_edit and message_reply carry the message itself as the object
+    return vk_event.object.get('from_id') or vk_event.object.get('user_id', 0)
+
+
+@dataclass(slots=True)
+class DispatcherStats:
+    workers: int
+    busyWorkers: int
+    queueDepth: int
+    peakQueueDepth: int
+    lanes: int
+    maxLaneDepth: int
+    submitted: int
+    processed: int
+    errors: int
+    blockedSubmits: int
+    queueWaitSeconds: float
+
+
+class LaneDispatcher:
+    """
+    Fixed-size worker pool with per-key lanes: items with the same key are handled one at a time in submission order,
+    items with different keys are handled in parallel. submit() blocks while queue_size items are pending
+    """
+
+    def __init__(self, handler: Callable[[Any], None], key: Callable[[Any], Hashable] = getEventPeerId,
+                 workers: int = Dispatching.workers, queue_size: int = Dispatching.queueSize,
+                 name: str = 'Event handler') -> None:
+        self.handler = handler
+        self.key = key
+        self.workers = workers
+        self.queueSize = queue_size
+        self.name = name
+        self._lanes: dict[Hashable, deque[tuple[Any, float]]] = {}
+        self._ready: deque[Hashable] = deque()
+        self._lock = Lock()
+        self._hasWork = Condition(self._lock)
+        self._hasSpace = Condition(self._lock)
+        self._threads: list[Thread] = []
+        self._running = False
+        self._pending = self._peakPending = self._busy = 0
+        self._submitted = self._processed = self._errors = self._blockedSubmits = 0
+        self._queueWaitSeconds = 0.
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def queueDepth(self) -> int:
+        return self._pending
+
+    @property
+    def stats(self) -> DispatcherStats:
+        with self._lock:
+            return DispatcherStats(
+                workers=len(self._threads), busyWorkers=self._busy,
+                queueDepth=self._pending, peakQueueDepth=self._peakPending,
+                lanes=len(self._lanes), maxLaneDepth=max(map(len, self._lanes.values()), default=0),
+                submitted=self._submitted, processed=self._processed, errors=self._errors,
+                blockedSubmits=self._blockedSubmits, queueWaitSeconds=self._queueWaitSeconds
+            )
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [Thread(target=self._work, name=self.name, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item: Any, timeout: float | None = None) -> bool:
+        key = self.key(item)
+        with self._lock:
+            if self._pending >= self.queueSize:
+                self._blockedSubmits += 1
+                if not self._hasSpace.wait_for(lambda: self._pending < self.queueSize or not self._running, timeout):
+                    return False
+            if not self._running:
+                return False
+            if (lane := self._lanes.get(key)) is None:
+                lane = self._lanes[key] = deque()
+                self._ready.append(key)
+                self._hasWork.notify()
+            lane.append((item, perf_counter()))
+            self._pending += 1
+            self._submitted += 1
+            if self._pending > self._peakPending:
+                self._peakPending = self._pending
+        return True
+
+    def join(self, timeout: float | None = None) -> bool:
+        with self._lock:
+            return self._hasSpace.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, wait: bool = True, timeout: float = Dispatching.stopTimeoutSeconds) -> None:
+        if wait:
+            self.join(timeout)
+        with self._lock:
+            self._running = False
+            self._hasWork.notify_all()
+            self._hasSpace.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        lock, hasWork, hasSpace = self._lock, self._hasWork, self._hasSpace
+        while True:
+            with lock:
+                while not self._ready:
+                    if not self._running:
+                        return
+                    hasWork.wait()
+                key = self._ready.popleft()
+                lane = self._lanes[key]
+                item, submittedAt = lane.popleft()
+                self._busy += 1
+                self._queueWaitSeconds += perf_counter() - submittedAt
+            try:
+                self.handler(item)
+                failed = False
+            except Exception as exception:
+                failed = True
+                log('error', f'{self.name} failed: {exception!r}')
+            with lock:
+                self._busy -= 1
+                self._pending -= 1
+                self._processed += 1
+                self._errors += failed
+                if lane:
+                    self._ready.append(key)
+                    hasWork.notify()
+                else:
+                    del self._lanes[key]
+                hasSpace.notify_all()
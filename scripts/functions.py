@@ -1,23 +1,21 @@
+import builtins
+import gc
+from contextlib import contextmanager
 from datetime import datetime
 from secrets import randbelow
 from socket import gethostbyname, gethostname, create_connection
 from threading import Thread
-from typing import Any, Iterable
-
-
-from emoji import replace_emoji
-from pymorphy3 import MorphAnalyzer
-from rich import print as richPrint
-
+from typing import Any, Iterable, Iterator
 
 from .config import *
+from .logger import log
+from .morphology import morphology
 from libs.vk_api_fast.bot_longpoll import VkBotEvent
 
 
-__all__ = ['threadsStartJoin', 'tryParse', 'prettyRoundFloat', 'boolConverter',
+__all__ = ['threadsStartJoin', 'pausedGarbageCollection', 'tryParse', 'prettyRoundFloat', 'boolConverter',
            'return0s', 'randint', 'random', 'generateTimeAgo', 'matchNumber', 'constructMessageEvent',
            'getMyIP', 'isConnected', 'log']
-morph = MorphAnalyzer()
 
 
 def threadsStartJoin(threads: Iterable[Thread]) -> None:
@@ -27,11 +25,28 @@ def threadsStartJoin(threads: Iterable[Thread]) -> None:
         thread.join()
 
 
+@contextmanager
+def pausedGarbageCollection() -> Iterator[None]:
+    """
+    Cyclic garbage collection off while a lot of long-lived objects are created at once (loading the users)
+    """
+    wasEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if wasEnabled:
+            gc.enable()
+
+
 def tryParse(value: Any, parse_to: str | type) -> bool:
+    """
+    Whether value converts to parse_to (a type or a builtin type name). Use scripts.parsing for user input
+    """
     try:
-        eval(f'{parse_to if isinstance(parse_to, str) else parse_to.__name__}({value!r})')
+        (getattr(builtins, parse_to) if isinstance(parse_to, str) else parse_to)(value)
         return True
-    except Exception:
+    except (AttributeError, TypeError, ValueError, OverflowError):
         return False
 
 
@@ -84,14 +99,16 @@ def generateTimeAgo(time_ago: str, inflects: Iterable = ('nomn', 'sing')) -> str
 
 
 def matchNumber(word: str, number: int, inflects: Iterable = ('nomn', 'sing')) -> str:
-    return f'{number:_} {f'{word} + {'a' if number % 10 in {2, 3, 4} and number not in {12, 13, 14} else ''}' if word == 'раз'
-                         else morph.parse(word)[0].inflect({*inflects}).make_agree_with_number(number).word}'
+    return f'{number:_} {morphology.agree(word, number, inflects)}'
 
 
-def constructMessageEvent(group_id: int, dev_id: int, message: str) -> VkBotEvent:
+def constructMessageEvent(group_id: int, dev_id: int, message: str | dict[str, Any]) -> VkBotEvent:
+    """
+    message_new event with message text from dev_id or with a message object as VK returns it
+    """
     return VkBotEvent({
         'group_id': group_id, 'type': 'message_new', 'event_id': '', 'v': '5.131', 'object': {
-            'message': {
+            'message': message if isinstance(message, dict) else {
                 'entity_version': 0, 'date': 0, 'from_id': dev_id, 'id': 0, 'out': 0, 'attachments': [],
                 'conversation_message_id': 0, 'fwd_messages': [], 'important': False, 'is_hidden': False,
                 'peer_id': dev_id, 'random_id': 0, 'text': message
@@ -115,43 +132,3 @@ def isConnected(host_name: str = Constants.vkIP) -> bool:
     except Exception:
         return False
 
-
-def log(level: str = '', message: Any = '', importance_level: int = 0, no_level_color: str = '#ffffff',
-        log_format: str = '[%level] %datetime: %message',
-        datetime_format: str = Constants.DateTimeForms.forLog,
-        async_: bool = True, end: str = '\n') -> None:
-    """
-    Pretty logging basically
-    """
-    if importance_level > LOG_MODE:
-        return
-    message = str(message)
-
-    def log() -> None:
-        match level:
-            case 'info':
-                color = '#00ff00'
-            case 'warn':
-                color = '#ffff00'
-            case 'error':
-                color = '#ff0000'
-            case 'debug':
-                color = '#ff00ff'
-            case _:
-                color = no_level_color
-        toLog = (log_format
-                 .replace('%level', level.upper())
-                 .replace('%datetime', f'{datetime.now():{datetime_format}}')
-                 .replace('%message', message))
-        logs.append(toLog)
-        try:
-            richPrint(f'[{color}]{toLog}[/{color}]', end=end)
-        except UnicodeEncodeError:
-            try:
-                richPrint(f'[{color}]{replace_emoji(toLog)}[/{color}]', end=end)
-            except UnicodeEncodeError:
-                print(f'{toLog!a}', end=end)
-    if async_:
-        Thread(target=log, name='Logger').start()
-    else:
-        log()
@@ -0,0 +1,164 @@
+import atexit
+import sys
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from queue import SimpleQueue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, TextIO
+
+from .config import *
+
+
+__all__ = ['LoggerStats', 'Logger', 'logger', 'log']
+
+levelColors: dict[str, str] = {'info': '#00ff00', 'warn': '#ffff00', 'error': '#ff0000', 'debug': '#ff00ff'}
+
+
+@dataclass(slots=True)
+class LoggerStats:
+    logged: int
+    written: int
+    dropped: int
+    pending: int
+
+
+@dataclass(slots=True)
+class LogRecord:
+    level: str
+    message: Any
+    color: str
+    logFormat: str
+    datetimeFormat: str
+    time: datetime
+    end: str
+    written: Event | None = None
+
+
+class Logger:
+    """
+    Single background writer draining a queue of log records into stdout (through rich if it is available and enabled)
+    and into the logs ring buffer. Messages are formatted by the writer, so a callable message costs nothing until then.
+    Records over max_pending are dropped instead of growing the queue, errors are never dropped.
+    rich and emoji are imported by the writer on the first record, not when the module is imported
+    """
+
+    def __init__(self, ring_buffer: deque[str] = logs, max_pending: int = Logging.maxPending,
+                 use_rich: bool = Logging.useRich, stream: TextIO | None = None) -> None:
+        self.ringBuffer = ring_buffer
+        self.maxPending = max_pending
+        self.stream = stream
+        self.useRich = use_rich
+        self.console = None
+        self._queue: SimpleQueue[LogRecord | Event | None] = SimpleQueue()
+        self._startLock = Lock()
+        self._statsLock = Lock()
+        self._thread: Thread | None = None
+        self.logged = self.written = self.dropped = 0
+
+    @property
+    def stats(self) -> LoggerStats:
+        with self._statsLock:
+            return LoggerStats(self.logged, self.written, self.dropped, self.logged - self.written - self.dropped)
+
+    def log(self, level: str = '', message: Any = '', importance_level: int = 0, no_level_color: str = '#ffffff',
+            log_format: str = '[%level] %datetime: %message',
+            datetime_format: str = Constants.DateTimeForms.forLog,
+            async_: bool = True, end: str = '\n') -> None:
+        if importance_level > LOG_MODE:
+            return
+        if self._thread is None:
+            self.start()
+        with self._statsLock:
+            self.logged += 1
+            if async_ and level != 'error' and self.logged - self.written - self.dropped > self.maxPending:
+                self.dropped += 1
+                return
+        record = LogRecord(level, message, levelColors.get(level, no_level_color), log_format, datetime_format,
+                           datetime.now(), end, None if async_ else Event())
+        self._queue.put(record)
+        if record.written is not None:
+            record.written.wait()
+
+    def format(self, record: LogRecord) -> str:
+        message = record.message() if callable(record.message) else record.message
+        return (record.logFormat
+                .replace('%level', record.level.upper())
+                .replace('%datetime', f'{record.time:{record.datetimeFormat}}')
+                .replace('%message', str(message)))
+
+    def write(self, record: LogRecord) -> None:
+        try:
+            toLog = self.format(record)
+        except Exception as exception:
+            toLog = f'[ERROR] Unable to format log message: {exception!r}'
+        self.ringBuffer.append(toLog)
+        if self.console is None:
+            (self.stream or sys.stdout).write(f'{toLog}{record.end}')
+            return
+        try:
+            self.console.print(f'[{record.color}]{toLog}[/{record.color}]', end=record.end)
+        except UnicodeEncodeError:
+            try:
+                from emoji import replace_emoji
+                self.console.print(f'[{record.color}]{replace_emoji(toLog)}[/{record.color}]', end=record.end)
+            except (UnicodeEncodeError, ImportError):
+                print(f'{toLog!a}', end=record.end, file=self.stream)
+
+    def _drain(self) -> None:
+        if self.useRich:
+            try:
+                from rich.console import Console
+                self.console = Console(file=self.stream)
+            except ImportError:
+                pass
+        while (record := self._queue.get()) is not None:
+            if isinstance(record, Event):
+                record.set()
+                continue
+            try:
+                self.write(record)
+            except Exception:
+                pass
+            finally:
+                with self._statsLock:
+                    self.written += 1
+                if record.written is not None:
+                    record.written.set()
+
+    def start(self) -> None:
+        with self._startLock:
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._drain, name='Logger', daemon=True)
+            self._thread.start()
+
+    def flush(self) -> None:
+        """
+        Waits until every record logged so far is written
+        """
+        if self._thread is not None:
+            written = Event()
+            self._queue.put(written)
+            written.wait()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+
+logger = Logger()
+atexit.register(logger.stop)
+
+
+def log(level: str = '', message: Any | Callable[[], Any] = '', importance_level: int = 0, no_level_color: str = '#ffffff',
+        log_format: str = '[%level] %datetime: %message',
+        datetime_format: str = Constants.DateTimeForms.forLog,
+        async_: bool = True, end: str = '\n') -> None:
+    """
+    Pretty logging basically. Pass a callable as message to build it only if the importance level is logged
+    """
+    logger.log(level, message, importance_level, no_level_color, log_format, datetime_format, async_, end)
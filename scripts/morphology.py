@@ -0,0 +1,114 @@
+from os import replace
+from pathlib import Path
+from threading import Lock
+from typing import Iterable
+
+from ujson import dumps, loads, JSONDecodeError
+
+from .config import *
+from .logger import log
+
+
+__all__ = ['Morphology', 'morphology', 'pluralClass', 'timeAgoWords']
+
+timeAgoWords: tuple[str, ...] = ('год', 'месяц', 'неделя', 'день', 'час', 'минута', 'секунда')
+fixedForms: dict[str, tuple[str, str, str]] = {'раз': ('раз', 'раза', 'раз')}
+
+
+def pluralClass(number: int) -> int:
+    """
+    Which form a number takes a noun in: 0 for 1, 21, 101, 1 for 2-4, 22-24, 2 for the rest (as pymorphy3 decides it)
+    """
+    number = abs(number)
+    if number % 10 == 1 and number % 100 != 11:
+        return 0
+    if 2 <= number % 10 <= 4 and not 10 <= number % 100 < 20:
+        return 1
+    return 2
+
+
+class Morphology:
+    """
+    Inflection tables: the three forms a word takes with numbers, per word and requested grammemes.
+    A table is built with pymorphy3 the first time the word is used (the whole time ago vocabulary at once),
+    then matching a word with a number is two dict lookups. With file_path the tables are kept on disk,
+    so the analyzer is not even loaded while no new words show up
+    """
+
+    def __init__(self, file_path: Path | str | None = Database.morphologyFilePath) -> None:
+        self.filePath = Path(file_path) if file_path is not None else None
+        self.tables: dict[tuple[str, frozenset[str]], tuple[str, str, str]] | None = None
+        self._resolved: dict[tuple[str, Iterable[str]], tuple[str, str, str]] = {}
+        self._analyzer = None
+        self._lock = Lock()
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from pymorphy3 import MorphAnalyzer
+            self._analyzer = MorphAnalyzer()
+        return self._analyzer
+
+    def load(self) -> None:
+        tables = {}
+        if self.filePath is not None and self.filePath.exists():
+            try:
+                with open(self.filePath, encoding='utf-8') as file:
+                    for key, forms in loads(file.read()).items():
+                        word, _, inflects = key.partition('|')
+                        tables[word, frozenset(inflects.split(',')) - {''}] = tuple(forms)
+            except (OSError, JSONDecodeError, ValueError, AttributeError) as exception:
+                log('warn', f'Unable to load morphology tables, they will be rebuilt: {exception!r}')
+                tables = {}
+        self.tables = tables
+
+    def save(self) -> None:
+        if self.filePath is None:
+            return
+        temporaryPath = self.filePath.with_suffix(f'{self.filePath.suffix}.tmp')
+        try:
+            with open(temporaryPath, 'w', encoding='utf-8') as file:
+                file.write(dumps({f'{word}|{','.join(sorted(inflects))}': forms for (word, inflects), forms in self.tables.items()},
+                                 ensure_ascii=False, indent=4))
+            replace(temporaryPath, self.filePath)
+        except OSError as exception:
+            log('warn', f'Unable to save morphology tables: {exception!r}')
+
+    def _build(self, word: str, inflects: frozenset[str]) -> tuple[str, str, str]:
+        if word in fixedForms:
+            return fixedForms[word]
+        parsed = self.analyzer.parse(word)[0].inflect({*inflects})
+        return tuple(parsed.make_agree_with_number(number).word for number in (1, 2, 5))
+
+    def forms(self, word: str, inflects: Iterable[str] = ('nomn', 'sing')) -> tuple[str, str, str]:
+        try:
+            return self._resolved[word, inflects]
+        except (KeyError, TypeError):
+            pass
+        forms = self._forms(word, frozenset(inflects))
+        try:
+            self._resolved[word, inflects] = forms
+        except TypeError:
+            pass
+        return forms
+
+    def _forms(self, word: str, inflects: frozenset[str]) -> tuple[str, str, str]:
+        with self._lock:
+            if self.tables is None:
+                self.load()
+            if (forms := self.tables.get((word, inflects))) is not None:
+                return forms
+            for newWord in timeAgoWords if word in timeAgoWords else (word,):
+                if (newWord, inflects) not in self.tables:
+                    self.tables[newWord, inflects] = self._build(newWord, inflects)
+            self.save()
+            return self.tables[word, inflects]
+
+    def agree(self, word: str, number: int, inflects: Iterable[str] = ('nomn', 'sing')) -> str:
+        """
+        word in the form that goes with number
+        """
+        return self.forms(word, inflects)[pluralClass(number)]
+
+
+morphology = Morphology()
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Condition, Thread
+from time import monotonic
+from typing import Callable, Iterable, Literal
+
+from requests import RequestException
+
+from .config import *
+from .functions import log
+from libs.vk_api_fast import VkApi
+from libs.vk_api_fast.exceptions import ApiError
+from libs.vk_api_fast.execute import VkFunction
+
+
+__all__ = ['NameCase', 'nameCases', 'UserNames', 'NameCacheStats', 'NameCache']
+
+NameCase = Literal['nom', 'gen', 'dat', 'acc', 'ins', 'abl']
+nameCases: tuple[NameCase, ...] = ('nom', 'gen', 'dat', 'acc', 'ins', 'abl')
+
+getUsersNames = VkFunction(args=('user_ids',), code=f'''
+    return [{', '.join(f'API.users.get({{"user_ids": %(user_ids)s, "name_case": "{nameCase}"'
+                       f'{', "fields": "sex"' if nameCase == 'nom' else ''}}})' for nameCase in nameCases)}];
+''')
+
+
+@dataclass(slots=True)
+class UserNames:
+    firstNames: dict[str, str]
+    lastNames: dict[str, str]
+    gender: int
+    fetchedAt: float
+
+
+@dataclass(slots=True)
+class NameCacheStats:
+    cached: int
+    hits: int
+    misses: int
+    fetches: int
+    fetchedUsers: int
+    pending: int
+
+
+class NameCache:
+    """
+    Users' names in all six cases. Lookups never touch the network: a missing or expired entry is queued and returns None
+    (an expired one returns the old names), one background thread fetches the queue Names.batchSize ids per execute,
+    every case of every id in that one request. on_fetched(user_id, names) is called for every fetched user
+    """
+
+    def __init__(self, vk: VkApi, ttl_seconds: float = Names.ttlSeconds, batch_size: int = Names.batchSize,
+                 batch_window_seconds: float = Names.batchWindowSeconds, cache_size: int = Names.cacheSize,
+                 on_fetched: Callable[[int, UserNames], None] | None = None) -> None:
+        self.vk = vk
+        self.ttlSeconds = ttl_seconds
+        self.batchSize = batch_size
+        self.batchWindowSeconds = batch_window_seconds
+        self.cacheSize = cache_size
+        self.onFetched = on_fetched
+        self._entries: OrderedDict[int, UserNames] = OrderedDict()
+        self._pending: dict[int, None] = {}
+        self._condition = Condition()
+        self._thread: Thread | None = None
+        self._running = False
+        self.hits = self.misses = self.fetches = self.fetchedUsers = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._running = True
+            self._thread = Thread(target=self._fetchLoop, name='Name fetcher', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+
+    def prefetch(self, user_ids: Iterable[int]) -> None:
+        """
+        Queues the users whose names are not cached or expired
+        """
+        now = monotonic()
+        with self._condition:
+            for userId in user_ids:
+                if (entry := self._entries.get(userId)) is None or now - entry.fetchedAt > self.ttlSeconds:
+                    self._pending[userId] = None
+            if self._pending:
+                self._condition.notify()
+
+    def getNames(self, user_id: int) -> UserNames | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            self.prefetch((user_id,))
+            return None
+        self.hits += 1
+        if monotonic() - entry.fetchedAt > self.ttlSeconds:
+            self.prefetch((user_id,))
+        return entry
+
+    def get(self, user_id: int, name_case: NameCase = 'nom') -> tuple[str, str] | None:
+        """
+        (first name, last name) in name_case, None if not cached yet
+        """
+        if (entry := self.getNames(user_id)) is None or 'nom' not in entry.firstNames:
+            return None
+        return (entry.firstNames.get(name_case, entry.firstNames['nom']),
+                entry.lastNames.get(name_case, entry.lastNames['nom']))
+
+    @property
+    def stats(self) -> NameCacheStats:
+        return NameCacheStats(len(self._entries), self.hits, self.misses, self.fetches, self.fetchedUsers, len(self._pending))
+
+    def _takeBatch(self) -> list[int] | None:
+        with self._condition:
+            while self._running and not self._pending:
+                self._condition.wait()
+            deadline = monotonic() + self.batchWindowSeconds
+            while self._running and len(self._pending) < self.batchSize and (remaining := deadline - monotonic()) > 0:
+                self._condition.wait(remaining)
+            if not self._running:
+                return None
+            batch = [*self._pending][:self.batchSize]
+            for userId in batch:
+                del self._pending[userId]
+            return batch
+
+    def _fetchLoop(self) -> None:
+        while (batch := self._takeBatch()) is not None:
+            if batch:
+                self._fetch(batch)
+
+    def _fetch(self, user_ids: list[int]) -> None:
+        try:
+            responses = getUsersNames(self.vk, ','.join(map(str, user_ids)))
+        except (ApiError, RequestException) as exception:
+            log('warn', f'Unable to get names of {len(user_ids)} user(s): {exception}')
+            return
+        now = monotonic()
+        entries: dict[int, UserNames] = {}
+        for nameCase, users in zip(nameCases, responses):
+            for user in users or ():
+                if (entry := entries.get(user['id'])) is None:
+                    entry = entries[user['id']] = UserNames({}, {}, user.get('sex', 0), now)
+                entry.firstNames[nameCase], entry.lastNames[nameCase] = user['first_name'], user['last_name']
+        with self._condition:
+            for userId, entry in entries.items():
+                self._entries[userId] = entry
+                self._entries.move_to_end(userId)
+            while len(self._entries) > self.cacheSize:
+                self._entries.popitem(last=False)
+        self.fetches += 1
+        self.fetchedUsers += len(entries)
+        if self.onFetched is not None:
+            for userId, entry in entries.items():
+                try:
+                    self.onFetched(userId, entry)
+                except Exception as exception:
+                    log('error', f'Name cache callback failed for {userId}: {exception!r}')
@@ -0,0 +1,336 @@
+from dataclasses import dataclass, field
+from functools import cache
+from os import fsync, replace
+from os.path import exists, getsize
+from pathlib import Path
+from queue import SimpleQueue
+from secrets import randbelow
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Any, Callable, Self
+
+from requests import RequestException
+from ujson import dumps, loads, JSONDecodeError
+
+from .config import *
+from .functions import log
+from .dispatcher import LaneDispatcher
+from libs.vk_api_fast import VkApi
+from libs.vk_api_fast.exceptions import ApiError
+from libs.vk_api_fast.execute import VkFunction
+
+
+__all__ = ['OutboxStats', 'OutgoingMessage', 'OutboxJournal', 'Outbox', 'MulticastResult', 'generateRandomId', 'multicast']
+
+
+def generateRandomId() -> int:
+    """
+    Non-zero random_id, VK drops a repeated (peer_id, random_id) pair, so a retried send is delivered once
+    """
+    return randbelow(2 ** 31 - 1) + 1
+
+
+@cache
+def getMulticastFunction(keys: tuple[str, ...]) -> VkFunction:
+    """
+    execute with one messages.send per [peer_ids, random_id] pair of batches, every send with the same values
+    """
+    return VkFunction(args=('batches', 'values'), return_raw=True, code=f'''
+        var batches = %(batches)s, values = %(values)s, results = [], i = 0;
+        while (i < batches.length) {{
+            results.push(API.messages.send({{"peer_ids": batches[i][0], "random_id": batches[i][1]{''.join(f', "{key}": values.{key}' for key in keys)}}}));
+            i = i + 1;
+        }}
+        return results;
+    ''')
+
+
+@dataclass(slots=True)
+class MulticastResult:
+    sent: list[int] = field(default_factory=list)
+    failed: dict[int, int] = field(default_factory=dict)
+    executes: int = 0
+    retries: int = 0
+
+
+def multicast(vk: VkApi, batches: list[tuple[list[int], int]], values: dict[str, Any],
+              max_retries: int = Sending.maxRetries, retry_backoff_seconds: float = Sending.retryBackoffSeconds,
+              max_retry_backoff_seconds: float = Sending.maxRetryBackoffSeconds) -> MulticastResult:
+    """
+    Sends the same message to every peer of batches, (peer ids, random_id) pairs of up to Sending.peersPerSend peers,
+    in one execute of up to Sending.sendsPerExecute messages.send calls. Calls and executes that failed with
+    Sending.retriedErrorCodes or a network error are retried with the same random_id, so nobody gets the message twice.
+    failed maps peer ids to error codes
+    """
+    multicastFunction, result, pending, errorCode = getMulticastFunction(tuple(values)), MulticastResult(), batches, 0
+    for attempt in range(max_retries + 1):
+        if attempt:
+            result.retries += 1
+            sleep(min(retry_backoff_seconds * 2 ** (attempt - 1), max_retry_backoff_seconds))
+        result.executes += 1
+        try:
+            response = multicastFunction(vk, [[','.join(map(str, peerIds)), randomId] for peerIds, randomId in pending], values)
+        except (ApiError, RequestException) as exception:
+            if isinstance(exception, ApiError) and exception.code not in Sending.retriedErrorCodes:
+                result.failed.update(dict.fromkeys((peerId for peerIds, _ in pending for peerId in peerIds), exception.code))
+                return result
+            errorCode = exception.code if isinstance(exception, ApiError) else 0
+            continue
+        responses, retried = response.get('response') or [], []
+        # execute_errors has an entry for every call that returned false, in the order of the calls
+        executeErrors = iter(response.get('execute_errors') or ())
+        for index, (peerIds, randomId) in enumerate(pending):
+            if index >= len(responses):
+                retried.append((peerIds, randomId))  # the execute stopped before this call
+                continue
+            if not isinstance(responses[index], list):
+                if (code := next(executeErrors, {}).get('error_code', 0)) in Sending.retriedErrorCodes:
+                    errorCode = code
+                    retried.append((peerIds, randomId))
+                else:
+                    result.failed.update(dict.fromkeys(peerIds, code))
+                continue
+            for delivery in responses[index]:
+                if 'error' in delivery:
+                    result.failed[delivery['peer_id']] = delivery['error'].get('code', 0)
+                else:
+                    result.sent.append(delivery['peer_id'])
+        if not (pending := retried):
+            return result
+    result.failed.update(dict.fromkeys((peerId for peerIds, _ in pending for peerId in peerIds), errorCode))
+    return result
+
+
+@dataclass(slots=True)
+class OutgoingMessage:
+    peerId: int
+    values: dict[str, Any]
+    randomId: int = field(default_factory=generateRandomId)
+    attempts: int = 0
+    queuedAt: float = field(default_factory=perf_counter)
+
+
+class OutboxJournal:
+    """
+    Append-only journal of queued and finished sends. Records are written by one thread with group commit:
+    everything queued during commit_interval_seconds is written and fsynced at once, so the caller never waits for the disk.
+    load() returns the sends that were queued but never finished, replaying them is safe since they keep their random_id
+    """
+
+    def __init__(self, file_path: Path | str = Database.outboxJournalFilePath,
+                 commit_interval_seconds: float = Sending.journalCommitSeconds,
+                 compact_bytes: int = Sending.journalCompactBytes) -> None:
+        self.filePath = Path(file_path)
+        self.commitIntervalSeconds = commit_interval_seconds
+        self.compactBytes = compact_bytes
+        self._queue: SimpleQueue[tuple[str, OutgoingMessage] | None] = SimpleQueue()
+        self._pending: dict[int, OutgoingMessage] = {}
+        self._thread: Thread | None = None
+        self.commits = self.records = 0
+
+    def load(self) -> list[OutgoingMessage]:
+        self._pending = {}
+        if exists(self.filePath):
+            with open(self.filePath) as journal:
+                for line in journal:
+                    try:
+                        record = loads(line)
+                    except JSONDecodeError:
+                        break
+                    if record['op'] == 'queued':
+                        self._pending[record['randomId']] = OutgoingMessage(record['peerId'], record['values'], record['randomId'])
+                    else:
+                        self._pending.pop(record['randomId'], None)
+        self._compact()
+        return [*self._pending.values()]
+
+    def queued(self, outgoing_message: OutgoingMessage) -> None:
+        self._queue.put(('queued', outgoing_message))
+
+    def done(self, outgoing_message: OutgoingMessage) -> None:
+        self._queue.put(('done', outgoing_message))
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._write, name='Outbox journal', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    @staticmethod
+    def _toLine(operation: str, outgoing_message: OutgoingMessage) -> str:
+        if operation == 'done':
+            return dumps({'op': operation, 'randomId': outgoing_message.randomId})
+        return dumps({'op': operation, 'peerId': outgoing_message.peerId, 'values': outgoing_message.values,
+                      'randomId': outgoing_message.randomId}, ensure_ascii=False, escape_forward_slashes=False)
+
+    def _compact(self) -> None:
+        temporaryPath = self.filePath.with_suffix(f'{self.filePath.suffix}.tmp')
+        with open(temporaryPath, 'w') as journal:
+            journal.writelines(f'{self._toLine('queued', outgoingMessage)}\n' for outgoingMessage in self._pending.values())
+            journal.flush()
+            fsync(journal.fileno())
+        replace(temporaryPath, self.filePath)
+
+    def _write(self) -> None:
+        stopping = False
+        while not stopping:
+            records = [self._queue.get()]
+            sleep(self.commitIntervalSeconds)
+            while not self._queue.empty():
+                records.append(self._queue.get())
+            if None in records:
+                stopping = True
+                records = [record for record in records if record is not None]
+            lines = []
+            for operation, outgoingMessage in records:
+                if operation == 'queued':
+                    self._pending[outgoingMessage.randomId] = outgoingMessage
+                else:
+                    self._pending.pop(outgoingMessage.randomId, None)
+                lines.append(f'{self._toLine(operation, outgoingMessage)}\n')
+            if not lines:
+                continue
+            try:
+                with open(self.filePath, 'a') as journal:
+                    journal.writelines(lines)
+                    journal.flush()
+                    fsync(journal.fileno())
+                self.commits += 1
+                self.records += len(lines)
+                if getsize(self.filePath) > self.compactBytes:
+                    self._compact()
+            except OSError as exception:
+                log('error', f'Unable to write outbox journal: {exception}')
+
+
+@dataclass(slots=True)
+class OutboxStats:
+    queued: int
+    sent: int
+    failed: int
+    retries: int
+    pending: int
+    averageDeliverySeconds: float
+    maxDeliverySeconds: float
+
+
+class Outbox:
+    """
+    Outgoing messages.send queue. Messages to the same peer are sent one at a time in submission order,
+    every message gets its own random_id that is kept across retries. API errors from Sending.retriedErrorCodes
+    and network errors are retried with exponential backoff. The global rps budget is enforced by the rate limiter of vk.
+    backend(values) makes the messages.send call itself, vk.method by default
+    """
+
+    def __init__(self, vk: VkApi, workers: int = Sending.workers, queue_size: int = Sending.queueSize,
+                 max_retries: int = Sending.maxRetries, retry_backoff_seconds: float = Sending.retryBackoffSeconds,
+                 max_retry_backoff_seconds: float = Sending.maxRetryBackoffSeconds,
+                 on_failure: Callable[[OutgoingMessage, Exception], None] | None = None,
+                 journal: OutboxJournal | None = None,
+                 backend: Callable[[dict[str, Any]], Any] | None = None) -> None:
+        self.vk = vk
+        self.backend = backend if backend is not None else lambda values: vk.method('messages.send', values)
+        self.journal = journal
+        self.maxRetries = max_retries
+        self.retryBackoffSeconds = retry_backoff_seconds
+        self.maxRetryBackoffSeconds = max_retry_backoff_seconds
+        self.onFailure = on_failure
+        self._dispatcher = LaneDispatcher(self._deliver, key=lambda message: message.peerId, workers=workers,
+                                          queue_size=queue_size, name='Message sender')
+        self._statsLock = Lock()
+        self._queued = self._sent = self._failed = self._retries = 0
+        self._deliverySeconds = self._maxDeliverySeconds = 0.
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Starts the senders, with a journal the sends left unfinished by the previous run are queued again first
+        """
+        self._dispatcher.start()
+        if self.journal is None:
+            return
+        unfinished = self.journal.load()
+        self.journal.start()
+        for outgoingMessage in unfinished:
+            self.put(outgoingMessage, journaled=True)
+        if unfinished:
+            log('info', f'Replaying {len(unfinished)} unfinished message(s) from the outbox journal')
+
+    def stop(self, wait: bool = True, timeout: float | None = Dispatching.stopTimeoutSeconds) -> None:
+        self._dispatcher.stop(wait, timeout)
+        if self.journal is not None:
+            self.journal.stop()
+
+    def join(self) -> None:
+        self._dispatcher.join()
+
+    def send(self, peer_id: int, message: str = '', **values: Any) -> OutgoingMessage:
+        """
+        Queues messages.send to peer_id with the given parameters, random_id is generated unless passed
+        """
+        values = {'peer_id': peer_id, 'message': message, **values}
+        outgoingMessage = (OutgoingMessage(peer_id, values, randomId) if (randomId := values.pop('random_id', 0)) else
+                           OutgoingMessage(peer_id, values))
+        return self.put(outgoingMessage)
+
+    def put(self, outgoing_message: OutgoingMessage, journaled: bool = False) -> OutgoingMessage:
+        with self._statsLock:
+            self._queued += 1
+        if self.journal is not None and not journaled:
+            self.journal.queued(outgoing_message)
+        if not self._dispatcher.submit(outgoing_message):
+            self._onDone(outgoing_message, RuntimeError('outbox is not running'), final=False)
+        return outgoing_message
+
+    def _deliver(self, outgoing_message: OutgoingMessage) -> None:
+        while True:
+            outgoing_message.attempts += 1
+            try:
+                self.backend({**outgoing_message.values, 'random_id': outgoing_message.randomId})
+            except (ApiError, RequestException, OSError) as exception:
+                retriable = not isinstance(exception, ApiError) or exception.code in Sending.retriedErrorCodes
+                if retriable and outgoing_message.attempts <= self.maxRetries:
+                    with self._statsLock:
+                        self._retries += 1
+                    sleep(min(self.retryBackoffSeconds * 2 ** (outgoing_message.attempts - 1), self.maxRetryBackoffSeconds))
+                    continue
+                self._onDone(outgoing_message, exception)
+                return
+            self._onDone(outgoing_message)
+            return
+
+    def _onDone(self, outgoing_message: OutgoingMessage, exception: Exception | None = None, final: bool = True) -> None:
+        if self.journal is not None and final:
+            self.journal.done(outgoing_message)
+        deliverySeconds = perf_counter() - outgoing_message.queuedAt
+        with self._statsLock:
+            if exception is None:
+                self._sent += 1
+                self._deliverySeconds += deliverySeconds
+                self._maxDeliverySeconds = max(self._maxDeliverySeconds, deliverySeconds)
+            else:
+                self._failed += 1
+        if exception is None:
+            return
+        log('error', f'Unable to send message to {outgoing_message.peerId} '
+                     f'after {outgoing_message.attempts} attempt(s): {exception}')
+        if self.onFailure is not None:
+            self.onFailure(outgoing_message, exception)
+
+    @property
+    def stats(self) -> OutboxStats:
+        with self._statsLock:
+            return OutboxStats(self._queued, self._sent, self._failed, self._retries,
+                               self._queued - self._sent - self._failed,
+                               self._deliverySeconds / self._sent if self._sent else 0., self._maxDeliverySeconds)
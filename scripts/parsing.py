@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from re import compile as compileRegex
+
+from .config import *
+
+
+__all__ = ['NumberField', 'parseNumber', 'approachesField', 'repetitionsField', 'weightField',
+           'parseApproaches', 'parseRepetitions', 'parseWeight']
+
+maxInputLength = 32
+digitSeparators = dict.fromkeys(map(ord, ' \u00a0\u202f'))
+numberPattern = compileRegex(r'\s*(?P<sign>[+-])?\s*'
+                             r'(?P<integer>\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)?(?:[.,](?P<fraction>\d+))?\s*'
+                             r'(?P<thousands>[kк](?![^\W\d_]))?\s*'
+                             r'(?P<unit>[^\W\d_]+)?\.?\s*')
+
+
+def parseNumber(text: str, units: dict[str, float] | None = None) -> int | float:
+    """
+    Number as users type it in one regex pass: '12', '12,5', '1 000', '1.5k', '80 кг', '175lb'.
+    A decimal comma or point, spaces between thousands, a k suffix for thousands and a unit from units
+    (unit name -> multiplier) are accepted. No exponents, infinities or nans. Raises ValueError
+    """
+    if len(text) > maxInputLength or (match := numberPattern.fullmatch(text.lower())) is None:
+        raise ValueError(text)
+    sign, integer, fraction, thousands, unit = match.group('sign', 'integer', 'fraction', 'thousands', 'unit')
+    if integer is None and fraction is None:
+        raise ValueError(text)
+    multiplier = 1000 if thousands else 1
+    if unit is not None:
+        if units is None or unit not in units:
+            raise ValueError(text)
+        multiplier *= units[unit]
+    integer = integer.translate(digitSeparators) if integer else '0'
+    number = int(integer) * multiplier if fraction is None else float(f'{integer}.{fraction}') * multiplier
+    return -number if sign == '-' else number
+
+
+@dataclass(slots=True, frozen=True)
+class NumberField:
+    """
+    Numeric user input with its type, allowed range and units
+    """
+    name: str
+    minimum: int | float
+    maximum: int | float
+    integer: bool = True
+    units: dict[str, float] = field(default_factory=dict)
+    decimalPlaces: int = 2
+
+    def parse(self, text: str) -> int | float:
+        """
+        Parsed and validated value, ValueError carries the message for the user
+        """
+        try:
+            number = parseNumber(text, self.units)
+        except ValueError:
+            raise ValueError(f'Вы ввели не {'целое ' if self.integer else ''}число. Попробуйте ещё раз.') from None
+        if self.integer:
+            if isinstance(number, float):
+                if not number.is_integer():
+                    raise ValueError('Вы ввели не целое число. Попробуйте ещё раз.')
+                number = int(number)
+        else:
+            number = round(float(number), self.decimalPlaces)
+        if not self.minimum <= number <= self.maximum:
+            raise ValueError(f'Введите {self.name} от {self.minimum:g} до {self.maximum:g}.')
+        return number
+
+
+weightUnits: dict[str, float] = {
+    'кг': 1., 'kg': 1., 'килограмм': 1., 'килограмма': 1., 'килограммов': 1.,
+    'lb': InputLimits.poundKilograms, 'lbs': InputLimits.poundKilograms, 'фунт': InputLimits.poundKilograms,
+    'фунта': InputLimits.poundKilograms, 'фунтов': InputLimits.poundKilograms
+}
+approachesField = NumberField('количество подходов', *InputLimits.approaches)
+repetitionsField = NumberField('количество повторений', *InputLimits.repetitions)
+weightField = NumberField('вес', *InputLimits.weight, integer=False, units=weightUnits)
+parseApproaches = approachesField.parse
+parseRepetitions = repetitionsField.parse
+parseWeight = weightField.parse
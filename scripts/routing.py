@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, NamedTuple
+
+from ujson import dumps
+
+from .classes import BaseUser
+
+
+__all__ = ['MessageContext', 'Route', 'PromptRoute', 'Router']
+
+
+@dataclass(slots=True)
+class MessageContext:
+    """
+    One incoming message: the user, the text as typed and lowercased, the extra payload item and the reply being built
+    """
+    user: BaseUser
+    text: str
+    normalized: str = ''
+    additional: Any = ''
+    keyboard: str = 'last'
+    message: str = ''
+    attachment: str = ''
+
+    def __post_init__(self) -> None:
+        if not self.normalized:
+            self.normalized = self.text.lower()
+
+
+class Route(NamedTuple):
+    handler: Callable[[MessageContext], Any]
+    name: str
+
+
+class PromptRoute(NamedTuple):
+    handler: Callable[[MessageContext, Any], Any]
+    name: str
+    parser: Callable[[str], Any]
+    errorMessage: str
+
+
+def _name(callable_: Callable) -> str:
+    return getattr(callable_, '__qualname__', repr(callable_))
+
+
+class Router:
+    """
+    Dialog state machine: the state is the user's last keyboard, inputs are the normalized message texts.
+    Commands are registered per state or for every state (None), dynamic choices per state and prompts per the message
+    that asked for the input. compile() flattens the commands into one dict keyed by (state, input), so routing a message
+    takes a constant number of dict lookups whatever the number of routes
+    """
+
+    def __init__(self, states: Iterable[str] = ()) -> None:
+        self.states: list[str] = [*states]
+        self._commands: dict[tuple[str | None, str], Route] = {}
+        self._choices: dict[str, Route] = {}
+        self._prompts: dict[str, PromptRoute] = {}
+        self._table: dict[tuple[str | None, str], Route] = {}
+        self._compiled = False
+
+    def command(self, *inputs: str, states: Iterable[str | None] = (None,)) -> Callable:
+        """
+        Registers the handler for the inputs (compared lowercased) in the states, None means any state
+        """
+        def decorator(handler: Callable[[MessageContext], Any]) -> Callable[[MessageContext], Any]:
+            for state in states:
+                for input_ in inputs:
+                    if (state, input_.lower()) in self._commands:
+                        raise ValueError(f'Input {input_!r} is already routed in state {state!r}')
+                    self._commands[state, input_.lower()] = Route(handler, _name(handler))
+            self._compiled = False
+            return handler
+        return decorator
+
+    def choice(self, *states: str) -> Callable:
+        """
+        Registers the handler of inputs not known in advance (profile names, days, exercises) in the states.
+        It returns whether the input was one of the choices
+        """
+        def decorator(handler: Callable[[MessageContext], bool]) -> Callable[[MessageContext], bool]:
+            for state in states:
+                self._choices[state] = Route(handler, _name(handler))
+            return handler
+        return decorator
+
+    def prompt(self, *prompts: str, parser: Callable[[str], Any] = str, error_message: str = '') -> Callable:
+        """
+        Registers the handler of the answer to the prompts, the message the user sent before. The answer is converted
+        with parser, if it raises ValueError the user gets error_message (the exception text by default) and is asked again
+        """
+        def decorator(handler: Callable[[MessageContext, Any], Any]) -> Callable[[MessageContext, Any], Any]:
+            for prompt in prompts:
+                self._prompts[prompt] = PromptRoute(handler, _name(handler), parser, error_message)
+            return handler
+        return decorator
+
+    def compile(self) -> None:
+        """
+        Expands the commands registered for any state over the known states, state specific ones take precedence
+        """
+        table = dict(self._commands)
+        for (state, input_), route in self._commands.items():
+            if state is None:
+                for knownState in self.states:
+                    table.setdefault((knownState, input_), route)
+        self._table = table
+        self._compiled = True
+
+    def route(self, context: MessageContext) -> bool:
+        """
+        Runs the handlers for the message, returns whether any of them matched
+        """
+        if not self._compiled:
+            self.compile()
+        state = context.user.lastKeyboard
+        if (route := self._table.get((state, context.normalized)) or
+                self._table.get((None, context.normalized))) is not None:
+            route.handler(context)
+            return True
+        matched = (choice := self._choices.get(state)) is not None and choice.handler(context)
+        if (prompt := self._prompts.get(context.user.lastMessage)) is None:
+            return bool(matched)
+        try:
+            value = prompt.parser(context.text)
+        except ValueError as exception:
+            context.text = context.user.lastMessage
+            context.message = prompt.errorMessage or str(exception)
+            return True
+        prompt.handler(context, value)
+        return True
+
+    def export(self) -> dict[str, Any]:
+        """
+        The routing table as plain data: handlers by state and input, choices by state and prompt handlers by prompt
+        """
+        if not self._compiled:
+            self.compile()
+        commands: dict[str, dict[str, str]] = {}
+        for (state, input_), route in self._table.items():
+            commands.setdefault('*' if state is None else state, {})[input_] = route.name
+        return {'states': self.states, 'commands': commands,
+                'choices': {state: route.name for state, route in self._choices.items()},
+                'prompts': {prompt: {'handler': route.name, 'parser': _name(route.parser), 'errorMessage': route.errorMessage}
+                            for prompt, route in self._prompts.items()}}
+
+    def toFile(self, file_path: Path | str) -> None:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(dumps(self.export(), ensure_ascii=False, indent=4))
@@ -0,0 +1,101 @@
+"""
+Startup time: phases of main() checked against the first poll budget, and an import time profiler.
+Run from the repository root: python -m scripts.startup [modules ...] [--top 25]
+"""
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from pathlib import Path
+from subprocess import run
+from time import perf_counter
+
+from .config import *
+from .logger import log
+
+
+__all__ = ['StartupTimer', 'ImportTime', 'profileImports']
+
+
+class StartupTimer:
+    """
+    Durations of the named startup phases, each one measured from the end of the previous one
+    """
+
+    def __init__(self, budget_seconds: float = Startup.firstPollBudgetSeconds) -> None:
+        self.budgetSeconds = budget_seconds
+        self.timerStart = self._last = perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def elapsed(self) -> float:
+        return self._last - self.timerStart
+
+    def report(self) -> str:
+        return f'{', '.join(f'{phase} {seconds:.3f}s' for phase, seconds in self.phases)} (total {self.elapsed:.3f}s)'
+
+    def check(self) -> bool:
+        """
+        Logs the breakdown, as a warning if the phases took longer than the budget
+        """
+        withinBudget = self.elapsed <= self.budgetSeconds
+        log('info' if withinBudget else 'warn',
+            f'Startup{'' if withinBudget else f' is over the {self.budgetSeconds:g}s budget'}: {self.report()}')
+        return withinBudget
+
+
+@dataclass(slots=True)
+class ImportTime:
+    module: str
+    selfSeconds: float
+    cumulativeSeconds: float
+    depth: int
+
+
+def profileImports(modules: tuple[str, ...] | list[str] = Startup.profiledModules) -> list[ImportTime]:
+    """
+    Import times of modules and everything they import, measured in a fresh interpreter with -X importtime
+    """
+    process = run([sys.executable, '-X', 'importtime', '-c', f'import {', '.join(modules)}'],
+                  capture_output=True, text=True, cwd=Path(__file__).parent.parent)
+    importTimes = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        selfTime, cumulativeTime, name = line.removeprefix('import time:').split('|')
+        importTimes.append(ImportTime(name.strip(), int(selfTime) / 1e6, int(cumulativeTime) / 1e6,
+                                      (len(name) - len(name.lstrip())) // 2))
+    if process.returncode:
+        print(process.stderr.splitlines()[-1], file=sys.stderr)
+    return importTimes
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Import time breakdown of the bot modules')
+    parser.add_argument('modules', nargs='*', default=Startup.profiledModules)
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    importTimes = profileImports(args.modules)
+    byPackage: dict[str, float] = {}
+    for importTime in importTimes:
+        package = importTime.module.split('.')[0]
+        byPackage[package] = byPackage.get(package, 0.) + importTime.selfSeconds
+    total = sum(importTime.cumulativeSeconds for importTime in importTimes if importTime.depth == 0)
+
+    print(f'Importing {', '.join(args.modules)} took {total * 1e3:.1f} ms, {len(importTimes)} modules')
+    print('By top-level package (self time):')
+    for package, seconds in sorted(byPackage.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'  {package:<32} {seconds * 1e3:>9.1f} ms')
+    print('Slowest modules (cumulative time):')
+    for importTime in sorted(importTimes, key=lambda importTime: importTime.cumulativeSeconds, reverse=True)[:args.top]:
+        print(f'  {importTime.module:<48} {importTime.cumulativeSeconds * 1e3:>9.1f} ms   '
+              f'self {importTime.selfSeconds * 1e3:>7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+from os import makedirs
+from os.path import exists
+from pathlib import Path
+from threading import RLock
+from typing import Any, Self, Type
+
+from ujson import dumps, loads, JSONDecodeError
+
+from .config import *
+from .functions import log
+from .classes import BaseUser
+
+
+__all__ = ['SqliteUsers', 'migrateFromJSON']
+
+
+class SqliteUsers(MutableMapping):
+    """
+    Users by id stored one row per user in SQLite (WAL mode). Users are loaded on first access
+    and kept in an LRU cache of cache_size hot users, changed users are written in one transaction by flush()
+    """
+
+    def __init__(self, file_path: Path | str = Database.usersDatabaseFilePath, user_class: Type[BaseUser] = BaseUser,
+                 cache_size: int = Database.usersCacheSize) -> None:
+        self.filePath = Path(file_path)
+        self.userClass = user_class
+        self.cacheSize = cache_size
+        self._lock = RLock()
+        self._cache: OrderedDict[int, BaseUser] = OrderedDict()
+        self._dirty: dict[int, BaseUser] = {}
+        self._deleted: set[int] = set()
+        self.hits = self.misses = 0
+        self._connection = sqlite3.connect(self.filePath, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+
+    def _cacheUser(self, key: int, user: BaseUser) -> None:
+        self._cache[key] = user
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cacheSize:
+            self._cache.popitem(last=False)
+
+    def _load(self, key: int) -> BaseUser | None:
+        if (user := self._dirty.get(key)) is not None:
+            return user
+        if key in self._deleted:
+            return None
+        row = self._connection.execute('SELECT data FROM users WHERE id = ?', (key,)).fetchone()
+        return None if row is None else self.userClass.fromDict(loads(row[0]), strict=False)
+
+    def __getitem__(self, key: int) -> BaseUser:
+        with self._lock:
+            if (user := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return user
+            self.misses += 1
+            if (user := self._load(key)) is None:
+                raise KeyError(key)
+            self._cacheUser(key, user)
+            return user
+
+    def __setitem__(self, key: int, value: BaseUser) -> None:
+        with self._lock:
+            self._deleted.discard(key)
+            self._dirty[key] = value
+            self._cacheUser(key, value)
+
+    def __delitem__(self, key: int) -> None:
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._cache.pop(key, None)
+            self._dirty.pop(key, None)
+            self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            if key in self._cache or key in self._dirty:
+                return True
+            if key in self._deleted or not isinstance(key, int):
+                return False
+            return self._connection.execute('SELECT 1 FROM users WHERE id = ?', (key,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[int]:
+        self.flush()
+        yield from (userId for userId, in self._connection.execute('SELECT id FROM users'))
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def markDirty(self, key: int, user: BaseUser | None = None) -> None:
+        """
+        Writes the user on the next flush. The caller passes the user it changed, it may have been evicted from the cache since
+        """
+        with self._lock:
+            if key in self._deleted or user is None and (user := self._cache.get(key)) is None:
+                return
+            self._dirty[key] = user
+            self._cacheUser(key, user)
+
+    @property
+    def dirtyCount(self) -> int:
+        return len(self._dirty) + len(self._deleted)
+
+    def flush(self, compact: bool = False) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            deleted, self._deleted = self._deleted, set()
+            if dirty or deleted:
+                try:
+                    with self._connection:
+                        self._connection.execute('BEGIN')
+                        self._connection.executemany(
+                            'INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)',
+                            ((key, dumps(user.toDict, escape_forward_slashes=False)) for key, user in dirty.items()))
+                        self._connection.executemany('DELETE FROM users WHERE id = ?', ((key,) for key in deleted))
+                except sqlite3.Error:
+                    self._dirty, self._deleted = dirty | self._dirty, deleted | self._deleted
+                    raise
+            if compact:
+                self._connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            return len(dirty) + len(deleted)
+
+    @property
+    def toDict(self) -> dict[str, Any]:
+        self.flush()
+        return {str(userId): loads(data) for userId, data in self._connection.execute('SELECT id, data FROM users')}
+
+    def toFile(self, file_path: Path | str = Database.usersFilePath) -> None:
+        self.flush()
+        with open(file_path, 'w') as file:
+            file.write('{')
+            for counter, (userId, data) in enumerate(self._connection.execute('SELECT id, data FROM users')):
+                file.write(f'{',' if counter else ''}"{userId}":{data}')
+            file.write('}')
+
+    def close(self) -> None:
+        self.flush(compact=True)
+        self._connection.close()
+
+    @classmethod
+    def fromFile(cls, file_path: Path | str = Database.usersDatabaseFilePath, user_class: Type[BaseUser] = BaseUser,
+                 json_file_path: Path | str = Database.usersFilePath,
+                 journal_path: Path | str = Database.usersJournalFilePath,
+                 cache_size: int = Database.usersCacheSize) -> Self:
+        """
+        Opens the database, migrating users.json (and its journal) into it if the database does not exist yet
+        """
+        if not exists(Database.reserveCopyFolderPath):
+            makedirs(Database.reserveCopyFolderPath)
+        if not exists(file_path) and exists(json_file_path):
+            migrateFromJSON(json_file_path, file_path, journal_path)
+        return cls(file_path, user_class, cache_size)
+
+
+def migrateFromJSON(json_file_path: Path | str = Database.usersFilePath,
+                    file_path: Path | str = Database.usersDatabaseFilePath,
+                    journal_path: Path | str = Database.usersJournalFilePath) -> int:
+    """
+    One-shot migration of users.json plus users.journal into the SQLite database, returns the number of migrated users.
+    Users are copied as they are stored, without decoding them into dataclasses
+    """
+    try:
+        with open(json_file_path) as file:
+            userDicts: dict[str, Any] = loads(file.read())
+    except JSONDecodeError:
+        log('error', f'Unable to read {json_file_path}, nothing to migrate')
+        return 0
+    if exists(journal_path):
+        with open(journal_path) as journal:
+            for line in journal:
+                try:
+                    record = loads(line)
+                except JSONDecodeError:
+                    break
+                if record.get('deleted'):
+                    userDicts.pop(str(record['id']), None)
+                else:
+                    userDicts[str(record['id'])] = record['user']
+    temporaryPath = Path(file_path).with_suffix(f'{Path(file_path).suffix}.tmp')
+    if exists(temporaryPath):
+        temporaryPath.unlink()
+    connection = sqlite3.connect(temporaryPath, isolation_level=None)
+    try:
+        connection.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany('INSERT INTO users (id, data) VALUES (?, ?)',
+                                   ((int(userIdStr), dumps(userDict, escape_forward_slashes=False))
+                                    for userIdStr, userDict in userDicts.items()))
+    finally:
+        connection.close()
+    temporaryPath.replace(file_path)
+    log('info', f'Migrated {len(userDicts)} users from {json_file_path} to {file_path}')
+    return len(userDicts)
@@ -1,3 +1,4 @@
+import gc
 from ctypes import windll
 from dataclasses import dataclass
 from datetime import datetime
@@ -11,22 +12,32 @@ from time import perf_counter, sleep
 from traceback import format_exc
 from typing import Any, Literal
 
-from tendo.singleton import SingleInstance, SingleInstanceException
 from ujson import loads
 
 from .config import *
 from .classes import *
 from .functions import *
-from libs.vk_api_fast import VkApi
+from .dispatcher import *
+from .checkpoint import *
+from .storage import *
+from .outbox import *
+from .startup import StartupTimer
+from .names import *
+from .catchup import CatchUp
+from .broadcast import *
+from .routing import MessageContext
+from .dialog import dialog
+from libs.vk_api_fast import RateLimiter, VkApi
 from libs.vk_api_fast.bot_longpoll import VkBotEvent, VkBotEventType, VkBotLongPoll
-from libs.vk_api_fast.exceptions import ApiError
+from libs.vk_api_fast.exceptions import ApiError, VkToolsException
+from libs.vk_api_fast.tools import VkTools
 
 
 botPrefs: BotPrefs
 
 
 def main():
-    versionInfo, timerStart = VersionInfo(), perf_counter()
+    versionInfo, startup = VersionInfo(), StartupTimer()
 
     @dataclass(slots=True)
     class User(BaseUser):
@@ -37,230 +48,141 @@ def main():
             if not message:
                 return
             message = str(message).strip('\n').replace('\'', '"')
-            if self.id in {*botPrefs.admins} and botPrefs.sendExecutionTime:
+            if self.id in botPrefs.adminIds and botPrefs.sendExecutionTime:
                 message += f'\n\nВыполнено за {time:.6f} секунд'
-            try:
-                keyboard = self.createKeyboard(keyboard)
-                for messagePart in batched(message, max_message_length):
-                    Thread(
-                        target=vkApi.messages.send,
-                        kwargs={
-                            'user_id': self.id,
-                            'message': ''.join(messagePart),
-                            'keyboard': keyboard,
-                            'random_id': 0,
-                            'attachment': attachment if attachment is not None else ''
-                        },
-                        name='Message sender'
-                    ).start()
-                log('info',
-                    f'Bot\'s response to {self.getName(name_form='full', with_id=True)}:\n'
-                    f'{message if message else '*No response*'}{f'\nExecuted in {time:.6f} second(s)' if time else ''}', 1)
-            except ApiError:
-                log('error',
-                    f'Unable to send message to user '
-                    f'{self.getName(name_form='full', with_id=True)} without their permission.')
+            keyboard = self.createKeyboard(keyboard)
+            for messagePart in batched(message, max_message_length):
+                outbox.send(self.id, ''.join(messagePart), keyboard=keyboard,
+                            attachment=attachment if attachment is not None else '')
+            log('info',
+                lambda: f'Bot\'s response to {self.getName(name_form='full', with_id=True)}:\n'
+                        f'{message if message else '*No response*'}{f'\nExecuted in {time:.6f} second(s)' if time else ''}', 1)
 
         def getName(self, *,
                     name_form: Literal['full', 'short'] = 'short',
-                    name_case: Literal['nom', 'gen', 'dat', 'acc', 'ins', 'abl'] = 'nom',
+                    name_case: NameCase = 'nom',
                     with_id: bool = False) -> str:
-            if name_case != 'nom':
-                try:
-                    userInfo = vkApi.users.get(user_ids=(self.id,), name_case=name_case)[0]
-                except Exception:
-                    userInfo = {'first_name': self.firstName, 'last_name': self.lastName}
-                result = (f'{userInfo['first_name']} {userInfo['last_name']}'
-                          if name_form == 'full' else userInfo['first_name'])
-            else:
-                result = self.fullName if name_form == 'full' else self.firstName
+            if (names := nameCache.get(self.id, name_case)) is None:
+                names = self.firstName, self.lastName
+            result = f'{names[0]} {names[1]}' if name_form == 'full' else names[0]
             if with_id:
                 result += f' (id: {self.id})'
             return result
 
-    users: Users[str, User] = Users.fromFile(user_class=User)
+    users: Users[int, User] | SqliteUsers = (SqliteUsers.fromFile(user_class=User) if SQLITE_USERS else
+                                            Users.fromFile(user_class=User))
+    gc.freeze()
+    startup.mark('users loaded')
+    asyncVk = asyncLoop = None
 
-    vk = VkApi(token=group.tokenGroup, api_version=botPrefs.apiVersion)
+    def handleEvent(vk_event: VkBotEvent) -> None:
+        try:
+            onEvent(vk_event)
+        finally:
+            checkpoint.done(vk_event)
+
+    async def listenAsync() -> None:
+        import asyncio
+        from libs.vk_api_fast.async_api import AsyncVkApi, AsyncVkBotLongPoll
+        nonlocal asyncVk, asyncLoop, longpoll
+        async with AsyncVkApi(token=group.tokenGroup, api_version=botPrefs.apiVersion, rate_limiter=vk.rate_limiter,
+                              pool_size=ApiLimits.connectionPoolSize) as asyncVk:
+            asyncLoop = asyncio.get_running_loop()
+            asyncLongpoll = AsyncVkBotLongPoll(asyncVk, group.id, wait=LongPolling.waitSeconds, min_wait=LongPolling.minWaitSeconds,
+                                               max_backoff=LongPolling.maxBackoffSeconds, ts=checkpoint.ts)
+            if longpoll is not None:
+                asyncLongpoll.stats = longpoll.stats  # counted over reconnects
+            longpoll = asyncLongpoll
+            try:
+                async for batchTs, vk_events in asyncLongpoll.listen_batches():
+                    for vk_event in checkpoint.begin(batchTs, asyncLongpoll.ts, vk_events):
+                        # handlers are blocking, they run on the dispatcher's workers in their users' lanes,
+                        # the hand-off itself waits for queue space off the loop
+                        await asyncLoop.run_in_executor(None, dispatcher.submit, vk_event)
+            finally:
+                asyncLoop = None
+
+    def sendOutgoingMessage(values: dict[str, Any]) -> Any:
+        """
+        Outbox backend: messages.send over asyncVk on the event loop in async mode, over vk otherwise
+        """
+        if (loop := asyncLoop) is not None:
+            import asyncio
+            from concurrent.futures import CancelledError
+            try:
+                return asyncio.run_coroutine_threadsafe(asyncVk.method('messages.send', values), loop).result()
+            except (CancelledError, RuntimeError):
+                pass  # the loop is closing, sending again is safe thanks to random_id
+        return vk.method('messages.send', values)
+
+    vk = VkApi(token=group.tokenGroup, api_version=botPrefs.apiVersion,
+               rate_limiter=RateLimiter(ApiLimits.groupRequestsPerSecond), pool_size=ApiLimits.connectionPoolSize,
+               coalesce_methods=ApiLimits.coalescedMethods, coalesce_window=ApiLimits.coalesceWindowSeconds)
     vkApi = vk.get_api()
-    if None in {group.title, group.name}:
-        groupInfo = vkApi.groups.getById(group_id=group.id)[0]
-        if group.title is None:
-            group.title = groupInfo['name']
-        if group.name is None:
-            group.name = groupInfo['screen_name']
-
-    log(no_level_color='#00ffff', log_format='%message', async_=False,
-        message=f'{f' {group.title} v{versionInfo.full.split()[0]}: {versionInfo.name} ':=^{get_terminal_size().columns - get_terminal_size().columns % 2 - 1}}')
-    log('info', 'Starting bot...')
+    outbox = Outbox(vk, journal=OutboxJournal(), backend=sendOutgoingMessage)
+    outbox.start()
 
-    longpoll = VkBotLongPoll(vk, group.id)
-    vkUserApi = VkApi(token=group.tokenUser, api_version=botPrefs.apiVersion).get_api()
-    log('info', 'Logged to VK')
+    def onNamesFetched(user_id: int, names: UserNames) -> None:
+        if (user := users.get(user_id)) is None:
+            return
+        firstName, lastName = names.firstNames['nom'], names.lastNames['nom']
+        if (user.firstName, user.lastName, user.gender) != (firstName, lastName, names.gender):
+            user.firstName, user.lastName, user.gender = firstName, lastName, names.gender
+            users[user_id] = user
+
+    nameCache = NameCache(vk, on_fetched=onNamesFetched)
+    nameCache.start()
+    startup.mark('outbox started')
+    try:
+        if None in {group.title, group.name}:
+            groupInfo = vkApi.groups.getById(group_id=group.id)[0]
+            if group.title is None:
+                group.title = groupInfo['name']
+            if group.name is None:
+                group.name = groupInfo['screen_name']
+
+        log(no_level_color='#00ffff', log_format='%message', async_=False,
+            message=f'{f' {group.title} v{versionInfo.full.split()[0]}: {versionInfo.name} ':=^{get_terminal_size().columns - get_terminal_size().columns % 2 - 1}}')
+        log('info', 'Starting bot...')
+
+        checkpoint = LongPollCheckpoint()
+        # the async long poll is created by listenAsync
+        longpoll = None if ASYNC_MODE else VkBotLongPoll(vk, group.id, wait=LongPolling.waitSeconds, min_wait=LongPolling.minWaitSeconds,
+                                                         max_backoff=LongPolling.maxBackoffSeconds, ts=checkpoint.ts)
+        vkUser = VkApi(token=group.tokenUser, api_version=botPrefs.apiVersion,
+                       rate_limiter=RateLimiter(ApiLimits.userRequestsPerSecond))
+        vkUserApi = vkUser.get_api()
+        startup.mark('long poll server')
+        log('info', 'Logged to VK')
+    except BaseException:
+        # the main loop's finally doesn't cover startup, preMain restarts main() with new ones
+        nameCache.stop()
+        outbox.stop()
+        vk.close()
+        raise
 
     def onEvent(vk_event: VkBotEvent) -> None:
-        def onMessage() -> None:
-            nonlocal response, responseDefault, responseAdditional, message, attachment, kb
-            if userId in {*botPrefs.admins} and response[0] == '.':
+        def onMessage() -> bool:
+            """
+            False for admin commands, they bypass the dialog, so a pending prompt doesn't take them as its answer
+            """
+            nonlocal responseDefault, message, attachment, kb
+            if userId in botPrefs.adminIds and response[0] == '.':
                 cmdMsg: list[bool | float | int | str] = responseDefault.split(' ')
                 cmdSyntax = cmds[0] if (cmds := [command for command in Constants.commands.splitlines() if cmdMsg[0] in command]) else ''
-                message = 'NotImplemented'
-            if not WORKING and userId not in {*botPrefs.admins}:
+                match cmdMsg[0]:
+                    case '.broadcast':
+                        message = startBroadcast(responseDefault.partition(' ')[2])
+                    case _:
+                        message = 'NotImplemented'
+                return False
+            if not WORKING and userId not in botPrefs.adminIds:
                 message = '❕Бот временно выключен.'
-                return
-            match response:
-                case 'start' | 'начать':
-                    kb = 'main'
-                    message = 'Привет'
-                case 'назад':
-                    match user.lastKeyboard:
-                        case 'days':
-                            kb = 'profiles'
-                            message = 'Вы вернулись в меню профилей.'
-                        case 'exercises':
-                            kb = 'days'
-                            message = 'Вы вернулись в меню дней.'
-                        case 'add_exercise':
-                            kb = 'exercises'
-                            message = 'Вы вернулись в список упражнений.'
-                        case _:
-                            kb = 'main'
-                            message = 'Вы вернулись в главное меню.'
-                case '🔚в меню':
-                    kb = 'main'
-                    message = 'Вы вернулись в главное меню.'
-                case 'профили':
-                    kb = 'profiles'
-                    message = 'Вы попали в меню профилей. Здесь в них можно войти, их можно добавлять, редактировать и удалять.'
-                case 'создать новый профиль':
-                    message = 'Введите имя нового профиля.'
-                case 'войти':
-                    kb = 'days'
-                    message = 'Выберите день тренировки, добавьте новый или измените существующий.'
-                case 'переименовать':
-                    message = f'Введите новое название профиля {user.currentProfileName!r}.'
-                case 'удалить':
-                    kb = 'profiles'
-                    message = f'Профиль {user.currentProfileName!r} удалён.'
-                    del user.profileNames[user.profile], user.profiles[user.profile]
-                    user.profile = 0
-                case 'добавить день':
-                    user.profiles[user.profile].append([])
-                    message = 'Новый день добавлен.'
-                case 'удалить день':
-                    kb = 'days'
-                    del user.profiles[user.profile][user.day]
-                    message = f'{user.day + 1}-й день удалён.'
-                    user.day = 0
-                case 'начать тренировку':
-                    message = 'Функция в разработке.'
-                case 'добавить упражнение':
-                    kb = 'add_exercise'
-                    message = 'Выберите упражнение для добавления.'
-                case 'упражнения':
-                    kb = 'exercise_list'
-                    message = 'Вы попали в меню упражнений. Здесь можно настроить количество подходов, повторений, вес упражнения и добавить к нему заметку.'
-                case '[р] подходы':
-                    message = 'Введите количество разминочных подходов.'
-                case '[о] подходы':
-                    message = 'Введите количество основных подходов.'
-                case '[р] повторения':
-                    message = 'Введите количество повторений в разминочные подходы.'
-                case '[о] повторения':
-                    message = 'Введите количество повторений в основные подходы.'
-                case '[р] вес':
-                    message = 'Введите вес в разминочные подходы.'
-                case '[о] вес':
-                    message = 'Введите вес в основные подходы.'
-                case 'заметка':
-                    message = 'Введите заметку к упражнению.'
-                case 'remove_exercise':
-                    kb = 'exercises'
-                    message = f'Упражнение {user.exercises[user.exerciseEditing].name!r} удалено из дня.'
-                    user.profiles[user.profile][user.day].remove(user.exercises[user.exerciseEditing].name)
-                    user.exerciseEditing = 0
-                case _:
-                    if user.lastKeyboard == 'days' and responseDefault in {f'День {day + 1}' for day in range(len(user.currentProfile))}:
-                        kb = 'exercises'
-                        user.day = int(response.split()[1]) - 1
-                        message = f'Вы попали в список упражнений {user.day + 1}-го дня.'
-                    elif user.lastKeyboard == 'exercise_list' and responseDefault in {*botPrefs.exercisesNamesRu}:
-                        kb = 'exercise_actions'
-                        user.exerciseEditing = botPrefs.exercisesNamesRu.index(responseDefault)
-                        message = (f'Выберите действие с упражнением {responseDefault!r}.\n'
-                                   f'Об упражнении:\n{botPrefs.getExerciseByNameRu(responseDefault).description}')
-                    elif user.lastKeyboard == 'add_exercise' and responseDefault in {*botPrefs.exercisesNamesRu}:
-                        kb = 'exercise_actions_extended'
-                        user.exerciseEditing = botPrefs.exercisesNamesRu.index(responseDefault)
-                        user.profiles[user.profile][user.day].append(responseDefault)
-                        message = (f'Упражнение {responseDefault!r} добавлено. Теперь вы можете сразу отредактировать его, используя кнопки ниже.\n'
-                                   f'Об упражнении:\n{botPrefs.getExerciseByNameRu(responseDefault).description}')
-                    elif user.lastKeyboard == 'exercises' and responseDefault in {*botPrefs.exercisesNamesRu}:
-                        kb = 'exercise_actions_extended'
-                        user.exerciseEditing = botPrefs.exercisesNamesRu.index(responseDefault)
-                        message = (f'Выберите действие с упражнением {responseDefault!r}.\n'
-                                   f'Текущие настройки: {user.getExerciseByName(responseDefault)!r}\n'
-                                   f'Об упражнении:\n{botPrefs.getExerciseByNameRu(responseDefault).description}')
-                        attachment = botPrefs.getExerciseByNameRu(responseDefault).animationVkId
-                    elif user.lastKeyboard == 'profiles' and responseDefault in {*user.profileNames}:
-                        kb = 'profile_actions'
-                        user.profile = user.profileNames.index(responseDefault)
-                        message = f'Выберите действие с профилем {responseDefault!r}.'
-                    match user.lastMessage:
-                        case 'Создать новый профиль':
-                            if responseDefault in {*user.profileNames}:
-                                message = 'Профиль с таким именем уже существует.'
-                                return
-                            user.profiles.append([])
-                            user.profileNames.append(responseDefault)
-                            message = f'Новый профиль {responseDefault!r} добавлен.'
-                        case 'Переименовать':
-                            message = f'Профиль {user.currentProfileName!r} переименован в {responseDefault!r}.'
-                            user.profileNames[user.profile] = responseDefault
-                        case '[Р] Подходы':
-                            if tryParse(response, int):
-                                user.exercises[user.exerciseEditing].warmUpApproaches.amount = int(response)
-                                message = f'Количество разминочных подходов изменено на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не целое число. Попробуйте ещё раз.'
-                        case '[О] Подходы':
-                            if tryParse(response, int):
-                                user.exercises[user.exerciseEditing].mainApproaches.amount = int(response)
-                                message = f'Количество основных подходов изменено на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не целое число. Попробуйте ещё раз.'
-                        case '[Р] Повторения':
-                            if tryParse(response, int):
-                                user.exercises[user.exerciseEditing].warmUpApproaches.repetitions = int(response)
-                                message = f'Количество повторений в разминочные подходы изменено на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не целое число. Попробуйте ещё раз.'
-                        case '[О] Повторения':
-                            if tryParse(response, int):
-                                user.exercises[user.exerciseEditing].mainApproaches.repetitions = int(response)
-                                message = f'Количество повторений в основные подходы изменено на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не целое число. Попробуйте ещё раз.'
-                        case '[Р] Вес':
-                            if tryParse(response, float):
-                                user.exercises[user.exerciseEditing].warmUpApproaches.weight = float(response)
-                                message = f'Вес в разминочные подходы изменён на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не число. Попробуйте ещё раз.'
-                        case '[О] Вес':
-                            if tryParse(response, float):
-                                user.exercises[user.exerciseEditing].mainApproaches.weight = float(response)
-                                message = f'Вес в основные подходы изменён на {response}.'
-                                return
-                            responseDefault = user.lastMessage
-                            message = 'Вы ввели не число. Попробуйте ещё раз.'
-                        case 'Заметка':
-                            user.exercises[user.exerciseEditing].note = responseDefault
-                            message = 'Заметка добавлена.'
+                return True
+            context = MessageContext(user, responseDefault, response, responseAdditional, kb, message, attachment)
+            dialog.route(context)
+            responseDefault, kb, message, attachment = context.text, context.keyboard, context.message, context.attachment
+            return True
 
         try:
             log('info', f'New event: {str(vk_event.type).split('.')[1].replace('_', ' ').lower()}')
@@ -270,7 +192,9 @@ def main():
         userId, message, attachment, responseDefault, responseAdditional, kb, timerStart = 0, '', '', '', '', 'last', perf_counter()
         match vk_event.type:
             case VkBotEventType.MESSAGE_NEW:
-                payload = loads(vk_event.object.message['payload']) if 'payload' in {*vk_event.object.message} else vk_event.object.message['text']
+                payload = loads(vk_event.object.message['payload']) if 'payload' in vk_event.object.message else vk_event.object.message['text']
+                if not catchUp.claim(vk_event.message['peer_id'], vk_event.message.get('conversation_message_id', 0)):
+                    return
                 userId, responseDefault = vk_event.object.message['from_id'], (
                     payload[0] if isinstance(payload, list) else
                     payload['command'] if isinstance(payload, dict) else payload
@@ -280,9 +204,9 @@ def main():
                         responseAdditional = payload[1]
         if userId < 0:
             return
-        if (userIdStr := str(userId)) not in {*users}:
+        if userId not in users:
             addUser(userId)
-        user: User = users[userIdStr]
+        user: User = users[userId]
 
         try:
             match vk_event.type:
@@ -290,67 +214,76 @@ def main():
                     response = responseDefault.lower()
                     if not response or response[0] == ',':
                         return
-                    log('info', f'{user.getName(name_form='full', with_id=True)} '
-                                f'messaged:\n{responseDefault}', 1)
-                    onMessage()
+                    log('info', lambda text=responseDefault: f'{user.getName(name_form='full', with_id=True)} '
+                                                             f'messaged:\n{text}', 1)
+                    routed = onMessage()
                     if not message:
                         message = ('❗Вы ввели неизвестную команду. '
                                    'Если у вас пропала клавиатура бота, нажмите кнопку для её открытия справа от поля ввода сообщения или напишите "Начать".')
-                    user.lastMessage = responseDefault
+                    if routed:
+                        user.lastMessage = responseDefault
             if kb != 'last' and kb not in Constants.inlineKeyboards:
+                if kb != user.lastKeyboard:
+                    user.keyboardPage = 0
                 user.lastKeyboard = kb
             timerEnd = perf_counter()
             user.sendMessage(kb, message, attachment, timerEnd - timerStart)
-            users[userIdStr] = user
+            users[userId] = user
 
         except Exception:
+            users.markDirty(userId, user)
             user.sendMessage(
                 'sendBugReport',
                 f'❗В работе бота произошла непредвиденная ошибка при обработке сообщения, и сообщение с отчётом об ошибке было отправлено разработчику. '
                 f'Надеемся, такого больше не повторится.')
-            users[str(botPrefs.devId)].sendMessage(message=f'{format_exc()}User: {user.getName(with_id=True)}')
+            users[botPrefs.devId].sendMessage(message=f'{format_exc()}User: {user.getName(with_id=True)}')
+
+    def findUpdatePost() -> int:
+        """
+        Id of the newest update post, 2500 posts per execute, stops at the execute that has it
+        """
+        for post in VkTools(vkUser).get_all_iter('wall.get', 100, {'owner_id': -group.id}):
+            if 'Обновление' in post['text']:
+                return post['id']
+        return 0
+
+    def editUpdatePost(message: str) -> bool:
+        try:
+            vkUserApi.wall.edit(owner_id=-group.id, post_id=botPrefs.lastVersion.messageId, signed=0, message=message)
+            log('info', 'Edited update message')
+            return True
+        except ApiError as exception:
+            log('warn', f'Couldn\'t edit update message {botPrefs.lastVersion.messageId}! Cause:\n{exception}')
+            return False
 
     def postUpdateMessage() -> None:
-        def postUpdateMessage() -> None:
+        message = (f'🔥Обновление {versionInfo.full}: {versionInfo.name}!🔥'
+                   f'\n\n📃Список изменений в версии {versionInfo.main}:{versionInfo.changelog}')
+        if not botPrefs.lastVersion.messageId or not editUpdatePost(message):
             try:
+                botPrefs.lastVersion.messageId = findUpdatePost()
+            except (ApiError, VkToolsException) as exception:
+                log('warn', f'Couldn\'t find update message! Cause:\n{exception}')
                 botPrefs.lastVersion.messageId = 0
-                postCount = vkUserApi.wall.get(owner_id=-group.id)['count']
-                postOffsets = [*range(postCount - 100, postCount % 100 - 1, -100)] + [0]
-                for postOffset in postOffsets:
-                    for post in vkUserApi.wall.get(owner_id=-group.id, count=100, offset=postOffset)['items']:
-                        if 'Обновление' in post['text']:
-                            botPrefs.lastVersion.messageId = post['id']
-                            break
-                    else:
-                        continue
-                    break
-                assert botPrefs.lastVersion.messageId, 'Couldn\'t get update message post id!'
-                vkUserApi.wall.edit(owner_id=-group.id, post_id=botPrefs.lastVersion.messageId, signed=0,
-                                    message=f'🔥Обновление {versionInfo.full}: {versionInfo.name}!🔥'
-                                            f'\n\n📃Список изменений в версии {versionInfo.main}:{versionInfo.changelog}')
-                log('info', 'Edited update message')
-            except (ApiError, AssertionError) as exception:
+            if not botPrefs.lastVersion.messageId or not editUpdatePost(message):
                 try:
                     if botPrefs.lastVersion.messageId:
-                        log('warn', f'Couldn\'t edit update message! Cause:\n{exception}')
                         vkUserApi.wall.delete(owner_id=-group.id, post_id=botPrefs.lastVersion.messageId)
                         log('info', 'Deleted old update message')
-                    vkUserApi.wall.post(owner_id=-group.id, from_group=1,
-                                        message=f'🔥Обновление {versionInfo.full}: {versionInfo.name}!🔥'
-                                                f'\n\n📃Список изменений в версии {versionInfo.main}:{versionInfo.changelog}')
+                    botPrefs.lastVersion.messageId = vkUserApi.wall.post(owner_id=-group.id, from_group=1, message=message)['post_id']
                     log('info', 'New update message posted!')
                 except ApiError as exception:
+                    botPrefs.lastVersion.messageId = 0
                     log('warn', f'Couldn\'t delete/post update message! Cause:\n{exception}\n')
 
-            botPrefs.lastVersion.version = versionInfo.full
-
-        Thread(target=postUpdateMessage, name='Update message handler').start()
+        botPrefs.lastVersion.version = versionInfo.full
 
     def addUser(user_id: int) -> None:
-        if (user_id_str := str(user_id)) not in {*users}:
-            users.update({user_id_str: User(id=user_id)})
+        if user_id not in users:
+            users[user_id] = User(id=user_id)
+            nameCache.prefetch((user_id,))
 
-        log('info', f'Added user {users[user_id_str].getName(with_id=True)}', 2)
+        log('info', lambda user=users[user_id]: f'Added user {user.getName(with_id=True)}', 2)
 
     def updateBotStatus(status: bool = True, async_: bool = True) -> None:
         def updateBotStatus() -> None:
@@ -383,9 +316,9 @@ def main():
                     updateReserveCopyThread.join()
                 while True:
                     try:
-                        users.toFile()
+                        savedUsers = users.flush(compact=one_time)
                         botPrefs.toFile(Database.botPrefsFilePath)
-                        log('info', 'Saved database files')
+                        log('info', f'Saved database files ({savedUsers} changed users)')
                         if one_time:
                             break
                         sleep(delaySeconds)
@@ -415,47 +348,97 @@ def main():
                     log('error', 'Unable to save reserve copy')
         decideAsync(async_, updateReserveCopy, 'Reserve copy updater')
 
+    def registerUsers(user_ids: list[int]) -> int:
+        newUserIds = [userId for userId in user_ids if userId not in users]
+        for userId in newUserIds:
+            users[userId] = User(id=userId)
+        nameCache.prefetch(newUserIds)
+        if newUserIds:
+            log('info', f'Added {len(newUserIds)} user(s) with unread messages')
+        return len(newUserIds)
+
+    def startBroadcast(text: str) -> str:
+        if not text.strip():
+            return 'Использование: .broadcast <сообщение>'
+        broadcast = broadcaster.create(users, {'message': text.strip()})
+        if not broadcaster.start(broadcast):
+            return f'❗Предыдущая рассылка ещё не закончена: {broadcaster.progress}'
+        return f'Рассылка {len(broadcast.recipients)} пользователям запущена'
+
+    def onBroadcastProgress(progress: BroadcastProgress) -> None:
+        if progress.finished:
+            users[botPrefs.devId].sendMessage(message=f'Рассылка {progress.id} закончена: {progress}')
+
     def respondToUnreadMessages() -> None:
-        def respondToUnreadMessages() -> None:
-            unreadConversations = vkApi.messages.getConversations(group_id=group.id, filter='unread')['items']
-            for unreadConversation in unreadConversations:
-                if (unreadUserIdStr := str(unreadUserId := unreadConversation['conversation']['peer']['id'])) not in {*users}:
-                    addUser(unreadUserId)
-                users[unreadUserIdStr].sendMessage(message='❕Когда вы написали боту в последний раз, он был выключен и не отвечал на ваши сообщения. '
-                                                           'Теперь он снова работает.')
-            if unreadConversations:
-                log('info', 'Unread messages were answered')
-        Thread(target=respondToUnreadMessages, name='Unread messages answerer').start()
-
-    respondToUnreadMessages()
-    if not SKIP_UPDATES:
-        if group.tokenUser and botPrefs.lastVersion.version != versionInfo.full and POST_UPDATE_MESSAGE:
-            postUpdateMessage()
-        updateBotStatus()
+        stats = catchUp.run()
+        if stats.conversations:
+            log('info', f'Unread messages were answered: {stats}')
+
+    def runStartupTasks() -> None:
+        """
+        Startup work events don't depend on, with Startup.deferNonCriticalInit it runs while events are already handled
+        """
+        timerStart, tasks = perf_counter(), [respondToUnreadMessages, broadcaster.resume]
+        if not SKIP_UPDATES:
+            if group.tokenUser and botPrefs.lastVersion.version != versionInfo.full and POST_UPDATE_MESSAGE:
+                tasks.append(postUpdateMessage)
+            tasks.append(lambda: updateBotStatus(async_=False))
+        for task in tasks:
+            try:
+                task()
+            except Exception as exception:
+                log('error', f'Startup task failed: {exception!r}')
+        log('info', f'Startup tasks finished in {perf_counter() - timerStart:.6f} seconds')
+
+    dispatcher = LaneDispatcher(handleEvent)
+    broadcaster = Broadcaster(vk, on_progress=onBroadcastProgress)
+    catchUp = CatchUp(vk, group.id, registerUsers,
+                      (lambda message: dispatcher.submit(constructMessageEvent(group.id, message['from_id'], message)))
+                      if CatchingUp.replayMissedMessages else None)
+    dispatcher.start()
+    checkpoint.start()
+    decideAsync(Startup.deferNonCriticalInit, runStartupTasks, 'Startup tasks')
     updateAtJSON(False)
+    startup.mark('startup tasks' if not Startup.deferNonCriticalInit else 'dispatcher started')
 
-    timerEnd = perf_counter()
-    log('info', f'Started bot at https://vk.me/{group.name} in {timerEnd - timerStart:.6f} seconds')
+    log('info', f'Started bot at https://vk.me/{group.name} in {startup.elapsed:.6f} seconds')
+    startup.check()
 
     try:
         while True:
             try:
-                for vk_event in longpoll.listen():
-                    Thread(target=onEvent, args=(vk_event,), name='Event handler').start()
+                if ASYNC_MODE:
+                    import asyncio
+                    asyncio.run(listenAsync())
+                else:
+                    for batchTs, vk_events in longpoll.listen_batches():
+                        for vk_event in checkpoint.begin(batchTs, longpoll.ts, vk_events):
+                            dispatcher.submit(vk_event)
             except Exception as exception:
                 while not isConnected():
                     pass
-                users[str(botPrefs.devId)].sendMessage(message=f'❗Произошла ошибка:\n{exception}')
+                users[botPrefs.devId].sendMessage(message=f'❗Произошла ошибка:\n{exception}')
                 log('error', str(exception))
     finally:
         log('info', 'Exiting...')
+        dispatcher.stop()
+        checkpoint.stop()
+        broadcaster.stop()
+        outbox.stop()
+        nameCache.stop()
+        log('info', f'Long poll: {longpoll.stats if longpoll is not None else None}, dispatcher: {dispatcher.stats}, outbox: {outbox.stats}, '
+                    f'names: {nameCache.stats}, '
+                    f'replayed events skipped: {checkpoint.skipped}')
         updateAtJSON(async_=False)
         updateBotStatus(False, False)
+        vk.close()
+        vkUser.close()
         log('info', 'Exited successfully. Now you can close this window.')
         exit()
 
 
 def preMain() -> None:
+    from tendo.singleton import SingleInstance, SingleInstanceException
     try:
         me = SingleInstance()
     except SingleInstanceException:
@@ -470,6 +453,9 @@ def preMain() -> None:
         except Exception as exception:
             log('error', exception)
             log('info', 'Critical error occurred, restarting bot...')
+        finally:
+            # main() freezes what it loaded, the next run must not keep this one's users, outbox and sessions alive
+            gc.unfreeze()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,28 @@
+import pytest
+
+from scripts.classes import BaseUser
+from scripts.dialog import dialog
+from scripts.routing import MessageContext
+
+
+def makeUser() -> BaseUser:
+    return BaseUser(id=1, profileNames=[f'Профиль {profile + 1}' for profile in range(30)], lastKeyboard='profiles')
+
+
+def test_page_buttons() -> None:
+    user = makeUser()
+    pages = user.keyboardPageCount()
+    assert pages > 1
+    context = MessageContext(user, 'page', additional=pages - 1)
+    dialog.route(context)
+    assert user.keyboardPage == pages - 1
+    assert context.message == f'Страница {pages}.'
+
+
+@pytest.mark.parametrize('additional', ['', '1', 'abc', -1, 99, True, 1.])
+def test_page_ignored(additional) -> None:
+    user = makeUser()
+    context = MessageContext(user, 'page', additional=additional)
+    dialog.route(context)
+    assert user.keyboardPage == 0
+    assert not context.message
@@ -0,0 +1,25 @@
+import pytest
+
+from scripts.config import InputLimits
+from scripts.parsing import parseNumber, parseWeight, weightUnits
+
+
+@pytest.mark.parametrize('unit', sorted(weightUnits))
+@pytest.mark.parametrize('separator', ('', ' '))
+def test_weight_units(unit: str, separator: str) -> None:
+    assert parseWeight(f'80{separator}{unit}') == round(80 * weightUnits[unit], 2)
+
+
+@pytest.mark.parametrize('text, number', [('1.5k', 1500.), ('2к', 2000), ('2 к', 2000), ('1 000', 1000), ('12,5', 12.5)])
+def test_thousands_suffix(text: str, number: int | float) -> None:
+    assert parseNumber(text) == number
+
+
+@pytest.mark.parametrize('text', ['2ккг', '2kx', 'inf', 'nan', '1e3', '', 'кг'])
+def test_rejected(text: str) -> None:
+    with pytest.raises(ValueError):
+        parseNumber(text, weightUnits)
+
+
+def test_pounds() -> None:
+    assert parseWeight('100 lb') == round(100 * InputLimits.poundKilograms, 2)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+from scripts.classes import BaseUser, Users
+from scripts.config import Database
+from scripts.storage import SqliteUsers
+
+
+def makeUsers(directory: Path) -> Users:
+    users = Users()
+    users.snapshotPath, users.journalPath = directory / 'users.json', directory / 'users.journal'
+    return users
+
+
+def test_flush_appends_to_journal(tmp_path: Path) -> None:
+    users = makeUsers(tmp_path)
+    users[1] = BaseUser(id=1)
+    assert users.flush() == 1
+    assert users.journalPath.stat().st_size
+    assert not users.snapshotPath.exists()
+
+
+def test_flush_compacts_daily(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    users = makeUsers(tmp_path)
+    users[1] = BaseUser(id=1)
+    users.flush()
+    monkeypatch.setattr(Database, 'usersJournalCompactSeconds', 0.)
+    users[2] = BaseUser(id=2)
+    users.flush()
+    assert not users.journalPath.stat().st_size
+    assert Users.fromFile(users.snapshotPath, journal_path=users.journalPath).keys() == {1, 2}
+
+
+def test_sqlite_mark_dirty_after_eviction(tmp_path: Path) -> None:
+    users = SqliteUsers(tmp_path / 'users.sqlite3', cache_size=1)
+    users[1], users[2] = BaseUser(id=1), BaseUser(id=2)
+    users.flush()
+    user = users[1]
+    users[2]  # evicts user 1
+    user.lastMessage = 'changed'
+    users.markDirty(1, user)
+    assert users.flush() == 1
+    users.close()
+    assert SqliteUsers(tmp_path / 'users.sqlite3')[1].lastMessage == 'changed'